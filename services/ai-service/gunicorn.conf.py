@@ -0,0 +1,32 @@
+"""
+Gunicorn settings for the ai-service.
+
+The app is imported once in the master (preload_app) and the embedding model
+is loaded there before workers fork, so its weights are shared copy-on-write
+instead of loaded per worker. Each worker then runs its own warmup and
+reports readiness on /ready.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("UVICORN_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # With preload_app the app module is already imported; load the model before any fork
+    if preload_app:
+        from src import lifecycle
+        lifecycle.preload()
+
+
+def post_fork(server, worker):
+    from src import lifecycle
+    lifecycle.post_fork()
@@ -0,0 +1,45 @@
+-- Native pgvector columns for embeddings and CF factors.
+--
+-- The JSONB columns stay as the source of truth for other readers (connect-career-be);
+-- the ai-service dual-writes both and queries only the vector columns, so the
+-- HNSW indexes below can actually be used.
+--
+-- $embedding_dim and $cf_factors_dim are substituted by scripts/apply_migrations.py
+-- from EMBEDDING_DIM / CF_FACTORS_DIM.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE job_content_embeddings
+    ADD COLUMN IF NOT EXISTS "embeddingVector" vector($embedding_dim);
+ALTER TABLE user_content_embeddings
+    ADD COLUMN IF NOT EXISTS "embeddingVector" vector($embedding_dim);
+ALTER TABLE job_cf_factors
+    ADD COLUMN IF NOT EXISTS "factorsVector" vector($cf_factors_dim);
+ALTER TABLE user_cf_factors
+    ADD COLUMN IF NOT EXISTS "factorsVector" vector($cf_factors_dim);
+
+-- Backfill from the existing JSONB payloads (rows with a mismatched dimension are skipped)
+UPDATE job_content_embeddings
+SET "embeddingVector" = embedding::text::vector
+WHERE "embeddingVector" IS NULL AND jsonb_array_length(embedding) = $embedding_dim;
+
+UPDATE user_content_embeddings
+SET "embeddingVector" = embedding::text::vector
+WHERE "embeddingVector" IS NULL AND jsonb_array_length(embedding) = $embedding_dim;
+
+UPDATE job_cf_factors
+SET "factorsVector" = factors::text::vector
+WHERE "factorsVector" IS NULL AND jsonb_array_length(factors) = $cf_factors_dim;
+
+UPDATE user_cf_factors
+SET "factorsVector" = factors::text::vector
+WHERE "factorsVector" IS NULL AND jsonb_array_length(factors) = $cf_factors_dim;
+
+-- Cosine HNSW indexes for content similarity (recommendations, similar jobs, candidates)
+CREATE INDEX IF NOT EXISTS idx_job_content_embeddings_vector_hnsw
+    ON job_content_embeddings USING hnsw ("embeddingVector" vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX IF NOT EXISTS idx_user_content_embeddings_vector_hnsw
+    ON user_content_embeddings USING hnsw ("embeddingVector" vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,21 @@
+-- Binary float32/float16 copies of embeddings and CF factors (see src/utils/vector_codec.py).
+--
+-- The ai-service reads these instead of re-parsing JSONB on every request; the JSONB
+-- columns are still written because connect-career-be maps them as NOT NULL jsonb.
+-- Rows written before this migration keep a NULL binary column and are read from
+-- JSONB until the next training run rewrites them.
+
+ALTER TABLE job_content_embeddings
+    ADD COLUMN IF NOT EXISTS "embeddingBin" bytea;
+ALTER TABLE user_content_embeddings
+    ADD COLUMN IF NOT EXISTS "embeddingBin" bytea;
+ALTER TABLE job_cf_factors
+    ADD COLUMN IF NOT EXISTS "factorsBin" bytea;
+ALTER TABLE user_cf_factors
+    ADD COLUMN IF NOT EXISTS "factorsBin" bytea;
+
+-- Float payloads barely compress: store them out of line without TOAST compression
+ALTER TABLE job_content_embeddings ALTER COLUMN "embeddingBin" SET STORAGE EXTERNAL;
+ALTER TABLE user_content_embeddings ALTER COLUMN "embeddingBin" SET STORAGE EXTERNAL;
+ALTER TABLE job_cf_factors ALTER COLUMN "factorsBin" SET STORAGE EXTERNAL;
+ALTER TABLE user_cf_factors ALTER COLUMN "factorsBin" SET STORAGE EXTERNAL;
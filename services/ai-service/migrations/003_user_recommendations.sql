@@ -0,0 +1,17 @@
+-- Precomputed home-feed lists (written nightly by scripts/precompute_recommendations.py).
+--
+-- One row per active user with their top-N active jobs, best first, scored with the
+-- same hybrid formula as RecommendationService. The online path reads a user's row with
+-- a single primary-key lookup and only applies real-time filters (closed jobs, hidden
+-- companies, locations, salary); rows older than PRECOMPUTED_MAX_AGE_HOURS are ignored.
+
+CREATE TABLE IF NOT EXISTS user_recommendations (
+    "userId" uuid PRIMARY KEY,
+    "jobIds" uuid[] NOT NULL,
+    scores real[] NOT NULL,
+    "computedAt" timestamptz NOT NULL DEFAULT NOW()
+);
+
+-- Pruning rows of users who dropped out of the active set
+CREATE INDEX IF NOT EXISTS idx_user_recommendations_computed_at
+    ON user_recommendations ("computedAt");
@@ -0,0 +1,17 @@
+-- Precomputed top-K similar-jobs graph (written nightly by scripts/precompute_similar_jobs.py).
+--
+-- One row per active job with its nearest active jobs by content embedding, best first.
+-- /v1/jobs/{id}/similar reads a job's row with a single primary-key lookup and drops
+-- neighbours that closed since; when a job's embedding changes, its own row and the
+-- rows of its new neighbours are updated incrementally (see cache_invalidation.py).
+
+CREATE TABLE IF NOT EXISTS job_similar_jobs (
+    "jobId" uuid PRIMARY KEY,
+    "similarJobIds" uuid[] NOT NULL,
+    scores real[] NOT NULL,
+    "computedAt" timestamptz NOT NULL DEFAULT NOW()
+);
+
+-- Pruning rows of jobs that closed since the last run
+CREATE INDEX IF NOT EXISTS idx_job_similar_jobs_computed_at
+    ON job_similar_jobs ("computedAt");
@@ -0,0 +1,23 @@
+-- Which CF artifact version is authoritative, and which ids were folded in since.
+--
+-- scripts/train_cf_factors.py records each version after its factors are in
+-- job_cf_factors / user_cf_factors. A pod serves factors from its local memory-mapped
+-- artifact (see cf_artifacts.py) only while that artifact is the newest version recorded
+-- here; otherwise it reads the database. Fold-ins are recorded in cf_fold_ins so that a
+-- folded-in id is read from the database instead of the artifact trained before it.
+
+CREATE TABLE IF NOT EXISTS cf_factor_versions (
+    version text PRIMARY KEY,
+    "createdAt" timestamptz NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS cf_fold_ins (
+    kind text NOT NULL,
+    "entityId" uuid NOT NULL,
+    "foldedAt" timestamptz NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (kind, "entityId")
+);
+
+-- Fold-ins since the current version was recorded
+CREATE INDEX IF NOT EXISTS idx_cf_fold_ins_folded_at
+    ON cf_fold_ins ("foldedAt");
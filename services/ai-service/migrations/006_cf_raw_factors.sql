@@ -0,0 +1,15 @@
+-- Unnormalized ALS factors of the last training run (written by scripts/train_cf_factors.py).
+--
+-- job_cf_factors / user_cf_factors hold L2-normalized factors for scoring; warm-starting
+-- ALS from those would throw away the learned magnitudes. Training keeps the raw factors
+-- here, float32 bytea as in src/utils/vector_codec.py, and warm-starts from them; fold-in
+-- (cf_service.py) solves against them and adds the raw factors of each folded-in id.
+
+CREATE TABLE IF NOT EXISTS cf_raw_factors (
+    kind text NOT NULL,
+    "entityId" uuid NOT NULL,
+    "factorsBin" bytea NOT NULL,
+    PRIMARY KEY (kind, "entityId")
+);
+
+ALTER TABLE cf_raw_factors ALTER COLUMN "factorsBin" SET STORAGE EXTERNAL;
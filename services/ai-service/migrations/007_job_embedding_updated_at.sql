@@ -0,0 +1,24 @@
+-- Last write time of each job content embedding.
+--
+-- The in-process job vector index (src/services/job_vector_index.py) refreshes rows whose
+-- jobs."updatedAt" or job_content_embeddings."updatedAt" moved past its watermark. Keying
+-- on the job alone misses embeddings regenerated after the job row was last touched, e.g.
+-- an upsert served by a follower worker that the leader never sees. The trigger keeps the
+-- column current for every writer, including connect-career-be.
+--
+-- Dollar quotes are doubled because scripts/apply_migrations.py substitutes $$placeholders.
+
+ALTER TABLE job_content_embeddings
+    ADD COLUMN IF NOT EXISTS "updatedAt" timestamptz NOT NULL DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION job_content_embeddings_touch_updated_at() RETURNS trigger AS $$$$
+BEGIN
+    NEW."updatedAt" = NOW();
+    RETURN NEW;
+END;
+$$$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_job_content_embeddings_updated_at ON job_content_embeddings;
+CREATE TRIGGER trg_job_content_embeddings_updated_at
+    BEFORE UPDATE ON job_content_embeddings
+    FOR EACH ROW EXECUTE FUNCTION job_content_embeddings_touch_updated_at();
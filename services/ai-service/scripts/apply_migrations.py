@@ -0,0 +1,55 @@
+"""
+Apply SQL migrations from services/ai-service/migrations in filename order.
+Applied files are recorded in ai_service_migrations so reruns are no-ops.
+
+Placeholders such as $embedding_dim / $cf_factors_dim are filled from settings.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import logging
+from pathlib import Path
+from string import Template
+from src.config import settings
+from src.database import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "migrations"
+
+
+def apply_migrations() -> None:
+    db.execute_update("""
+        CREATE TABLE IF NOT EXISTS ai_service_migrations (
+            name text PRIMARY KEY,
+            "appliedAt" timestamptz NOT NULL DEFAULT NOW()
+        )
+    """)
+    applied = {row['name'] for row in db.execute_query("SELECT name FROM ai_service_migrations")}
+
+    substitutions = {
+        'embedding_dim': settings.embedding_dim,
+        'cf_factors_dim': settings.cf_factors_dim,
+    }
+
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        if path.name in applied:
+            logger.info(f"Skipping {path.name} (already applied)")
+            continue
+
+        sql = Template(path.read_text()).safe_substitute(substitutions)
+        logger.info(f"Applying {path.name}...")
+        with db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                cur.execute("INSERT INTO ai_service_migrations (name) VALUES (%s)", (path.name,))
+        logger.info(f"Applied {path.name}")
+
+
+if __name__ == "__main__":
+    try:
+        apply_migrations()
+    finally:
+        db.close()
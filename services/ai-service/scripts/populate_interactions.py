@@ -40,59 +40,33 @@ def populate_interactions():
     applications = db.execute_query(application_query)
     logger.info(f"Found {len(applications)} applications")
     
-    # 4. Insert into job_interactions
-    insert_query = """
-        INSERT INTO job_interactions ("userId", "jobId", type, weight, "createdAt")
-        VALUES (%s, %s, %s, %s, %s)
-        ON CONFLICT DO NOTHING
-    """
-    
-    inserted = 0
-    
-    # Insert saved jobs
-    for row in saved_jobs:
-        try:
-            db.execute_update(insert_query, (
-                str(row['userId']),
-                str(row['jobId']),
-                'save',
-                2.0,
-                row['created_at']
-            ))
-            inserted += 1
-        except Exception as e:
-            logger.error(f"Error inserting saved job interaction: {e}")
-    
-    # Insert favorite jobs
-    for row in favorite_jobs:
-        try:
-            db.execute_update(insert_query, (
+    # 4. Insert into job_interactions (COPY-staged, existing interactions are left untouched)
+    rows = []
+    for interactions, interaction_type, weight in (
+        (saved_jobs, 'save', 2.0),
+        (favorite_jobs, 'favorite', 3.0),
+        (applications, 'apply', 5.0),
+    ):
+        for row in interactions:
+            rows.append((
                 str(row['userId']),
                 str(row['jobId']),
-                'favorite',
-                3.0,
+                interaction_type,
+                weight,
                 row['created_at']
             ))
-            inserted += 1
-        except Exception as e:
-            logger.error(f"Error inserting favorite job interaction: {e}")
     
-    # Insert applications
-    for row in applications:
-        try:
-            db.execute_update(insert_query, (
-                str(row['userId']),
-                str(row['jobId']),
-                'apply',
-                5.0,
-                row['created_at']
-            ))
-            inserted += 1
-        except Exception as e:
-            logger.error(f"Error inserting application interaction: {e}")
+    inserted = db.bulk_upsert(
+        "job_interactions",
+        ["userId", "jobId", "type", "weight", "createdAt"],
+        rows,
+    )
     
     logger.info(f"Inserted {inserted} interactions into job_interactions table")
     logger.info("Done!")
 
 if __name__ == "__main__":
-    populate_interactions()
\ No newline at end of file
+    try:
+        populate_interactions()
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Nightly batch: precompute the home-feed recommendation list of every active user.
+
+Scores all active users against all active jobs with the hybrid formula of
+RecommendationService (alpha * cosine + (1 - alpha) * CF dot product), in
+blocked matrix-matrix products, and writes each user's top-N jobs to
+user_recommendations (migrations/003_user_recommendations.sql).
+
+Usage: python scripts/precompute_recommendations.py [top_n]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+from src.config import settings
+from src.database import db
+from src.services import scoring
+from src.services.cf_service import cf_service
+from src.services.precomputed_recommendations import load_active_job_vectors, precomputed_recommendations
+from src.utils.vector_codec import row_vector, vector_select
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _stack(ids: List[str], vectors: Dict[str, np.ndarray], dim: int) -> np.ndarray:
+    """Rows aligned with ids; missing or mis-sized vectors stay zero (no CF contribution)"""
+    matrix = np.zeros((len(ids), dim), dtype=np.float32)
+    for i, key in enumerate(ids):
+        vector = vectors.get(key)
+        if vector is not None and len(vector) == dim:
+            matrix[i] = vector
+    return matrix
+
+
+def iter_active_users(dim: int, active_days: int, page_size: int) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Pages of (user_ids, content embeddings) of users with an embedding of dimension dim
+
+    Args:
+        active_days: Only users with an interaction in the last active_days (0 = all)
+        page_size: Users per page (keyset pagination on userId)
+    """
+    query = f"""
+        SELECT uce."userId", {vector_select('embedding', 'embeddingBin', 'uce')}
+        FROM user_content_embeddings uce
+        WHERE uce.embedding IS NOT NULL
+        AND (%s::uuid IS NULL OR uce."userId" > %s::uuid)
+        AND (%s::int = 0 OR EXISTS (
+            SELECT 1 FROM job_interactions ji
+            WHERE ji."userId" = uce."userId"
+            AND ji."createdAt" > NOW() - make_interval(days => %s::int)
+        ))
+        ORDER BY uce."userId"
+        LIMIT %s
+    """
+    last_user_id = None
+    while True:
+        rows = db.execute_query(query, (last_user_id, last_user_id, active_days, active_days, page_size))
+        if not rows:
+            return
+        last_user_id = str(rows[-1]['userId'])
+
+        user_ids, vectors = [], []
+        for row in rows:
+            vector = row_vector(row, 'embedding', 'embeddingBin')
+            if vector is not None and len(vector) == dim:
+                user_ids.append(str(row['userId']))
+                vectors.append(vector)
+        if user_ids:
+            yield user_ids, np.vstack(vectors).astype(np.float32)
+        if len(rows) < page_size:
+            return
+
+
+def precompute_recommendations(top_n: int = None) -> dict:
+    """
+    Score every active user and store their top_n jobs
+
+    Returns:
+        Run summary (users, jobs, rows written, seconds)
+    """
+    top_n = top_n or settings.precompute_top_n
+    started = time.time()
+    computed_at = datetime.now(timezone.utc)
+    logger.info("=" * 60)
+    logger.info(f"Precomputing top-{top_n} recommendations...")
+    logger.info("=" * 60)
+
+    job_ids, job_content = load_active_job_vectors()
+    if not job_ids:
+        logger.warning("No active jobs with embeddings, nothing to precompute")
+        return {'users': 0, 'jobs': 0, 'written': 0, 'seconds': 0.0}
+
+    # [content | cf] job features, exactly as scored online (zero CF rows for jobs without factors)
+    alpha = settings.hybrid_alpha
+    job_factors = cf_service.get_job_cf_factors_batch(job_ids)
+    cf_dim = len(next(iter(job_factors.values()))) if job_factors else 0
+    job_cf = _stack(job_ids, job_factors, cf_dim) if cf_dim else None
+    job_features = scoring.stack_features(job_content, job_cf, normalized=True)
+    logger.info(f"Loaded {len(job_ids)} active jobs (dim={job_content.shape[1]}, cf_dim={cf_dim})")
+
+    users = written = 0
+    for user_ids, user_content in iter_active_users(
+        job_content.shape[1], settings.precompute_active_days, settings.precompute_user_block
+    ):
+        user_cf = None
+        if cf_dim:
+            user_factors = cf_service.get_user_cf_factors_batch(user_ids)
+            user_cf = _stack(user_ids, user_factors, cf_dim)
+        queries = scoring.hybrid_queries(user_content, user_cf, alpha, cf_dim)
+
+        lists = []
+        for start, top, top_scores in scoring.blocked_top_k(
+            queries, job_features, top_n,
+            query_block=settings.precompute_user_block,
+            item_block=settings.precompute_job_block,
+        ):
+            for i in range(len(top)):
+                lists.append((user_ids[start + i], [job_ids[j] for j in top[i]], top_scores[i].tolist()))
+        written += precomputed_recommendations.save(lists, computed_at)
+        users += len(user_ids)
+        logger.info(f"  {users} users scored")
+
+    # Users who dropped out of the active set fall back to live scoring
+    precomputed_recommendations.prune(computed_at)
+
+    summary = {'users': users, 'jobs': len(job_ids), 'written': written, 'seconds': round(time.time() - started, 1)}
+    logger.info("=" * 60)
+    logger.info("Precomputed recommendations complete!")
+    logger.info(f"  - Users: {summary['users']}")
+    logger.info(f"  - Jobs: {summary['jobs']}")
+    logger.info(f"  - Seconds: {summary['seconds']}")
+    logger.info("=" * 60)
+    return summary
+
+
+if __name__ == "__main__":
+    try:
+        precompute_recommendations(int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    finally:
+        db.close()
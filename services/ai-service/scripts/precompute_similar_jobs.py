@@ -0,0 +1,74 @@
+"""
+Nightly batch: precompute the top-K similar-jobs graph.
+
+Scores all active jobs against each other by content embedding (cosine) in
+blocked matrix-matrix products and writes each job's top-K neighbours to
+job_similar_jobs (migrations/004_job_similar_jobs.sql). Between runs, job
+embedding updates patch the graph incrementally (see cache_invalidation.py).
+
+Usage: python scripts/precompute_similar_jobs.py [top_k]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import logging
+import time
+from datetime import datetime, timezone
+from src.config import settings
+from src.database import db
+from src.services import scoring
+from src.services.precomputed_recommendations import load_active_job_vectors, precomputed_similar_jobs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def precompute_similar_jobs(top_k: int = None) -> dict:
+    """
+    Store the top_k most similar active jobs of every active job
+
+    Returns:
+        Run summary (jobs, rows written, seconds)
+    """
+    top_k = top_k or settings.similar_jobs_top_k
+    started = time.time()
+    computed_at = datetime.now(timezone.utc)
+    logger.info("=" * 60)
+    logger.info(f"Precomputing top-{top_k} similar jobs...")
+    logger.info("=" * 60)
+
+    job_ids, matrix = load_active_job_vectors()
+    logger.info(f"Loaded {len(job_ids)} active jobs")
+
+    written = 0
+    for start, top, top_scores in scoring.blocked_top_k(
+        matrix, matrix, top_k,
+        query_block=settings.similar_jobs_block,
+        item_block=settings.precompute_job_block,
+        exclude_self=True,
+    ):
+        lists = [
+            (job_ids[start + i], [job_ids[j] for j in top[i]], top_scores[i].tolist())
+            for i in range(len(top))
+        ]
+        written += precomputed_similar_jobs.save(lists, computed_at)
+        logger.info(f"  {start + len(top)} / {len(job_ids)} jobs")
+
+    # Jobs that closed since the last run fall back to live search
+    precomputed_similar_jobs.prune(computed_at)
+
+    summary = {'jobs': len(job_ids), 'written': written, 'seconds': round(time.time() - started, 1)}
+    logger.info("=" * 60)
+    logger.info("Precomputed similar jobs complete!")
+    logger.info(f"  - Jobs: {summary['jobs']}")
+    logger.info(f"  - Seconds: {summary['seconds']}")
+    logger.info("=" * 60)
+    return summary
+
+
+if __name__ == "__main__":
+    try:
+        precompute_similar_jobs(int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    finally:
+        db.close()
@@ -8,7 +8,6 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import psycopg2
-import json
 import logging
 import time
 from typing import List, Optional
@@ -16,6 +15,7 @@ from datetime import datetime, timedelta
 from google.api_core import exceptions  # Add this import
 from src.config import settings
 from src.services.embedding_service import EmbeddingService
+from src.services.embedding_store import JOB_EMBEDDINGS, USER_EMBEDDINGS, embedding_store
 from src.database import db
 
 logging.basicConfig(level=logging.INFO)
@@ -79,6 +79,18 @@ def build_job_text(job_data: dict) -> str:
     return "\n".join(filter(None, parts))
 
 
+def _flush_embeddings(target, pending: dict) -> int:
+    """Bulk upsert buffered embeddings; returns how many failed to save"""
+    if not pending:
+        return 0
+    try:
+        embedding_store.save_many(target, pending)
+        return 0
+    except Exception as e:
+        logger.error(f"Error saving {len(pending)} embeddings to {target.table}: {e}", exc_info=True)
+        return len(pending)
+
+
 def train_job_embeddings():
     """Generate embeddings for all active jobs - regenerates all embeddings"""
     import time
@@ -135,6 +147,7 @@ def train_job_embeddings():
             logger.info(f"Processing chunk {chunk_num}/{total_chunks} ({len(chunk)} jobs)")
             
             chunk_quota_hit = False
+            pending = {}
             
             for job_row in chunk:
                 try:
@@ -150,13 +163,7 @@ def train_job_embeddings():
                     
                     embedding = embedding_svc.encode_text(job_text)
                     
-                    upsert_query = """
-                        INSERT INTO job_content_embeddings ("jobId", embedding)
-                        VALUES (%s, %s::jsonb)
-                        ON CONFLICT ("jobId") 
-                        DO UPDATE SET embedding = EXCLUDED.embedding
-                    """
-                    db.execute_update(upsert_query, (job_id, json.dumps(embedding.tolist())))
+                    pending[job_id] = embedding
                     
                     processed += 1
                     quota_error_count = 0  # Reset on success
@@ -184,6 +191,11 @@ def train_job_embeddings():
                     logger.error(f"Error processing job {job_row.get('id')}: {e}", exc_info=True)
                     continue
             
+            # One bulk write per chunk instead of one connection per job
+            unsaved = _flush_embeddings(JOB_EMBEDDINGS, pending)
+            processed -= unsaved
+            failed += unsaved
+            
             # Delay between chunks (longer if quota was hit)
             if chunk_quota_hit:
                 wait_time = 60
@@ -322,6 +334,7 @@ def train_user_embeddings():
         for chunk_start in range(0, len(users), chunk_size):
             chunk = users[chunk_start:chunk_start + chunk_size]
             logger.info(f"Processing chunk {chunk_start // chunk_size + 1}/{(len(users) + chunk_size - 1) // chunk_size} ({len(chunk)} users)")
+            pending = {}
             
             for user_row in chunk:
                 try:
@@ -431,14 +444,7 @@ def train_user_embeddings():
                     # Generate embedding (with rate limiting built into service)
                     embedding = embedding_svc.encode_text(user_text)
                     
-                    # Upsert into database
-                    upsert_query = """
-                        INSERT INTO user_content_embeddings ("userId", embedding)
-                        VALUES (%s, %s::jsonb)
-                        ON CONFLICT ("userId") 
-                        DO UPDATE SET embedding = EXCLUDED.embedding
-                    """
-                    db.execute_update(upsert_query, (user_id, json.dumps(embedding.tolist())))
+                    pending[user_id] = embedding
                     
                     processed += 1
                     if processed % 10 == 0:
@@ -459,6 +465,10 @@ def train_user_embeddings():
                     logger.error(f"Error processing user {user_id}: {e}", exc_info=True)
                     continue
             
+            unsaved = _flush_embeddings(USER_EMBEDDINGS, pending)
+            processed -= unsaved
+            failed += unsaved
+            
             # Delay between chunks
             if chunk_start + chunk_size < len(users):
                 logger.info(f"Chunk complete. Waiting {delay_between_chunks}s before next chunk...")
@@ -484,4 +494,6 @@ if __name__ == "__main__":
         logger.info("="*60)
     except Exception as e:
         logger.error(f"Training failed: {e}", exc_info=True)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+import re
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Dict, List, Optional
+import asyncpg
+import numpy as np
+from .config import settings
+from .utils.pgvector import to_pgvector
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"%%|%s")
+
+
+@lru_cache(maxsize=256)
+def to_asyncpg_query(query: str) -> str:
+    """Rewrite psycopg2 `%s` placeholders as asyncpg `$1..$n` (and `%%` as `%`)"""
+    counter = 0
+
+    def replace(match: re.Match) -> str:
+        nonlocal counter
+        if match.group(0) == "%%":
+            return "%"
+        counter += 1
+        return f"${counter}"
+
+    return _PLACEHOLDER.sub(replace, query)
+
+
+def _encode_json(value: Any) -> str:
+    # Callers shared with Database pass pre-serialized JSON strings
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _encode_vector(value: Any) -> str:
+    return value if isinstance(value, str) else to_pgvector(value)
+
+
+def _decode_vector(value: str) -> np.ndarray:
+    return np.array(json.loads(value), dtype=np.float32)
+
+
+class AsyncDatabase:
+    """
+    asyncio-native counterpart of Database for use directly inside `async def` endpoints.
+
+    Same execute_query/execute_update contract (psycopg2-style `%s` params,
+    rows as dicts) on top of an asyncpg pool. uuids decode to str, json/jsonb
+    columns to Python objects and pgvector columns to float32 arrays.
+    """
+
+    def __init__(self):
+        self.dsn = settings.db_dsn
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        # Match psycopg2: uuids come back as str
+        await conn.set_type_codec("uuid", schema="pg_catalog", encoder=str, decoder=str, format="text")
+        for type_name in ("json", "jsonb"):
+            await conn.set_type_codec(
+                type_name, schema="pg_catalog", encoder=_encode_json, decoder=json.loads, format="text"
+            )
+        try:
+            await conn.set_type_codec(
+                "vector", schema="public", encoder=_encode_vector, decoder=_decode_vector, format="text"
+            )
+        except ValueError:
+            # pgvector extension not installed (migrations not applied yet)
+            pass
+
+    async def connect(self) -> asyncpg.Pool:
+        """Create the pool on first use"""
+        if self._pool is not None:
+            return self._pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=settings.db_async_pool_min_size,
+                    max_size=settings.db_async_pool_max_size,
+                    command_timeout=settings.db_command_timeout,
+                    max_inactive_connection_lifetime=settings.db_pool_max_lifetime,
+                    init=self._init_connection,
+                )
+                logger.info("Async database pool created")
+        return self._pool
+
+    @asynccontextmanager
+    async def get_connection(self) -> AsyncGenerator[asyncpg.Connection, None]:
+        """Pooled connection wrapped in a transaction (committed on success, rolled back on error)"""
+        pool = await self.connect()
+        async with pool.acquire() as conn:
+            try:
+                async with conn.transaction():
+                    yield conn
+            except Exception as e:
+                logger.error(f"Database error: {e}", exc_info=True)
+                raise
+
+    async def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+        async with self.get_connection() as conn:
+            rows = await conn.fetch(to_asyncpg_query(query), *(params or ()))
+            return [dict(row) for row in rows]
+
+    async def execute_update(self, query: str, params: tuple = None) -> None:
+        """Execute an update query with immediate commit"""
+        try:
+            async with self.get_connection() as conn:
+                await conn.execute(to_asyncpg_query(query), *(params or ()))
+        except Exception as e:
+            logger.error(f"Error executing update: {e}")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection pool metrics"""
+        if self._pool is None:
+            return {'size': 0}
+        return {
+            'min_size': self._pool.get_min_size(),
+            'max_size': self._pool.get_max_size(),
+            'size': self._pool.get_size(),
+            'idle': self._pool.get_idle_size(),
+        }
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+async_db = AsyncDatabase()
@@ -20,6 +20,19 @@ class Settings(BaseSettings):
     @property
     def db_dsn(self) -> str:
         return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+
+    # Connection pool (shared by request executor threads and scripts)
+    db_pool_min_size: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    db_pool_max_size: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Max seconds to wait for a connection
+    db_pool_max_lifetime: float = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # Recycle connections after this
+    db_pool_health_check_interval: float = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30"))  # Ping if idle longer
+    db_bulk_batch_size: int = int(os.getenv("DB_BULK_BATCH_SIZE", "5000"))  # Rows per COPY in Database.bulk_upsert
+
+    # asyncpg pool used by async endpoints (see async_database.py)
+    db_async_pool_min_size: int = int(os.getenv("DB_ASYNC_POOL_MIN_SIZE", "1"))
+    db_async_pool_max_size: int = int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", "10"))
+    db_command_timeout: float = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
     
     # Embedding Provider Configuration
     embedding_provider: str = os.getenv("EMBEDDING_PROVIDER", "sentence-transformers")
@@ -44,11 +57,54 @@ class Settings(BaseSettings):
     
     # CF model
     cf_factors_dim: int = int(os.getenv("CF_FACTORS_DIM", "64"))
+    cf_model: str = os.getenv("CF_MODEL", "als")  # Options: als (explicit weights), implicit
+    cf_iterations: int = int(os.getenv("CF_ITERATIONS", "15"))
+    cf_regularization: float = float(os.getenv("CF_REGULARIZATION", "0.1"))
+    cf_implicit_alpha: float = float(os.getenv("CF_IMPLICIT_ALPHA", "1.0"))  # Confidence = 1 + alpha * weight
+    cf_cg_steps: int = int(os.getenv("CF_CG_STEPS", "3"))  # Conjugate-gradient steps per row (implicit)
+    cf_n_workers: int = int(os.getenv("CF_N_WORKERS", "1"))  # Processes solving ALS row blocks (1 = in-process)
+    cf_block_size: int = int(os.getenv("CF_BLOCK_SIZE", "256"))  # Rows per stacked solve / pool task
+    cf_warm_start: bool = os.getenv("CF_WARM_START", "true").lower() == "true"  # Start from persisted factors
+    cf_tolerance: float = float(os.getenv("CF_TOLERANCE", "0.001"))  # Relative loss improvement to keep iterating (0 = off)
+    cf_holdout_fraction: float = float(os.getenv("CF_HOLDOUT_FRACTION", "0.0"))  # Monitor held-out loss instead
+    cf_artifacts_enabled: bool = os.getenv("CF_ARTIFACTS_ENABLED", "true").lower() == "true"  # mmap .npy factor versions
+    cf_artifact_dir: str = os.getenv("CF_ARTIFACT_DIR", str(Path(__file__).parent.parent / "data" / "cf_factors"))
+    cf_artifact_keep: int = int(os.getenv("CF_ARTIFACT_KEEP", "3"))  # Versions retained on disk
+    cf_artifact_check_interval: float = float(os.getenv("CF_ARTIFACT_CHECK_INTERVAL", "30"))  # Seconds between LATEST checks
     
     # Recommendation
     hybrid_alpha: float = float(os.getenv("HYBRID_ALPHA", "0.6"))
     default_limit: int = int(os.getenv("DEFAULT_LIMIT", "20"))
-    
+
+    # In-process job vector index
+    job_index_enabled: bool = os.getenv("JOB_INDEX_ENABLED", "true").lower() == "true"
+    job_index_refresh_seconds: int = int(os.getenv("JOB_INDEX_REFRESH_SECONDS", "60"))
+    # Also refresh on job_content_embeddings."updatedAt" (see migrations/007_job_embedding_updated_at.sql)
+    # Off until scripts/apply_migrations.py has run against the database: the column must exist
+    job_embedding_updated_at_enabled: bool = os.getenv("JOB_EMBEDDING_UPDATED_AT_ENABLED", "false").lower() == "true"
+    # Share the index across gunicorn workers: one leader loads, the others mmap its published generation
+    shared_vector_store_enabled: bool = os.getenv("SHARED_VECTOR_STORE_ENABLED", "true").lower() == "true"
+    shared_vector_dir: str = os.getenv("SHARED_VECTOR_DIR", str(Path(__file__).parent.parent / "data" / "shared_vectors"))
+
+    # Approximate nearest neighbour search over the job vector index
+    ann_backend: str = os.getenv("ANN_BACKEND", "ivf")  # Options: ivf, hnsw, none
+    ann_min_jobs: int = int(os.getenv("ANN_MIN_JOBS", "5000"))  # Exact scoring below this size
+    ann_nprobe: int = int(os.getenv("ANN_NPROBE", "16"))
+    ann_ef_search: int = int(os.getenv("ANN_EF_SEARCH", "64"))
+    ann_rebuild_seconds: int = int(os.getenv("ANN_REBUILD_SECONDS", "600"))
+    ann_index_path: Optional[str] = os.getenv("ANN_INDEX_PATH")
+
+    # pgvector columns (see migrations/001_pgvector_columns.sql)
+    # Off until scripts/apply_migrations.py has run against the database: the columns must exist
+    pgvector_columns_enabled: bool = os.getenv("PGVECTOR_COLUMNS_ENABLED", "false").lower() == "true"
+    pgvector_ef_search: int = int(os.getenv("PGVECTOR_EF_SEARCH", "200"))  # Raised to the query's LIMIT when smaller
+    pgvector_candidate_limit: int = int(os.getenv("PGVECTOR_CANDIDATE_LIMIT", "1000"))  # Jobs re-ranked per recommendation request
+
+    # Binary (bytea) vector columns (see migrations/002_binary_vectors.sql)
+    # Off until scripts/apply_migrations.py has run against the database: the columns must exist
+    binary_vectors_enabled: bool = os.getenv("BINARY_VECTORS_ENABLED", "false").lower() == "true"
+    binary_vector_dtype: str = os.getenv("BINARY_VECTOR_DTYPE", "float32")  # Options: float32, float16
+
     redis_host: str = os.getenv("REDIS_HOST", "localhost")
     redis_port: int = int(os.getenv("REDIS_PORT", "6379"))
     redis_password: Optional[str] = os.getenv("REDIS_PASSWORD")
@@ -58,6 +114,50 @@ class Settings(BaseSettings):
     embedding_cache_enabled: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
     embedding_cache_ttl: int = int(os.getenv("EMBEDDING_CACHE_TTL", "86400"))
     embedding_cache_prefix: str = os.getenv("EMBEDDING_CACHE_PREFIX", "embedding:")
+    embedding_cache_dtype: str = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")  # Options: float32, float16
+    embedding_cache_compression: str = os.getenv("EMBEDDING_CACHE_COMPRESSION", "none")  # Options: none, zstd (needs zstandard)
+    embedding_cache_compress_min_dim: int = int(os.getenv("EMBEDDING_CACHE_COMPRESS_MIN_DIM", "1024"))
+    embedding_cache_mget_chunk: int = int(os.getenv("EMBEDDING_CACHE_MGET_CHUNK", "256"))
+
+    # In-process LRU in front of the Redis embedding cache (see local_cache.py)
+    embedding_l1_enabled: bool = os.getenv("EMBEDDING_L1_ENABLED", "true").lower() == "true"
+    embedding_l1_max_mb: float = float(os.getenv("EMBEDDING_L1_MAX_MB", "64"))  # Per worker process
+    embedding_l1_ttl: int = int(os.getenv("EMBEDDING_L1_TTL", os.getenv("EMBEDDING_CACHE_TTL", "86400")))  # Capped at the Redis TTL
+    # How often each worker checks the Redis tier generation, so EmbeddingCache.clear() also empties L1
+    embedding_l1_generation_check_seconds: float = float(os.getenv("EMBEDDING_L1_GENERATION_CHECK_SECONDS", "5"))
+
+    # Recommendation / similar-jobs result cache (see recommendation_cache.py)
+    # Fresh lifetime; raise it once connect-career-be publishes invalidation events (see cache_invalidation.py)
+    recommendation_cache_ttl: int = int(os.getenv("RECOMMENDATION_CACHE_TTL", "300"))
+    # Per-endpoint fresh lifetimes (see cached_result in recommendation_cache.py)
+    similar_jobs_cache_ttl: int = int(os.getenv("SIMILAR_JOBS_CACHE_TTL", "300"))  # Same as RECOMMENDATION_CACHE_TTL until events exist
+    search_cache_ttl: int = int(os.getenv("SEARCH_CACHE_TTL", "300"))  # Free-text searches rarely repeat for long
+    candidate_cache_ttl: int = int(os.getenv("CANDIDATE_CACHE_TTL", "900"))  # New applications are not job events
+    recommendation_cache_stale_ttl: int = int(os.getenv("RECOMMENDATION_CACHE_STALE_TTL", "300"))  # Served stale while refreshing
+    recommendation_cache_xfetch_beta: float = float(os.getenv("RECOMMENDATION_CACHE_XFETCH_BETA", "1.0"))  # 0 disables early refresh
+    recommendation_cache_lock_timeout: float = float(os.getenv("RECOMMENDATION_CACHE_LOCK_TIMEOUT", "10"))
+    recommendation_cache_refresh_workers: int = int(os.getenv("RECOMMENDATION_CACHE_REFRESH_WORKERS", "2"))
+    cache_invalidation_enabled: bool = os.getenv("CACHE_INVALIDATION_ENABLED", "true").lower() == "true"  # pub/sub listener per worker
+    cache_invalidation_channel: str = os.getenv("CACHE_INVALIDATION_CHANNEL", "ai-service:cache-invalidation")
+
+    # Nightly precomputed home-feed lists (see precomputed_recommendations.py, migrations/003_user_recommendations.sql)
+    # Off until scripts/apply_migrations.py has run against the database: the table must exist
+    precomputed_recommendations_enabled: bool = os.getenv("PRECOMPUTED_RECOMMENDATIONS_ENABLED", "false").lower() == "true"
+    precomputed_max_age_hours: float = float(os.getenv("PRECOMPUTED_MAX_AGE_HOURS", "36"))  # Older lists are scored live
+    precompute_top_n: int = int(os.getenv("PRECOMPUTE_TOP_N", "200"))  # Jobs stored per user (requests above this score live)
+    precompute_active_days: int = int(os.getenv("PRECOMPUTE_ACTIVE_DAYS", "30"))  # Users with an interaction this recent (0 = all)
+    precompute_user_block: int = int(os.getenv("PRECOMPUTE_USER_BLOCK", "1024"))  # Users per matrix product
+    precompute_job_block: int = int(os.getenv("PRECOMPUTE_JOB_BLOCK", "65536"))  # Jobs per matrix product
+    # Precomputed similar-jobs graph (migrations/004_job_similar_jobs.sql), updated incrementally on job events
+    # Off until scripts/apply_migrations.py has run against the database: the table must exist
+    precomputed_similar_jobs_enabled: bool = os.getenv("PRECOMPUTED_SIMILAR_JOBS_ENABLED", "false").lower() == "true"
+    similar_jobs_top_k: int = int(os.getenv("SIMILAR_JOBS_TOP_K", "50"))  # Neighbours stored per job (larger limits query live)
+    similar_jobs_block: int = int(os.getenv("SIMILAR_JOBS_BLOCK", "1024"))  # Source jobs per matrix product
+
+    # Coalesce concurrent encode_text calls into batched provider calls (see encode_batcher.py)
+    embedding_batching_enabled: bool = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+    embedding_batch_max_size: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+    embedding_batch_max_wait_ms: float = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
     
     # Service
     app_name: str = "Job Recommender Service"
@@ -1,22 +1,287 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError
 from contextlib import contextmanager
-from typing import Generator, List, Dict, Any
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Generator, Iterable, List, Dict, Any, Optional, Sequence
+import io
+import json
 import logging
+import os
+import threading
+import time
 from .config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class PoolTimeout(PoolError):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(value: Any) -> str:
+    """Format a value for COPY ... FROM STDIN (text format)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex input; the backslash itself is escaped for COPY
+        return '\\\\x' + bytes(value).hex()
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+@dataclass
+class _PooledConnection:
+    conn: psycopg2.extensions.connection
+    created_at: float
+    last_used: float
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+
+    Connections are health-checked on checkout when they have been idle longer
+    than health_check_interval, recycled after max_lifetime seconds, and the
+    pool is re-created after a fork so worker processes never share sockets.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = None,
+        max_size: int = None,
+        timeout: float = None,
+        max_lifetime: float = None,
+        health_check_interval: float = None,
+    ):
+        self.dsn = dsn
+        self.max_size = max(settings.db_pool_max_size if max_size is None else max_size, 1)
+        self.min_size = min(settings.db_pool_min_size if min_size is None else min_size, self.max_size)
+        self.timeout = settings.db_pool_timeout if timeout is None else timeout
+        self.max_lifetime = settings.db_pool_max_lifetime if max_lifetime is None else max_lifetime
+        self.health_check_interval = (
+            settings.db_pool_health_check_interval if health_check_interval is None else health_check_interval
+        )
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: deque = deque()
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._size = 0  # idle + in use + being opened
+        self._waiters = 0
+        self._pid = os.getpid()
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._opened = 0
+        self._recycled = 0
+        self._broken = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def _connect(self) -> _PooledConnection:
+        conn = psycopg2.connect(self.dsn)
+        now = time.monotonic()
+        return _PooledConnection(conn=conn, created_at=now, last_used=now)
+
+    def _check_fork(self) -> None:
+        """Drop connections inherited from a parent process (never close them: the parent owns the sockets)"""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                self._idle.clear()
+                self._in_use.clear()
+                self._size = 0
+                self._waiters = 0
+                self._pid = os.getpid()
+
+    def _is_usable(self, pooled: _PooledConnection) -> bool:
+        conn = pooled.conn
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if self.max_lifetime and now - pooled.created_at >= self.max_lifetime:
+            with self._cond:
+                self._recycled += 1
+            return False
+        if now - pooled.last_used >= self.health_check_interval:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding broken pooled connection: {e}")
+                with self._cond:
+                    self._broken += 1
+                return False
+        return True
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        try:
+            if not pooled.conn.closed:
+                pooled.conn.close()
+        except Exception as close_error:
+            logger.warning(f"Error closing connection: {close_error}")
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def getconn(self) -> psycopg2.extensions.connection:
+        """Check out a connection, waiting up to `timeout` seconds when the pool is exhausted"""
+        self._check_fork()
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            pooled = None
+            with self._cond:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    self._waiters += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiters -= 1
+                if self._idle:
+                    pooled = self._idle.pop()  # LIFO keeps a hot working set
+                else:
+                    self._size += 1  # reserve a slot before connecting outside the lock
+
+            if pooled is None:
+                try:
+                    pooled = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opened += 1
+            elif not self._is_usable(pooled):
+                self._discard(pooled)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._in_use[id(pooled.conn)] = pooled
+                self._checkouts += 1
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+            return pooled.conn
+
+    def putconn(self, conn: psycopg2.extensions.connection, discard: bool = False) -> None:
+        """Return a connection; broken or mid-transaction connections are reset or closed"""
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            pooled = self._in_use.pop(id(conn), None)
+        if pooled is None:
+            return
+
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except Exception as e:
+                logger.warning(f"Error resetting pooled connection: {e}")
+                discard = True
+        if discard or conn.closed or self._closed:
+            self._discard(pooled)
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def open(self) -> None:
+        """Pre-open min_size connections"""
+        self._check_fork()
+        connections = []
+        try:
+            while True:
+                with self._cond:
+                    if self._size >= self.min_size:
+                        break
+                connections.append(self.getconn())
+        finally:
+            for conn in connections:
+                self.putconn(conn)
+
+    def close(self) -> None:
+        """Close idle connections and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            try:
+                pooled.conn.close()
+            except Exception as close_error:
+                logger.warning(f"Error closing connection: {close_error}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiters': self._waiters,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'opened': self._opened,
+                'recycled': self._recycled,
+                'broken': self._broken,
+                'avg_checkout_ms': round(1000 * self._wait_time_total / self._checkouts, 3) if self._checkouts else 0.0,
+                'max_checkout_ms': round(1000 * self._wait_time_max, 3),
+            }
+
+
 class Database:
     def __init__(self):
         self.dsn = settings.db_dsn
-    
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """Connection pool, created lazily so importing this module never connects"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(self.dsn)
+        return self._pool
+
     @contextmanager
     def get_connection(self) -> Generator[psycopg2.extensions.connection, None, None]:
         conn = None
+        broken = False
         try:
-            conn = psycopg2.connect(self.dsn)
+            conn = self.pool.getconn()
             yield conn
             # Only commit if connection is still open
             if conn and not conn.closed:
@@ -28,38 +293,124 @@ class Database:
                     conn.rollback()
                 except Exception as rollback_error:
                     logger.warning(f"Error during rollback: {rollback_error}")
+                    broken = True
+            broken = broken or isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
             logger.error(f"Database error: {e}", exc_info=True)
             raise
         finally:
-            # Only close if connection is still open
-            if conn and not conn.closed:
-                try:
-                    conn.close()
-                except Exception as close_error:
-                    logger.warning(f"Error closing connection: {close_error}")
-    
-    def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+            if conn is not None:
+                self.pool.putconn(conn, discard=broken)
+
+    def execute_query(
+        self, query: str, params: tuple = None, local_settings: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute a query and return its rows as dicts
+
+        Args:
+            local_settings: Server settings (name -> value) applied with SET LOCAL,
+                each as its own statement in the query's transaction
+        """
         with self.get_connection() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                for name, value in (local_settings or {}).items():
+                    cur.execute(f"SET LOCAL {name} = %s", (value,))
                 cur.execute(query, params)
                 return cur.fetchall()
-    
+
     def execute_update(self, query: str, params: tuple = None) -> None:
         """Execute an update query with immediate commit"""
-        conn = None
         try:
-            conn = psycopg2.connect(self.dsn)
-            conn.autocommit = True  # Enable autocommit for immediate commit
-            
-            with conn.cursor() as cur:
-                cur.execute(query, params)
-                # With autocommit=True, changes are committed immediately
+            with self.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, params)
         except Exception as e:
             logger.error(f"Error executing update: {e}")
             raise
-        finally:
-            if conn and not conn.closed:
-                conn.close()
+
+    def bulk_upsert(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[Sequence[Any]],
+        conflict_columns: Sequence[str] = None,
+        update_columns: Sequence[str] = None,
+        batch_size: int = None,
+    ) -> int:
+        """
+        Upsert many rows by COPYing each batch into a temp table and merging with one INSERT ... ON CONFLICT
+
+        Args:
+            table: Target table
+            columns: Column names (unquoted), in the order of each row's values
+            rows: Row value tuples
+            conflict_columns: Conflict target; rows with duplicate keys keep the last occurrence.
+                None means ON CONFLICT DO NOTHING on any constraint
+            update_columns: Columns overwritten on conflict (default: every non-conflict column);
+                an empty list means DO NOTHING
+            batch_size: Rows per COPY/transaction (default DB_BULK_BATCH_SIZE)
+
+        Returns:
+            Number of rows inserted or updated
+        """
+        batch_size = batch_size or settings.db_bulk_batch_size
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        staging = f"_bulk_{table}"
+
+        if conflict_columns is None:
+            conflict_clause = "ON CONFLICT DO NOTHING"
+        else:
+            if update_columns is None:
+                update_columns = [column for column in columns if column not in conflict_columns]
+            conflict_target = ", ".join(f'"{column}"' for column in conflict_columns)
+            if update_columns:
+                updates = ", ".join(f'"{column}" = EXCLUDED."{column}"' for column in update_columns)
+                conflict_clause = f"ON CONFLICT ({conflict_target}) DO UPDATE SET {updates}"
+            else:
+                conflict_clause = f"ON CONFLICT ({conflict_target}) DO NOTHING"
+            # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement
+            key_positions = [list(columns).index(column) for column in conflict_columns]
+            deduped = {}
+            for row in rows:
+                deduped[tuple(row[i] for i in key_positions)] = row
+            rows = deduped.values()
+
+        def write_batch(batch: List[Sequence[Any]]) -> int:
+            buffer = io.StringIO()
+            for row in batch:
+                buffer.write("\t".join(_copy_value(value) for value in row))
+                buffer.write("\n")
+            buffer.seek(0)
+            with self.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f'CREATE TEMP TABLE "{staging}" ON COMMIT DROP AS '
+                        f'SELECT {quoted} FROM {table} WITH NO DATA'
+                    )
+                    cur.copy_expert(f'COPY "{staging}" ({quoted}) FROM STDIN', buffer)
+                    cur.execute(f'INSERT INTO {table} ({quoted}) SELECT {quoted} FROM "{staging}" {conflict_clause}')
+                    return cur.rowcount
+
+        written = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                written += write_batch(batch)
+                batch = []
+        if batch:
+            written += write_batch(batch)
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection pool metrics"""
+        return self.pool.stats()
+
+    def close(self) -> None:
+        """Close pooled connections (e.g. at the end of a script or on shutdown)"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
 
 
-db = Database()
\ No newline at end of file
+db = Database()
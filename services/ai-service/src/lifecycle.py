@@ -0,0 +1,143 @@
+"""
+Process lifecycle for the API.
+
+    preload()   gunicorn master, before forking (gunicorn.conf.py on_starting):
+                load the embedding model once so workers share its pages
+                copy-on-write.
+    post_fork() every worker, right after fork (gunicorn.conf.py post_fork):
+                reset per-worker state.
+    startup()   every worker's event loop (FastAPI startup): open pools,
+                attach/load the job index, subscribe to cache
+                invalidations, run warmup encodes, then mark the worker
+                ready.
+    shutdown()  FastAPI shutdown.
+
+Without gunicorn (uvicorn, tests) startup() loads whatever preload() did not.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor
+from typing import Any, Dict, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+WARMUP_RETRY_SECONDS = 10
+
+
+class Readiness:
+    """Per-process readiness, flipped once startup() has finished its warmup"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.ready = False
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.steps: Dict[str, Any] = {}
+
+    def step(self, name: str, status: Any) -> None:
+        self.steps[name] = status
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.ready_at = time.time()
+        logger.info(f"Worker {os.getpid()} ready after {self.ready_at - self.started_at:.1f}s")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'pid': os.getpid(),
+            'startup_seconds': round((self.ready_at or time.time()) - self.started_at, 3),
+            'steps': dict(self.steps),
+        }
+
+
+readiness = Readiness()
+
+
+def preload() -> None:
+    """Load the embedding model in the gunicorn master (no inference: threads do not survive fork)"""
+    from .services.embedding_service import embedding_service
+
+    started = time.time()
+    try:
+        embedding_service.load()
+        logger.info(f"Preloaded embedding provider in {time.time() - started:.1f}s (pid {os.getpid()})")
+    except Exception as e:
+        # Workers retry lazily on first use
+        logger.error(f"Embedding provider preload failed: {e}", exc_info=True)
+
+
+def post_fork() -> None:
+    """
+    Reset per-process state a worker must not share with the master.
+
+    Connections inherited through fork are not closed here (the master owns
+    those sockets): the database pool and redis-py both notice the pid
+    change and drop them on first use.
+    """
+    readiness.reset()
+
+
+async def startup(executor: Executor) -> None:
+    """Warm everything a request needs, then flip readiness"""
+    from .database import db
+    from .services.cache_invalidation import cache_invalidator
+    from .services.embedding_service import embedding_service
+    from .services.job_vector_index import job_vector_index
+
+    loop = asyncio.get_event_loop()
+    logger.info("Initializing services...")
+
+    try:
+        await loop.run_in_executor(executor, db.pool.open)
+        readiness.step('database', 'ok')
+    except Exception as e:
+        readiness.step('database', f"error: {e}")
+        logger.error(f"Failed to open database pool: {e}", exc_info=True)
+
+    if settings.job_index_enabled:
+        try:
+            await loop.run_in_executor(executor, job_vector_index.load)
+            await loop.run_in_executor(executor, job_vector_index.load_ann)
+            readiness.step('job_index', job_vector_index.size)
+        except Exception as e:
+            readiness.step('job_index', f"error: {e}")
+            logger.error(f"Failed to load job vector index: {e}", exc_info=True)
+        # Background refresh also retries the initial load if it failed
+        job_vector_index.start_background_refresh()
+
+    if settings.cache_invalidation_enabled:
+        cache_invalidator.start_listener()
+        readiness.step('cache_invalidation', 'listening')
+
+    # Stay unready until the provider can encode: it would fail every request otherwise
+    while True:
+        try:
+            started = time.time()
+            await loop.run_in_executor(executor, embedding_service.warmup)
+            readiness.step('embedding_warmup', f"{time.time() - started:.2f}s")
+            break
+        except Exception as e:
+            readiness.step('embedding_warmup', f"error: {e}")
+            logger.error(f"Embedding warmup failed, retrying in {WARMUP_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+    readiness.mark_ready()
+
+
+async def shutdown() -> None:
+    from .async_database import async_db
+    from .database import db
+    from .services.cache_invalidation import cache_invalidator
+    from .services.job_vector_index import job_vector_index
+
+    readiness.ready = False
+    cache_invalidator.stop()
+    job_vector_index.stop()
+    await async_db.close()
+    db.close()
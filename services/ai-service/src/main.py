@@ -1,10 +1,11 @@
 from fastapi import FastAPI, HTTPException, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import logging
-import json
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from .config import settings
+from . import lifecycle
 from .models.schemas import (
     RecommendationRequest,
     RecommendationResponse,
@@ -13,13 +14,19 @@ from .models.schemas import (
     SimilarJobsResponse,
     CandidateRecommendationRequest,
     CandidateRecommendationResponse,
+    CacheInvalidationRequest,
     MatchingScoreRequest,
     MatchingScoreResponse,
 )
 from .services.recommendation_service import recommendation_service
 from .services.embedding_service import embedding_service
 from .services.matching_score_service import matching_score_service
+from .services.job_vector_index import job_vector_index
+from .services.cf_service import cf_service
+from .services.cache_invalidation import cache_invalidator
+from .services.embedding_store import embedding_store
 from .database import db
+from .async_database import async_db
 import sys, pathlib
 sys.path.append(str(pathlib.Path(__file__).parent.parent))
 import os
@@ -53,18 +60,43 @@ v1_router = APIRouter(prefix="/v1", tags=["v1"])
 
 @v1_router.get("/cache/stats")
 async def get_cache_stats():
-    """Get embedding cache statistics"""
-    from .services.embedding_cache import get_cache
+    """Get embedding cache statistics (per-tier hit ratios for the in-process L1 and Redis) and recommendation cache counters"""
+    from .services.embedding_cache import get_tiered_cache
+    from .services.recommendation_cache import get_recommendation_cache
     
-    cache = get_cache()
+    cache = get_tiered_cache()
     if cache:
-        return cache.stats()
+        stats = cache.stats()
+        recommendation_cache = get_recommendation_cache()
+        stats['recommendations'] = recommendation_cache.stats() if recommendation_cache else {'enabled': False}
+        return stats
     return {"enabled": False, "message": "Cache not enabled"}
 
+@v1_router.post("/cache/invalidate")
+async def invalidate_cache(request: CacheInvalidationRequest):
+    """Invalidate cached recommendations / similar jobs and evict job vectors in every worker"""
+    try:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, cache_invalidator.invalidate, request.dict())
+    except Exception as e:
+        logger.error(f"Error invalidating caches: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@v1_router.get("/embeddings/stats")
+async def get_embedding_stats():
+    """Get encode micro-batching statistics (batch-size histogram, queue wait, encode time)"""
+    if embedding_service.batcher:
+        return embedding_service.batcher.stats()
+    return {"enabled": False, "message": "Encode batching not enabled"}
+
+@v1_router.get("/db/stats")
+async def get_db_stats():
+    """Get database connection pool statistics"""
+    return {"sync": db.stats(), "async": async_db.stats()}
+
 from fastapi import HTTPException
 from .services.embedding_service import embedding_service
 from .database import db
-import json
 
 
 @v1_router.post("/embeddings/encode")
@@ -76,7 +108,7 @@ async def encode_text(request: dict):
             raise HTTPException(status_code=400, detail="text is required")
         
         # Generate embedding
-        embedding = embedding_service.encode_text(text)
+        embedding = await embedding_service.encode_text_async(text)
         
         return {"embedding": embedding.tolist()}
     except Exception as e:
@@ -127,17 +159,14 @@ async def generate_job_embedding(job_data: dict):
         if not job_text.strip():
             raise HTTPException(status_code=400, detail="Job has no text content")
         
-        # Generate embedding
-        embedding = embedding_service.encode_text(job_text)
-        
-        # Upsert into database
-        upsert_query = """
-            INSERT INTO job_content_embeddings ("jobId", embedding)
-            VALUES (%s, %s::jsonb)
-            ON CONFLICT ("jobId") 
-            DO UPDATE SET embedding = EXCLUDED.embedding
-        """
-        db.execute_update(upsert_query, (job_id, json.dumps(embedding.tolist())))
+        # Generate embedding (batched with concurrent requests, off the event loop)
+        loop = asyncio.get_event_loop()
+        embedding = await embedding_service.encode_text_async(job_text)
+        
+        # Upsert into database (JSONB + pgvector column)
+        await embedding_store.save_job_embedding_async(job_id, embedding)
+        await loop.run_in_executor(executor, job_vector_index.upsert, job_id, embedding)
+        await loop.run_in_executor(executor, cache_invalidator.invalidate_job, job_id, False, "job.embedding_updated")
         
         return {"status": "success", "jobId": job_id}
     except Exception as e:
@@ -159,17 +188,14 @@ async def generate_user_embedding(user_data: dict):
         if not user_text.strip():
             raise HTTPException(status_code=400, detail="User has no profile data")
         
-        # Generate embedding
-        embedding = embedding_service.encode_text(user_text)
-        
-        # Upsert into database
-        upsert_query = """
-            INSERT INTO user_content_embeddings ("userId", embedding)
-            VALUES (%s, %s::jsonb)
-            ON CONFLICT ("userId") 
-            DO UPDATE SET embedding = EXCLUDED.embedding
-        """
-        db.execute_update(upsert_query, (user_id, json.dumps(embedding.tolist())))
+        # Generate embedding (batched with concurrent requests, off the event loop)
+        embedding = await embedding_service.encode_text_async(user_text)
+        
+        # Upsert into database (JSONB + pgvector column)
+        await embedding_store.save_user_embedding_async(user_id, embedding)
+        await asyncio.get_event_loop().run_in_executor(
+            executor, cache_invalidator.invalidate_user, user_id, "user.embedding_updated"
+        )
         
         return {"status": "success", "userId": user_id}
     except Exception as e:
@@ -196,19 +222,51 @@ async def batch_generate_embeddings(request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @v1_router.post("/cf/train")
-async def train_cf_factors():
-    """Trigger CF factors training"""
+async def train_cf_factors(request: dict = None):
+    """Trigger CF factors training (body: {"model": "als" | "implicit"}, default CF_MODEL)"""
     from scripts.train_cf_factors import train_cf_factors as train_cf
+    from .services.als import CF_MODELS
     
     try:
-        train_cf()
-        return {"status": "success", "message": "CF training completed"}
+        model = (request or {}).get('model') or settings.cf_model
+        if model.lower() not in CF_MODELS:
+            raise HTTPException(status_code=400, detail=f"model must be one of: {', '.join(CF_MODELS)}")
+        
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(executor, train_cf, model)
+        return {"status": "success", "model": model, "message": "CF training completed"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"CF training failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 executor = ThreadPoolExecutor(max_workers=4)
 
+@v1_router.post("/cf/fold-in/{kind}/{entity_id}")
+async def fold_in_cf_factors(kind: str, entity_id: str):
+    """Compute CF factors for a new user or job against the current factors, without retraining"""
+    if kind == 'user':
+        fold_in = cf_service.fold_in_user
+    elif kind == 'job':
+        fold_in = cf_service.fold_in_job
+    else:
+        raise HTTPException(status_code=400, detail="kind must be 'user' or 'job'")
+
+    try:
+        loop = asyncio.get_event_loop()
+        factors, used = await loop.run_in_executor(executor, fold_in, entity_id)
+    except Exception as e:
+        logger.error(f"CF fold-in failed for {kind} {entity_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if factors is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No interactions with factorized {'jobs' if kind == 'user' else 'users'} for {kind} {entity_id}",
+        )
+    return {"status": "success", kind + "Id": entity_id, "interactions": used, "dimension": len(factors)}
+
 @v1_router.post("/recommendations", response_model=RecommendationResponse)
 async def get_recommendations(request: RecommendationRequest):
     """Get job recommendations for a user"""
@@ -267,7 +325,7 @@ async def generate_job_embedding_by_id(job_id: str):
             WHERE j.id = %s
         """
         
-        results = db.execute_query(query, (job_id,))
+        results = await async_db.execute_query(query, (job_id,))
         if not results:
             raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
         
@@ -279,17 +337,14 @@ async def generate_job_embedding_by_id(job_id: str):
         if not job_text.strip():
             raise HTTPException(status_code=400, detail="Job has no text content")
         
-        # Generate embedding
-        embedding = embedding_service.encode_text(job_text)
-        
-        # Upsert into database
-        upsert_query = """
-            INSERT INTO job_content_embeddings ("jobId", embedding)
-            VALUES (%s, %s::jsonb)
-            ON CONFLICT ("jobId") 
-            DO UPDATE SET embedding = EXCLUDED.embedding
-        """
-        db.execute_update(upsert_query, (job_id, json.dumps(embedding.tolist())))
+        # Generate embedding (batched with concurrent requests, off the event loop)
+        loop = asyncio.get_event_loop()
+        embedding = await embedding_service.encode_text_async(job_text)
+        
+        # Upsert into database (JSONB + pgvector column)
+        await embedding_store.save_job_embedding_async(job_id, embedding)
+        await loop.run_in_executor(executor, job_vector_index.upsert, job_id, embedding)
+        await loop.run_in_executor(executor, cache_invalidator.invalidate_job, job_id, False, "job.embedding_updated")
         
         return {
             "status": "success",
@@ -316,8 +371,6 @@ async def generate_user_embedding_by_id(user_id: str):
             WHERE cp."userId" = %s
             LIMIT 1
         """
-        profile_result = db.execute_query(profile_query, (user_id,))
-        profile_data = profile_result[0] if profile_result else {}
         
         # Fetch work experiences
         work_exp_query = """
@@ -330,7 +383,6 @@ async def generate_user_embedding_by_id(user_id: str):
             WHERE cp."userId" = %s
             ORDER BY we."startDate" DESC
         """
-        work_experiences = db.execute_query(work_exp_query, (user_id,))
         
         # Fetch education
         edu_query = """
@@ -344,7 +396,6 @@ async def generate_user_embedding_by_id(user_id: str):
             WHERE cp."userId" = %s
             ORDER BY e."graduationDate" DESC NULLS LAST, e."startDate" DESC
         """
-        educations = db.execute_query(edu_query, (user_id,))
         
         # Fetch user preferences
         pref_query = """
@@ -357,8 +408,6 @@ async def generate_user_embedding_by_id(user_id: str):
             WHERE up."userId" = %s
             LIMIT 1
         """
-        pref_result = db.execute_query(pref_query, (user_id,))
-        preferences = pref_result[0] if pref_result else {}
         
         # Fetch recent job interactions
         interaction_query = """
@@ -372,7 +421,17 @@ async def generate_user_embedding_by_id(user_id: str):
             ORDER BY j.title, ji."createdAt" DESC
             LIMIT 5
         """
-        interactions = db.execute_query(interaction_query, (user_id,))
+        
+        # Independent lookups: run them concurrently on separate pooled connections
+        profile_result, work_experiences, educations, pref_result, interactions = await asyncio.gather(
+            async_db.execute_query(profile_query, (user_id,)),
+            async_db.execute_query(work_exp_query, (user_id,)),
+            async_db.execute_query(edu_query, (user_id,)),
+            async_db.execute_query(pref_query, (user_id,)),
+            async_db.execute_query(interaction_query, (user_id,)),
+        )
+        profile_data = profile_result[0] if profile_result else {}
+        preferences = pref_result[0] if pref_result else {}
         
         # Build user data dict
         user_data = {
@@ -392,17 +451,14 @@ async def generate_user_embedding_by_id(user_id: str):
         if not user_text.strip():
             raise HTTPException(status_code=400, detail="User has no profile data")
         
-        # Generate embedding
-        embedding = embedding_service.encode_text(user_text)
-        
-        # Upsert into database
-        upsert_query = """
-            INSERT INTO user_content_embeddings ("userId", embedding)
-            VALUES (%s, %s::jsonb)
-            ON CONFLICT ("userId") 
-            DO UPDATE SET embedding = EXCLUDED.embedding
-        """
-        db.execute_update(upsert_query, (user_id, json.dumps(embedding.tolist())))
+        # Generate embedding (batched with concurrent requests, off the event loop)
+        embedding = await embedding_service.encode_text_async(user_text)
+        
+        # Upsert into database (JSONB + pgvector column)
+        await embedding_store.save_user_embedding_async(user_id, embedding)
+        await asyncio.get_event_loop().run_in_executor(
+            executor, cache_invalidator.invalidate_user, user_id, "user.embedding_updated"
+        )
         
         return {
             "status": "success",
@@ -483,18 +539,22 @@ async def health_check():
     """Health check endpoint"""
     return HealthResponse(status="healthy", version=settings.app_version)
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once this worker has finished startup warmup, 503 before"""
+    status = lifecycle.readiness.status()
+    return JSONResponse(status_code=200 if status['ready'] else 503, content=status)
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize heavy services on startup (non-blocking)"""
-    import asyncio
-    
-    async def init_services():
-        logger.info("Initializing services...")
-        pass
-    
-    asyncio.create_task(init_services())
+    """Initialize heavy services on startup (non-blocking; /ready flips when done)"""
+    asyncio.create_task(lifecycle.startup(executor))
     logger.info("Server starting...")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await lifecycle.shutdown()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
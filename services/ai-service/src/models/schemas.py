@@ -59,6 +59,13 @@ class CandidateRecommendationResponse(BaseModel):
     userIds: List[str]
     scores: List[float]
 
+class CacheInvalidationRequest(BaseModel):
+    userIds: List[str] = []  # applied, saved, hid a company, edited profile
+    jobIds: List[str] = []  # content changed: vectors are reloaded
+    removedJobIds: List[str] = []  # closed or deleted
+    all: bool = False
+    reason: Optional[str] = None  # e.g. "user.applied", for logs only
+
 # Matching Score Calculation Schemas
 class JobData(BaseModel):
     id: str
@@ -0,0 +1,541 @@
+"""
+Alternating Least Squares matrix factorization over sparse user-job interactions.
+
+Interactions are held in CSR (by user) and CSC (by job) form built with
+plain NumPy, so memory and per-iteration time scale with the number of
+observed interactions rather than users x jobs.
+
+Each half-iteration solves rows in fixed-size blocks of stacked normal
+equations. With n_workers > 1 the blocks are sharded across a process pool
+that attaches the interaction arrays and both factor matrices through
+multiprocessing.shared_memory, so nothing larger than a block range is
+pickled per task. Blocks are the same regardless of worker count and each
+row is written by exactly one block, so results are bit-for-bit identical
+between serial and parallel runs for a given seed.
+"""
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CompressedAxis:
+    """One compressed view (CSR rows or CSC columns) of the interaction matrix"""
+    indptr: np.ndarray   # (n + 1,) offsets into indices/data
+    indices: np.ndarray  # (nnz,) opposite-axis index of each entry
+    data: np.ndarray     # (nnz,) interaction weight
+
+    def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+
+def _compress(major: np.ndarray, minor: np.ndarray, data: np.ndarray, n_major: int) -> _CompressedAxis:
+    order = np.lexsort((minor, major))
+    counts = np.bincount(major, minlength=n_major)
+    indptr = np.zeros(n_major + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return _CompressedAxis(indptr=indptr, indices=minor[order], data=data[order])
+
+
+class InteractionMatrix:
+    """Sparse user x job interaction matrix with both CSR and CSC access"""
+
+    def __init__(self, interactions: Dict[Tuple[str, str], float]):
+        # Only positive weights count as observed entries
+        observed = [(uid, jid, w) for (uid, jid), w in interactions.items() if w > 0]
+
+        self.user_ids: List[str] = sorted({uid for uid, _, _ in observed})
+        self.job_ids: List[str] = sorted({jid for _, jid, _ in observed})
+        self.user_to_idx = {uid: i for i, uid in enumerate(self.user_ids)}
+        self.job_to_idx = {jid: i for i, jid in enumerate(self.job_ids)}
+
+        self.rows = np.fromiter((self.user_to_idx[uid] for uid, _, _ in observed), dtype=np.int64, count=len(observed))
+        self.cols = np.fromiter((self.job_to_idx[jid] for _, jid, _ in observed), dtype=np.int64, count=len(observed))
+        self.data = np.fromiter((w for _, _, w in observed), dtype=np.float32, count=len(observed))
+
+        self.by_user = _compress(self.rows, self.cols, self.data, self.n_users)
+        self.by_job = _compress(self.cols, self.rows, self.data, self.n_jobs)
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_jobs(self) -> int:
+        return len(self.job_ids)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+
+# Arrays attached by each pool worker: {'model', 'axes': {side: axis}, 'factors': {side: matrix}}
+_worker_state: Dict[str, Any] = {}
+
+
+def _attach(spec: Tuple[str, tuple, str], segments: list) -> np.ndarray:
+    name, shape, dtype = spec
+    segment = shared_memory.SharedMemory(name=name)
+    segments.append(segment)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+
+def _init_worker(model: "ALSMatrixFactorization", specs: Dict[str, Tuple[str, tuple, str]]) -> None:
+    segments = []
+    arrays = {key: _attach(spec, segments) for key, spec in specs.items()}
+    _worker_state.update(
+        model=model,
+        segments=segments,  # keep the mappings alive for the worker's lifetime
+        axes={
+            side: _CompressedAxis(arrays[f"{side}_indptr"], arrays[f"{side}_indices"], arrays[f"{side}_data"])
+            for side in ('user', 'job')
+        },
+        factors={'user': arrays['U'], 'job': arrays['V']},
+    )
+
+
+def _solve_block_task(side: str, context: np.ndarray, start: int, end: int) -> None:
+    """Pool task: solve rows [start, end) of `side` in place in the shared factor matrix"""
+    fixed_side = 'job' if side == 'user' else 'user'
+    _worker_state['model']._solve_block(
+        _worker_state['axes'][side],
+        _worker_state['factors'][fixed_side],
+        _worker_state['factors'][side],
+        start,
+        end,
+        context,
+    )
+
+
+class _SharedMemorySolver:
+    """Process pool whose workers see the interaction matrix and factors through shared memory"""
+
+    def __init__(self, model: "ALSMatrixFactorization", matrix: InteractionMatrix, U: np.ndarray, V: np.ndarray):
+        self.model = model
+        self._segments: List[shared_memory.SharedMemory] = []
+        arrays = {'U': U, 'V': V}
+        for side, axis in (('user', matrix.by_user), ('job', matrix.by_job)):
+            arrays.update({f"{side}_indptr": axis.indptr, f"{side}_indices": axis.indices, f"{side}_data": axis.data})
+
+        specs, shared = {}, {}
+        for key, array in arrays.items():
+            specs[key], shared[key] = self._share(array)
+        self.U, self.V = shared['U'], shared['V']
+        self.axes = {'user': matrix.by_user, 'job': matrix.by_job}
+
+        # spawn: forking a process that may be running server threads is not safe
+        self.executor = ProcessPoolExecutor(
+            max_workers=model.n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model, specs),
+        )
+
+    def _share(self, array: np.ndarray) -> Tuple[Tuple[str, tuple, str], np.ndarray]:
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._segments.append(segment)
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+        shared[...] = array
+        return (segment.name, array.shape, array.dtype.str), shared
+
+    def solve(self, side: str, context: np.ndarray) -> None:
+        """Solve every block of `side` across the pool and wait for all of them"""
+        futures = [
+            self.executor.submit(_solve_block_task, side, context, start, end)
+            for start, end in self.model._blocks(len(self.axes[side]))
+        ]
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        # Drop our views before releasing the buffers they point into
+        self.U = self.V = None
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+
+class ALSMatrixFactorization:
+    """Alternating Least Squares for Matrix Factorization"""
+
+    def __init__(
+        self,
+        n_factors: int = 64,
+        n_iterations: int = 15,
+        regularization: float = 0.1,
+        seed: int = 42,
+        n_workers: int = 1,
+        block_size: int = 256,
+        tolerance: float = 0.0,
+        holdout_fraction: float = 0.0,
+    ):
+        """
+        Args:
+            n_factors: Number of latent factors (dimension of factor vectors)
+            n_iterations: Maximum number of ALS iterations
+            regularization: Regularization parameter (lambda)
+            seed: Seed for the random factor initialization
+            n_workers: Processes solving row blocks in parallel (1 = in-process)
+            block_size: Rows per stacked solve / pool task
+            tolerance: Stop when the monitored loss improves by less than this
+                relative amount in an iteration (0 = always run n_iterations)
+            holdout_fraction: Fraction of interactions held out of training and
+                monitored instead of the training loss (0 = monitor training loss)
+        """
+        self.n_factors = n_factors
+        self.n_iterations = n_iterations
+        self.regularization = regularization
+        self.seed = seed
+        self.n_workers = max(1, n_workers)
+        self.block_size = max(1, block_size)
+        self.tolerance = tolerance
+        self.holdout_fraction = holdout_fraction
+        self.history: List[Dict[str, Optional[float]]] = []
+
+    def _blocks(self, n_rows: int) -> List[Tuple[int, int]]:
+        return [(start, min(start + self.block_size, n_rows)) for start in range(0, n_rows, self.block_size)]
+
+    def _block_context(self, fixed: np.ndarray) -> np.ndarray:
+        """Per half-iteration term shared by every row solve (here lambda I)"""
+        return np.eye(self.n_factors) * self.regularization
+
+    def _solve_block(
+        self, axis: _CompressedAxis, fixed: np.ndarray, out: np.ndarray, start: int, end: int, context: np.ndarray
+    ) -> None:
+        """Solve (F_i^T F_i + lambda I) x = F_i^T r_i for rows [start, end) as one stacked system"""
+        rows = [i for i in range(start, end) if axis.indptr[i + 1] > axis.indptr[i]]
+        if not rows:
+            return
+        A = np.empty((len(rows), self.n_factors, self.n_factors))
+        b = np.empty((len(rows), self.n_factors))
+        for k, i in enumerate(rows):
+            indices, ratings = axis.row(i)
+            subset = fixed[indices]
+            A[k] = subset.T @ subset + context
+            b[k] = subset.T @ ratings
+        try:
+            out[rows] = np.linalg.solve(A, b[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            # Fallback to pseudo-inverse for the singular systems of this block
+            for k, i in enumerate(rows):
+                try:
+                    out[i] = np.linalg.solve(A[k], b[k])
+                except np.linalg.LinAlgError:
+                    out[i] = np.linalg.pinv(A[k]) @ b[k]
+
+    def _solve_rows(
+        self,
+        axis: _CompressedAxis,
+        fixed: np.ndarray,
+        out: np.ndarray,
+        solver: Optional[_SharedMemorySolver] = None,
+        side: str = 'user',
+    ) -> None:
+        """Update every row of `out` against the fixed opposite factors, block by block"""
+        context = self._block_context(fixed)
+        if solver is not None:
+            solver.solve(side, context)
+            return
+        for start, end in self._blocks(len(axis)):
+            self._solve_block(axis, fixed, out, start, end, context)
+
+    def fold_in(self, fixed: np.ndarray, weights: np.ndarray, gram: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Factors for one new row against fixed opposite factors, without retraining
+
+        Args:
+            fixed: (n, f) factors of the items (or users) the new row interacted with
+            weights: (n,) interaction weights aligned with fixed
+            gram: F^T F over the whole opposite matrix (unused by explicit ALS)
+
+        Returns:
+            (f,) float32 factor vector
+        """
+        fixed = np.asarray(fixed, dtype=np.float64)
+        A = fixed.T @ fixed + np.eye(fixed.shape[1]) * self.regularization
+        b = fixed.T @ np.asarray(weights, dtype=np.float64)
+        try:
+            return np.linalg.solve(A, b).astype(np.float32)
+        except np.linalg.LinAlgError:
+            return (np.linalg.pinv(A) @ b).astype(np.float32)
+
+    @staticmethod
+    def observed_loss(matrix: InteractionMatrix, U: np.ndarray, V: np.ndarray) -> float:
+        """Squared error over observed entries only"""
+        predictions = np.einsum('ij,ij->i', U[matrix.rows], V[matrix.cols])
+        return float(np.sum((matrix.data - predictions) ** 2))
+
+    def loss(self, matrix: InteractionMatrix, U: np.ndarray, V: np.ndarray) -> float:
+        """Training objective reported while fitting"""
+        return self.observed_loss(matrix, U, V)
+
+    def holdout_loss(self, U: np.ndarray, V: np.ndarray, rows: np.ndarray, cols: np.ndarray, data: np.ndarray) -> float:
+        """Mean squared error on held-out interactions"""
+        predictions = np.einsum('ij,ij->i', U[rows], V[cols])
+        return float(np.mean((data - predictions) ** 2))
+
+    def _split_holdout(
+        self, interactions: Dict[Tuple[str, str], float]
+    ) -> Tuple[Dict[Tuple[str, str], float], Dict[Tuple[str, str], float]]:
+        """Hold out a seeded random fraction of interactions whose user and job stay in training"""
+        keys = sorted(key for key, weight in interactions.items() if weight > 0)
+        mask = np.random.RandomState(self.seed + 1).random_sample(len(keys)) < self.holdout_fraction
+        held = {key for key, out in zip(keys, mask) if out}
+        train = {key: weight for key, weight in interactions.items() if key not in held}
+
+        train_users = {uid for (uid, _), weight in train.items() if weight > 0}
+        train_jobs = {jid for (_, jid), weight in train.items() if weight > 0}
+        holdout = {}
+        for uid, jid in held:
+            if uid in train_users and jid in train_jobs:
+                holdout[(uid, jid)] = interactions[(uid, jid)]
+            else:
+                # Cannot be scored without factors for both sides
+                train[(uid, jid)] = interactions[(uid, jid)]
+        return train, holdout
+
+    @staticmethod
+    def _warm_start(out: np.ndarray, ids: List[str], initial: Optional[Dict[str, np.ndarray]]) -> int:
+        """Overwrite rows of out with previously trained factors of matching dimension"""
+        if not initial:
+            return 0
+        reused = 0
+        for i, key in enumerate(ids):
+            vector = initial.get(key)
+            if vector is not None and len(vector) == out.shape[1]:
+                out[i] = vector
+                reused += 1
+        return reused
+
+    def fit(
+        self,
+        interactions: Dict[Tuple[str, str], float],
+        initial_user_factors: Optional[Dict[str, np.ndarray]] = None,
+        initial_job_factors: Optional[Dict[str, np.ndarray]] = None,
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        Fit ALS model on user-job interactions
+
+        Args:
+            interactions: Dictionary mapping (user_id, job_id) -> weight
+            initial_user_factors: Previous user factors to warm-start from (other ids start random)
+            initial_job_factors: Previous job factors to warm-start from
+
+        Returns:
+            Tuple of (user_factors, job_factors) dictionaries
+        """
+        logger.info(f"Training {type(self).__name__} with {len(interactions)} interactions, {self.n_factors} factors")
+
+        holdout = {}
+        if self.holdout_fraction > 0:
+            interactions, holdout = self._split_holdout(interactions)
+            logger.info(f"Holding out {len(holdout)} interactions for early stopping")
+
+        matrix = InteractionMatrix(interactions)
+        logger.info(f"Found {matrix.n_users} users and {matrix.n_jobs} jobs ({matrix.nnz} observed entries)")
+
+        holdout_rows = np.array([matrix.user_to_idx[uid] for uid, _ in holdout], dtype=np.int64)
+        holdout_cols = np.array([matrix.job_to_idx[jid] for _, jid in holdout], dtype=np.int64)
+        holdout_data = np.array(list(holdout.values()), dtype=np.float32)
+
+        # Initialize factor matrices randomly, then reuse previous factors where available
+        rng = np.random.RandomState(self.seed)
+        U = rng.normal(0, 0.1, (matrix.n_users, self.n_factors)).astype(np.float32)
+        V = rng.normal(0, 0.1, (matrix.n_jobs, self.n_factors)).astype(np.float32)
+        warm_users = self._warm_start(U, matrix.user_ids, initial_user_factors)
+        warm_jobs = self._warm_start(V, matrix.job_ids, initial_job_factors)
+        if warm_users or warm_jobs:
+            logger.info(f"Warm start: {warm_users}/{matrix.n_users} users, {warm_jobs}/{matrix.n_jobs} jobs")
+
+        def monitored(U: np.ndarray, V: np.ndarray) -> Tuple[float, Optional[float]]:
+            train_loss = self.loss(matrix, U, V)
+            if not holdout:
+                return train_loss, None
+            return train_loss, self.holdout_loss(U, V, holdout_rows, holdout_cols, holdout_data)
+
+        self.history = []
+        solver = None
+        if self.n_workers > 1 and matrix.nnz > 0:
+            solver = _SharedMemorySolver(self, matrix, U, V)
+            U, V = solver.U, solver.V
+            logger.info(f"Solving {self.block_size}-row blocks on {self.n_workers} worker processes")
+
+        try:
+            train_loss, holdout_loss = monitored(U, V)
+            previous = holdout_loss if holdout else train_loss
+            for iteration in range(self.n_iterations):
+                started = time.perf_counter()
+                # Update user factors (fix V, solve for U), then job factors (fix U, solve for V)
+                self._solve_rows(matrix.by_user, V, U, solver, 'user')
+                self._solve_rows(matrix.by_job, U, V, solver, 'job')
+                elapsed = time.perf_counter() - started
+
+                train_loss, holdout_loss = monitored(U, V)
+                self.history.append(
+                    {'iteration': iteration + 1, 'loss': train_loss, 'holdout_loss': holdout_loss, 'seconds': elapsed}
+                )
+                logger.info(
+                    f"Iteration {iteration + 1}/{self.n_iterations} ({elapsed:.2f}s), Error: {train_loss:.2f}"
+                    + (f", Holdout: {holdout_loss:.4f}" if holdout else "")
+                )
+
+                # Stop once the monitored loss improves by less than tolerance (relative)
+                current = holdout_loss if holdout else train_loss
+                improvement = (previous - current) / max(abs(previous), 1e-12)
+                previous = current
+                if self.tolerance > 0 and improvement < self.tolerance:
+                    logger.info(f"Converged after {iteration + 1} iterations (improvement {improvement:.2e})")
+                    break
+        finally:
+            if solver is not None:
+                # Copy out of shared memory before it is released
+                U, V = U.copy(), V.copy()
+                solver.close()
+
+        # Convert back to dictionaries
+        user_factors = {uid: U[i, :] for i, uid in enumerate(matrix.user_ids)}
+        job_factors = {jid: V[j, :] for j, jid in enumerate(matrix.job_ids)}
+
+        return user_factors, job_factors
+
+
+class ImplicitALS(ALSMatrixFactorization):
+    """
+    Implicit-feedback ALS (Hu, Koren & Volinsky 2008).
+
+    Every user-job cell is a preference p = 1 if observed else 0, weighted by
+    confidence c = 1 + alpha * weight. The dense part of each normal equation
+    is shared (F^T F), so a row only pays for its own nonzeros, and the system
+    is solved approximately with a few conjugate-gradient steps warm-started
+    from the previous iterate.
+    """
+
+    def __init__(
+        self,
+        n_factors: int = 64,
+        n_iterations: int = 15,
+        regularization: float = 0.1,
+        seed: int = 42,
+        alpha: float = 1.0,
+        cg_steps: int = 3,
+        n_workers: int = 1,
+        block_size: int = 256,
+        tolerance: float = 0.0,
+        holdout_fraction: float = 0.0,
+    ):
+        """
+        Args:
+            alpha: Confidence scaling of interaction weights
+            cg_steps: Conjugate-gradient steps per row and iteration
+        """
+        super().__init__(
+            n_factors, n_iterations, regularization, seed, n_workers, block_size, tolerance, holdout_fraction
+        )
+        self.alpha = alpha
+        self.cg_steps = cg_steps
+
+    def _block_context(self, fixed: np.ndarray) -> np.ndarray:
+        """F^T F + lambda I, shared by every row of the half-iteration"""
+        return (fixed.T @ fixed).astype(np.float64) + np.eye(self.n_factors) * self.regularization
+
+    def _solve_block(
+        self, axis: _CompressedAxis, fixed: np.ndarray, out: np.ndarray, start: int, end: int, context: np.ndarray
+    ) -> None:
+        """CG on (F^T C_i F + lambda I) x = F^T C_i p_i for rows [start, end)"""
+        FtF = context
+        for i in range(start, end):
+            indices, weights = axis.row(i)
+            if len(indices) == 0:
+                continue
+            subset = fixed[indices].astype(np.float64)
+            confidence = 1.0 + self.alpha * weights.astype(np.float64)
+            x = out[i].astype(np.float64)
+
+            # Residual b - Ax with A x = FtF x + F_i^T ((c - 1) * (F_i x)) and b = F_i^T c
+            residual = subset.T @ (confidence - (confidence - 1.0) * (subset @ x)) - FtF @ x
+            direction = residual.copy()
+            rs_old = residual @ residual
+            for _ in range(self.cg_steps):
+                if rs_old < 1e-20:
+                    break
+                Ap = FtF @ direction + subset.T @ ((confidence - 1.0) * (subset @ direction))
+                step = rs_old / (direction @ Ap)
+                x += step * direction
+                residual -= step * Ap
+                rs_new = residual @ residual
+                direction = residual + (rs_new / rs_old) * direction
+                rs_old = rs_new
+            out[i] = x
+
+    def fold_in(self, fixed: np.ndarray, weights: np.ndarray, gram: Optional[np.ndarray] = None) -> np.ndarray:
+        """Exact solve of the implicit normal equations; needs gram = F^T F over every opposite row"""
+        if gram is None:
+            raise ValueError("Implicit ALS fold-in requires the Gram matrix of the fixed factors")
+        fixed = np.asarray(fixed, dtype=np.float64)
+        confidence = 1.0 + self.alpha * np.asarray(weights, dtype=np.float64)
+        A = gram + fixed.T @ ((confidence - 1.0)[:, None] * fixed) + np.eye(fixed.shape[1]) * self.regularization
+        b = fixed.T @ confidence
+        return np.linalg.solve(A, b).astype(np.float32)
+
+    def loss(self, matrix: InteractionMatrix, U: np.ndarray, V: np.ndarray) -> float:
+        """
+        Confidence-weighted squared error over all cells plus L2 penalty, in
+        O(nnz * f + (users + jobs) * f^2): the unobserved-cell term is
+        sum (u.v)^2 = trace(U^T U V^T V), corrected on the observed cells.
+        """
+        U64, V64 = U.astype(np.float64), V.astype(np.float64)
+        predictions = np.einsum('ij,ij->i', U64[matrix.rows], V64[matrix.cols])
+        confidence = 1.0 + self.alpha * matrix.data.astype(np.float64)
+        all_cells = np.sum((U64.T @ U64) * (V64.T @ V64))
+        observed = np.sum(confidence * (1.0 - predictions) ** 2 - predictions ** 2)
+        penalty = self.regularization * (np.sum(U64 ** 2) + np.sum(V64 ** 2))
+        return float(all_cells + observed + penalty)
+
+    def holdout_loss(self, U: np.ndarray, V: np.ndarray, rows: np.ndarray, cols: np.ndarray, data: np.ndarray) -> float:
+        """Mean confidence-weighted error of predicting preference 1 on held-out interactions"""
+        predictions = np.einsum('ij,ij->i', U[rows], V[cols])
+        confidence = 1.0 + self.alpha * data
+        return float(np.mean(confidence * (1.0 - predictions) ** 2))
+
+
+# Multipliers applied to job_interactions.weight per interaction type
+INTERACTION_TYPE_WEIGHTS = {
+    'view': 1.0,
+    'save': 2.0,
+    'favorite': 3.0,
+    'apply': 5.0,
+}
+
+
+def interaction_weight(interaction_type: Optional[str], weight: Optional[float]) -> float:
+    """Training weight of one job_interactions row (base weight x type multiplier)"""
+    interaction_type = interaction_type.lower() if interaction_type else 'view'
+    base_weight = float(weight) if weight else 1.0
+    return base_weight * INTERACTION_TYPE_WEIGHTS.get(interaction_type, 1.0)
+
+
+CF_MODELS = {
+    'als': ALSMatrixFactorization,
+    'implicit': ImplicitALS,
+}
+
+
+def create_cf_model(model: str = "als", **kwargs) -> ALSMatrixFactorization:
+    """Instantiate a CF trainer by name ("als" for explicit weights, "implicit" for confidence-weighted)"""
+    model_class = CF_MODELS.get(model.lower())
+    if model_class is None:
+        raise ValueError(f"Unknown CF model: {model}. Options: {', '.join(CF_MODELS)}")
+    return model_class(**kwargs)
@@ -0,0 +1,419 @@
+"""
+Approximate nearest neighbour search over job embeddings (CPU only, NumPy).
+
+Two interchangeable backends, both scoring by inner product on L2-normalized
+vectors (i.e. cosine similarity):
+
+- IVFIndex: k-means coarse quantizer + inverted lists. Tune recall with `nprobe`.
+- HNSWIndex: hierarchical navigable small-world graph. Tune recall with `ef_search`.
+"""
+import heapq
+import logging
+import math
+import os
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def npz_path(path: str) -> str:
+    """Path with the .npz suffix np.savez would append"""
+    return path if path.endswith(".npz") else f"{path}.npz"
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first"""
+    if k <= 0 or scores.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < scores.size:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(scores.size)
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class BaseANNIndex(ABC):
+    """Common interface for ANN backends"""
+
+    backend: str = ""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @abstractmethod
+    def build(self, vectors: np.ndarray, ids: List[str]) -> "BaseANNIndex":
+        """Index vectors (one row per id). Vectors are normalized internally."""
+
+    @abstractmethod
+    def _search_rows(self, query: np.ndarray, k: int, **search_params) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row indices, scores) for the approximate top-k, best first"""
+
+    def search(self, query: np.ndarray, k: int, **search_params) -> Tuple[List[str], np.ndarray]:
+        """
+        Find approximate nearest neighbours of a query vector
+
+        Args:
+            query: Query embedding (need not be normalized)
+            k: Number of neighbours to return
+            search_params: Per-query override of the recall knob (nprobe / ef_search)
+
+        Returns:
+            Tuple of (ids, cosine similarities), best first
+        """
+        if not self.ids or k <= 0:
+            return [], np.zeros(0, dtype=np.float32)
+        query = _normalize(query)
+        rows, scores = self._search_rows(query, k, **search_params)
+        return [self.ids[i] for i in rows], scores
+
+    @abstractmethod
+    def _state(self) -> dict:
+        """Backend-specific arrays and parameters to persist"""
+
+    @abstractmethod
+    def _restore(self, state: dict) -> None:
+        """Inverse of _state"""
+
+    def save(self, path: str) -> str:
+        """
+        Persist the index to a .npz file
+
+        Written to a temporary file and renamed into place, so a concurrent
+        load() never sees a partial file.
+
+        Returns:
+            The path written (path with the .npz suffix)
+        """
+        path = npz_path(path)
+        staging = f"{path}.{os.getpid()}.tmp"
+        try:
+            # A file object keeps np.savez from appending another suffix
+            with open(staging, "wb") as f:
+                np.savez(
+                    f,
+                    backend=np.array(self.backend),
+                    ids=np.array(self.ids, dtype=str),
+                    vectors=self.vectors,
+                    **self._state(),
+                )
+            os.replace(staging, path)
+        except Exception:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+        return path
+
+    @staticmethod
+    def load(path: str) -> "BaseANNIndex":
+        """Load an index written by save(), whatever its backend"""
+        with np.load(npz_path(path)) as data:
+            state = {key: data[key] for key in data.files}
+        index = create_ann_index(str(state.pop('backend')))
+        index.ids = [str(i) for i in state.pop('ids')]
+        index.vectors = state.pop('vectors').astype(np.float32)
+        index._restore(state)
+        return index
+
+
+class IVFIndex(BaseANNIndex):
+    """Inverted-file index with a spherical k-means coarse quantizer"""
+
+    backend = "ivf"
+
+    def __init__(self, n_lists: int = None, nprobe: int = 8, n_iter: int = 20, seed: int = 42):
+        """
+        Args:
+            n_lists: Number of k-means clusters (default: ~sqrt(n))
+            nprobe: Clusters scanned per query; higher = better recall, slower
+            n_iter: k-means iterations
+            seed: Random seed for centroid initialisation
+        """
+        super().__init__()
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_rows = np.zeros(0, dtype=np.int64)
+
+    def build(self, vectors: np.ndarray, ids: List[str]) -> "IVFIndex":
+        vectors = _normalize(vectors)
+        n = vectors.shape[0]
+        self.ids = list(ids)
+        self.vectors = np.ascontiguousarray(vectors)
+        if n == 0:
+            return self
+
+        n_lists = min(self.n_lists or max(1, int(math.sqrt(n))), n)
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(n, size=n_lists, replace=False)].copy()
+
+        assignments = np.zeros(n, dtype=np.int64)
+        for _ in range(self.n_iter):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty clusters with random points
+                sums[empty] = vectors[rng.choice(n, size=int(empty.sum()), replace=False)]
+            centroids = _normalize(sums)
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.centroids = centroids.astype(np.float32)
+        self.list_rows = order.astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        logger.info(f"Built IVF index: {n} vectors, {n_lists} lists")
+        return self
+
+    def _search_rows(self, query: np.ndarray, k: int, nprobe: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probe = top_k_indices(self.centroids @ query, nprobe)
+        rows = np.concatenate([
+            self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe
+        ])
+        scores = self.vectors[rows] @ query
+        top = top_k_indices(scores, k)
+        return rows[top], scores[top]
+
+    def _state(self) -> dict:
+        return {
+            'params': np.array([self.n_lists or 0, self.nprobe, self.n_iter, self.seed], dtype=np.int64),
+            'centroids': self.centroids,
+            'list_offsets': self.list_offsets,
+            'list_rows': self.list_rows,
+        }
+
+    def _restore(self, state: dict) -> None:
+        n_lists, self.nprobe, self.n_iter, self.seed = (int(v) for v in state['params'])
+        self.n_lists = n_lists or None
+        self.centroids = state['centroids'].astype(np.float32)
+        self.list_offsets = state['list_offsets'].astype(np.int64)
+        self.list_rows = state['list_rows'].astype(np.int64)
+
+
+class HNSWIndex(BaseANNIndex):
+    """Hierarchical navigable small-world graph (Malkov & Yashunin)"""
+
+    backend = "hnsw"
+
+    def __init__(self, m: int = 16, ef_construction: int = 100, ef_search: int = 64, seed: int = 42):
+        """
+        Args:
+            m: Max neighbours per node on upper layers (2*m on layer 0)
+            ef_construction: Candidate list size while inserting
+            ef_search: Candidate list size while querying; higher = better recall, slower
+            seed: Random seed for level assignment
+        """
+        super().__init__()
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self.levels = np.zeros(0, dtype=np.int64)
+        self.entry_point = -1
+        # links[level][node] -> neighbour rows; only nodes with levels[node] >= level are present
+        self.links: List[dict] = []
+
+    def _max_links(self, level: int) -> int:
+        return self.m * 2 if level == 0 else self.m
+
+    def build(self, vectors: np.ndarray, ids: List[str]) -> "HNSWIndex":
+        vectors = _normalize(vectors)
+        self.ids = list(ids)
+        self.vectors = np.ascontiguousarray(vectors)
+        n = vectors.shape[0]
+
+        rng = np.random.default_rng(self.seed)
+        level_mult = 1 / math.log(max(self.m, 2))
+        self.levels = np.floor(-np.log(1.0 - rng.random(n)) * level_mult).astype(np.int64)
+        self.links = []
+        self.entry_point = -1
+
+        for node in range(n):
+            self._insert(node)
+
+        if n:
+            logger.info(f"Built HNSW index: {n} vectors, {len(self.links)} layers")
+        return self
+
+    def _insert(self, node: int) -> None:
+        level = int(self.levels[node])
+        while len(self.links) <= level:
+            self.links.append({})
+        for lc in range(level + 1):
+            self.links[lc][node] = []
+
+        if self.entry_point < 0:
+            self.entry_point = node
+            return
+
+        query = self.vectors[node]
+        entry = self.entry_point
+        top_level = int(self.levels[entry])
+
+        # Greedy descent through layers above the node's own level
+        for lc in range(top_level, level, -1):
+            entry = self._greedy(query, entry, lc)
+
+        entries = [entry]
+        for lc in range(min(level, top_level), -1, -1):
+            candidates = self._search_layer(query, entries, self.ef_construction, lc)
+            neighbours = self._select_neighbours(candidates, self.m)
+            self.links[lc][node] = neighbours
+            max_links = self._max_links(lc)
+            for neighbour in neighbours:
+                links = self.links[lc][neighbour]
+                links.append(node)
+                if len(links) > max_links:
+                    sims = self.vectors[links] @ self.vectors[neighbour]
+                    self.links[lc][neighbour] = self._select_neighbours(list(zip(sims.tolist(), links)), max_links)
+            entries = [row for _, row in candidates]
+
+        if level > top_level:
+            self.entry_point = node
+
+    def _greedy(self, query: np.ndarray, entry: int, level: int) -> int:
+        best = entry
+        best_sim = float(self.vectors[entry] @ query)
+        improved = True
+        while improved:
+            improved = False
+            links = self.links[level][best]
+            if not links:
+                break
+            sims = self.vectors[links] @ query
+            i = int(np.argmax(sims))
+            if sims[i] > best_sim:
+                best, best_sim = links[i], float(sims[i])
+                improved = True
+        return best
+
+    def _search_layer(self, query: np.ndarray, entries: List[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        """Best-first search on one layer; returns up to ef (similarity, row) pairs, best first"""
+        visited = set(entries)
+        entry_sims = (self.vectors[entries] @ query).tolist()
+        candidates = [(-s, e) for s, e in zip(entry_sims, entries)]  # max-heap by similarity
+        results = [(s, e) for s, e in zip(entry_sims, entries)]  # min-heap of the best ef
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        layer = self.links[level]
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if -neg_sim < results[0][0] and len(results) >= ef:
+                break
+            fresh = [n for n in layer[node] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            sims = (self.vectors[fresh] @ query).tolist()
+            for sim, neighbour in zip(sims, fresh):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbour))
+                    heapq.heappush(results, (sim, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _select_neighbours(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """Diversity heuristic: keep a candidate only if it is closer to the base than to any kept neighbour"""
+        if len(candidates) <= m:
+            return [row for _, row in sorted(candidates, reverse=True)]
+        ordered = sorted(candidates, reverse=True)
+        rows = [row for _, row in ordered]
+        base_sims = np.array([sim for sim, _ in ordered], dtype=np.float32)
+        vectors = self.vectors[rows]
+        pairwise = vectors @ vectors.T
+
+        # dominated[j]: some already-selected neighbour is closer to j than the base is
+        dominated = np.zeros(len(rows), dtype=bool)
+        selected: List[int] = []
+        pruned: List[int] = []
+        for i in range(len(rows)):
+            if len(selected) >= m:
+                break
+            if dominated[i]:
+                pruned.append(i)
+                continue
+            selected.append(i)
+            dominated |= pairwise[i] > base_sims
+        # Top up with the best pruned candidates so nodes keep enough links
+        selected.extend(pruned[:m - len(selected)])
+        return [rows[i] for i in selected]
+
+    def _search_rows(self, query: np.ndarray, k: int, ef_search: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        entry = self.entry_point
+        for lc in range(int(self.levels[entry]), 0, -1):
+            entry = self._greedy(query, entry, lc)
+        results = self._search_layer(query, [entry], max(ef_search or self.ef_search, k), 0)[:k]
+        rows = np.array([row for _, row in results], dtype=np.int64)
+        scores = np.array([sim for sim, _ in results], dtype=np.float32)
+        return rows, scores
+
+    def _state(self) -> dict:
+        state = {
+            'params': np.array([self.m, self.ef_construction, self.ef_search, self.seed, self.entry_point], dtype=np.int64),
+            'levels': self.levels,
+        }
+        # Flatten each layer's adjacency into CSR arrays over all rows
+        n = len(self.ids)
+        for lc, layer in enumerate(self.links):
+            counts = np.zeros(n, dtype=np.int64)
+            for node, links in layer.items():
+                counts[node] = len(links)
+            flat = [row for node in range(n) for row in layer.get(node, [])]
+            state[f'offsets_{lc}'] = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            state[f'links_{lc}'] = np.array(flat, dtype=np.int64)
+        return state
+
+    def _restore(self, state: dict) -> None:
+        self.m, self.ef_construction, self.ef_search, self.seed, self.entry_point = (int(v) for v in state['params'])
+        self.levels = state['levels'].astype(np.int64)
+        self.links = []
+        lc = 0
+        while f'offsets_{lc}' in state:
+            offsets = state[f'offsets_{lc}']
+            flat = state[f'links_{lc}'].tolist()
+            nodes = np.nonzero(self.levels >= lc)[0]
+            self.links.append({int(node): flat[offsets[node]:offsets[node + 1]] for node in nodes})
+            lc += 1
+
+
+_BACKENDS = {
+    IVFIndex.backend: IVFIndex,
+    HNSWIndex.backend: HNSWIndex,
+}
+
+
+def create_ann_index(backend: str, **kwargs) -> BaseANNIndex:
+    """Instantiate an (empty) ANN index for the given backend name"""
+    try:
+        return _BACKENDS[backend.lower()](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown ANN backend: {backend}. Supported: {', '.join(_BACKENDS)}")
+
+
+def build_ann_index(backend: str, vectors: np.ndarray, ids: List[str], **kwargs) -> BaseANNIndex:
+    """Create and build an index in one step"""
+    return create_ann_index(backend, **kwargs).build(vectors, ids)
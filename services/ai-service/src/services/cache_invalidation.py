@@ -0,0 +1,229 @@
+"""
+Event-driven invalidation of recommendation and similar-jobs caches.
+
+Producers (the main backend, or this service's own endpoints) send an
+invalidation message either to POST /v1/cache/invalidate or straight to
+the Redis pub/sub channel (settings.cache_invalidation_channel):
+
+    {"id": "...", "userIds": [...], "jobIds": [...], "removedJobIds": [...],
+     "all": false, "reason": "user.applied"}
+
+Every worker subscribes and applies the message:
+
+    - local effects, in every worker: reload updated job vectors and drop
+      removed jobs from the in-process job vector index
+    - shared effects, once per message (the first worker to claim its id):
+      bump the user:<id> / job:<id> / global generations in
+      RecommendationCache, and patch the precomputed similar-jobs graph
+      for updated and removed jobs
+
+Messages without an id have their shared effects applied by every worker,
+which is redundant but harmless.
+"""
+import json
+import logging
+import threading
+import uuid
+from typing import Any, Dict, Optional
+import redis
+from ..config import settings
+from .embedding_cache import get_cache
+from .recommendation_cache import get_recommendation_cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds a message id stays claimed (longer than any redelivery we expect)
+CLAIM_TTL_SECONDS = 300
+RECONNECT_SECONDS = 5
+
+
+def _normalize(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': message.get('id'),
+        'userIds': [str(user_id) for user_id in message.get('userIds') or []],
+        'jobIds': [str(job_id) for job_id in message.get('jobIds') or []],
+        'removedJobIds': [str(job_id) for job_id in message.get('removedJobIds') or []],
+        'all': bool(message.get('all')),
+        'reason': message.get('reason'),
+    }
+
+
+class CacheInvalidator:
+    """Publishes invalidation messages and applies them in every worker"""
+
+    def __init__(self, channel: str = None):
+        self.channel = channel or settings.cache_invalidation_channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listening = threading.Event()
+        self.applied = 0
+
+    @property
+    def is_listening(self) -> bool:
+        return self._listening.is_set()
+
+    def invalidate(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Publish a message to every worker (applied here directly when nobody is subscribed)
+
+        Returns:
+            {'id', 'receivers', 'applied': result of apply() if applied here}
+        """
+        message = _normalize(message)
+        message['id'] = message['id'] or uuid.uuid4().hex
+        receivers = 0
+        cache = get_cache()
+        if cache is not None:
+            try:
+                receivers = cache.redis_client.publish(self.channel, json.dumps(message))
+            except redis.RedisError as e:
+                logger.warning(f"Failed to publish cache invalidation: {e}")
+        result = {'id': message['id'], 'receivers': receivers}
+        if not receivers:
+            result['applied'] = self.apply(message)
+        return result
+
+    def invalidate_user(self, user_id: str, reason: str = None) -> Dict[str, Any]:
+        return self.invalidate({'userIds': [user_id], 'reason': reason})
+
+    def invalidate_job(self, job_id: str, removed: bool = False, reason: str = None) -> Dict[str, Any]:
+        key = 'removedJobIds' if removed else 'jobIds'
+        return self.invalidate({key: [job_id], 'reason': reason})
+
+    def apply(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a message in this process: shared effects if claimed, local effects always"""
+        message = _normalize(message)
+        claimed = self._claim(message['id'])
+        # Local first: the graph update searches the reloaded job vectors
+        reloaded, removed = self._evict_job_vectors(message)
+        bumped = self._bump_generations(message) if claimed else 0
+        patched = self._update_similar_jobs_graph(message) if claimed else 0
+        self.applied += 1
+        logger.info(
+            f"Cache invalidation {message['id'] or '-'} ({message['reason'] or 'unspecified'}): "
+            f"{bumped} generations bumped, {reloaded} job vectors reloaded, {removed} removed, "
+            f"{patched} similar-jobs rows updated"
+        )
+        return {
+            'generationsBumped': bumped,
+            'jobVectorsReloaded': reloaded,
+            'jobVectorsRemoved': removed,
+            'similarJobsUpdated': patched,
+        }
+
+    def _claim(self, message_id: Optional[str]) -> bool:
+        """True if this process should apply the shared effects of the message"""
+        cache = get_recommendation_cache()
+        if cache is None or not message_id:
+            # Without Redis there is no pub/sub either: the message only reaches this worker
+            return True
+        try:
+            claim_key = f"{cache.key_prefix}invalidation:{message_id}"
+            return bool(cache.redis_client.set(claim_key, b"1", nx=True, ex=CLAIM_TTL_SECONDS))
+        except redis.RedisError as e:
+            logger.warning(f"Redis error claiming invalidation {message_id}: {e}")
+            return True
+
+    def _bump_generations(self, message: Dict[str, Any]) -> int:
+        cache = get_recommendation_cache()
+        if cache is None:
+            return 0
+        if message['all']:
+            return int(bool(cache.clear_all()))
+        bumped = 0
+        for user_id in message['userIds']:
+            bumped += cache.delete(user_id)
+        for job_id in message['jobIds'] + message['removedJobIds']:
+            bumped += cache.delete_similar_jobs(job_id)
+        return bumped
+
+    def _update_similar_jobs_graph(self, message: Dict[str, Any]) -> int:
+        """Patch job_similar_jobs rows and drop cached similar-jobs lists of jobs whose rows changed"""
+        if not settings.precomputed_similar_jobs_enabled or message['all']:
+            return 0
+        from .precomputed_recommendations import precomputed_similar_jobs
+
+        changed, deleted = set(), 0
+        try:
+            for job_id in message['jobIds']:
+                changed.update(precomputed_similar_jobs.refresh_job(job_id))
+            if message['removedJobIds']:
+                precomputed_similar_jobs.delete(message['removedJobIds'])
+                deleted = len(message['removedJobIds'])
+        except Exception as e:
+            logger.warning(f"Failed to update the precomputed similar-jobs graph: {e}")
+        cache = get_recommendation_cache()
+        if cache is not None:
+            # The updated and removed jobs themselves were bumped by _bump_generations
+            for job_id in changed - set(message['jobIds']):
+                cache.delete_similar_jobs(job_id)
+        return len(changed) + deleted
+
+    def _evict_job_vectors(self, message: Dict[str, Any]):
+        from .embedding_service import embedding_service
+        from .job_vector_index import job_vector_index
+
+        if not job_vector_index.is_loaded:
+            return 0, 0
+        reloaded = removed = 0
+        for job_id in message['jobIds']:
+            embedding = embedding_service.get_job_embedding(job_id)
+            if embedding is not None and embedding.size > 0:
+                job_vector_index.upsert(job_id, embedding)
+                reloaded += 1
+            else:
+                job_vector_index.remove(job_id)
+                removed += 1
+        for job_id in message['removedJobIds']:
+            job_vector_index.remove(job_id)
+            removed += 1
+        return reloaded, removed
+
+    def start_listener(self) -> None:
+        """Subscribe to the invalidation channel in a daemon thread (one per worker)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            cache = get_cache()
+            if cache is None:
+                self._stop.wait(RECONNECT_SECONDS)
+                continue
+            # A dedicated connection: a subscribed socket cannot go back to the shared pool
+            client = redis.Redis(
+                host=cache.host,
+                port=cache.port,
+                password=cache.password,
+                db=cache.db,
+                socket_keepalive=True,
+            )
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                self._listening.set()
+                logger.info(f"Listening for cache invalidations on {self.channel}")
+                while not self._stop.is_set():
+                    event = pubsub.get_message(timeout=1.0)
+                    if event is None or event.get('type') != 'message':
+                        continue
+                    try:
+                        self.apply(json.loads(event['data']))
+                    except Exception as e:
+                        logger.error(f"Failed to apply cache invalidation: {e}", exc_info=True)
+            except redis.RedisError as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+                self._stop.wait(RECONNECT_SECONDS)
+            finally:
+                self._listening.clear()
+                pubsub.close()
+                client.close()
+
+
+cache_invalidator = CacheInvalidator()
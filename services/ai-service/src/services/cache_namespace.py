@@ -0,0 +1,135 @@
+"""
+Generation counters and hit/miss counters for the Redis caches.
+
+Invalidation never touches the cached entries: every entry records the
+generation(s) it was written under, and bumping a generation with one INCR
+makes all of them misses. Orphaned entries simply age out through their
+TTL, so neither invalidation nor stats has to SCAN the keyspace.
+
+    <prefix>:gen            global generation (clear everything)
+    <prefix>:gen:<scope>    per-scope generation, e.g. "user:<id>"
+    <prefix>:stats          hash of counters merged from every process
+
+Counters are kept in-process and folded into the shared hash with HINCRBY
+at most every flush_interval seconds (piggybacked on cache traffic), and
+once more when stats are read.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+class CacheGenerations:
+    """Global and per-scope generation counters under a key prefix"""
+
+    def __init__(self, redis_client, prefix: str, scope_ttl_seconds: int):
+        """
+        Args:
+            redis_client: Shared redis.Redis client
+            prefix: Key prefix of the cache (with or without trailing colon)
+            scope_ttl_seconds: Lifetime of a scope counter after its last bump.
+                Must exceed the longest entry TTL so an expired counter
+                cannot make entries from before the bump valid again.
+        """
+        self.redis_client = redis_client
+        self.prefix = prefix.rstrip(':')
+        self.scope_ttl_seconds = scope_ttl_seconds
+
+    @property
+    def global_key(self) -> str:
+        return f"{self.prefix}:gen"
+
+    def scope_key(self, scope: str) -> str:
+        return f"{self.prefix}:gen:{scope}"
+
+    def keys(self, scopes: List[str] = ()) -> List[str]:
+        """Counter keys to MGET alongside an entry: global first, then each scope"""
+        return [self.global_key] + [self.scope_key(scope) for scope in scopes]
+
+    @staticmethod
+    def parse(values) -> List[int]:
+        """Generations from an MGET reply for keys() (missing counters are 0)"""
+        return [int(value) if value is not None else 0 for value in values]
+
+    def current(self, scopes: List[str] = ()) -> List[int]:
+        return self.parse(self.redis_client.mget(self.keys(scopes)))
+
+    def bump(self, scope: Optional[str] = None) -> int:
+        """Invalidate everything (scope=None) or one scope; returns the new generation"""
+        if scope is None:
+            return int(self.redis_client.incr(self.global_key))
+        key = self.scope_key(scope)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.incr(key)
+        pipe.expire(key, self.scope_ttl_seconds)
+        return int(pipe.execute()[0])
+
+
+class CacheCounters:
+    """Per-process counters periodically merged into a Redis hash"""
+
+    def __init__(self, redis_client, hash_key: str, flush_interval: float = 10.0):
+        self.redis_client = redis_client
+        self.hash_key = hash_key
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[str, int] = {}
+        self._local: Dict[str, int] = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                if delta:
+                    self._pending[name] = self._pending.get(name, 0) + delta
+                    self._local[name] = self._local.get(name, 0) + delta
+
+    def _drain(self, force: bool) -> Dict[str, int]:
+        with self._lock:
+            if not self._pending or (not force and time.monotonic() - self._last_flush < self.flush_interval):
+                return {}
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            return pending
+
+    def flush(self, pipe=None, force: bool = False) -> None:
+        """
+        Add pending deltas to the shared hash if a flush is due
+
+        Args:
+            pipe: Pipeline to queue the HINCRBYs on (executed by the caller);
+                without one they are sent immediately
+            force: Flush regardless of flush_interval
+        """
+        pending = self._drain(force)
+        if not pending:
+            return
+        target = pipe if pipe is not None else self.redis_client.pipeline(transaction=False)
+        for name, delta in pending.items():
+            target.hincrby(self.hash_key, name, delta)
+        if pipe is None:
+            try:
+                target.execute()
+            except redis.RedisError as e:
+                logger.warning(f"Redis error flushing cache counters: {e}")
+                self.record(**pending)
+
+    def read(self) -> Dict[str, Dict[str, int]]:
+        """This process's counters and the merged totals across processes"""
+        self.flush(force=True)
+        merged = {
+            (name.decode() if isinstance(name, bytes) else name): int(value)
+            for name, value in self.redis_client.hgetall(self.hash_key).items()
+        }
+        with self._lock:
+            local = dict(self._local)
+        return {'process': local, 'total': merged}
+
+
+def hit_ratio(counts: Dict[str, int]) -> float:
+    lookups = counts.get('hits', 0) + counts.get('misses', 0)
+    return round(counts.get('hits', 0) / lookups, 4) if lookups else 0.0
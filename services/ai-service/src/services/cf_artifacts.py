@@ -0,0 +1,166 @@
+"""
+Versioned on-disk CF factor artifacts.
+
+Each training run writes one immutable version directory:
+
+    <root>/<version>/U.npy          (n_users, dim) float32
+    <root>/<version>/V.npy          (n_jobs, dim) float32
+    <root>/<version>/user_ids.json  row -> user id
+    <root>/<version>/job_ids.json   row -> job id
+    <root>/<version>/manifest.json  dim, iterations, loss, created_at, ...
+    <root>/LATEST                   name of the newest complete version
+
+A version is written under a temporary name and renamed into place before
+LATEST is replaced, so readers only ever see complete versions. Readers
+np.load the matrices with mmap_mode='r': every worker process maps the same
+page-cache pages instead of holding its own copy.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LATEST = "LATEST"
+MANIFEST = "manifest.json"
+
+
+def _write_json(path: Path, payload: Any) -> None:
+    with open(path, "w") as f:
+        json.dump(payload, f)
+
+
+def _stack(factors: Dict[str, np.ndarray], dim: int) -> np.ndarray:
+    if not factors:
+        return np.zeros((0, dim), dtype=np.float32)
+    return np.vstack(list(factors.values())).astype(np.float32, copy=False)
+
+
+def write_artifact(
+    root: str,
+    user_factors: Dict[str, np.ndarray],
+    job_factors: Dict[str, np.ndarray],
+    manifest: Optional[Dict[str, Any]] = None,
+    keep: int = 3,
+) -> str:
+    """
+    Write a new artifact version and point LATEST at it
+
+    Args:
+        root: Artifact root directory (created if missing)
+        user_factors: user id -> factor vector
+        job_factors: job id -> factor vector
+        manifest: Extra manifest fields (iterations, loss, model, ...)
+        keep: Number of versions to retain, including the new one
+
+    Returns:
+        Name of the new version
+    """
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+    first = next(iter(user_factors.values()), None)
+    if first is None:
+        first = next(iter(job_factors.values()), [])
+    dim = len(first)
+
+    created_at = datetime.now(timezone.utc)
+    version = created_at.strftime("%Y%m%dT%H%M%S%fZ")
+    suffix = 0
+    while (root_path / version).exists():
+        suffix += 1
+        version = f"{created_at.strftime('%Y%m%dT%H%M%S%fZ')}-{suffix}"
+    staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=root_path))
+    try:
+        np.save(staging / "U.npy", _stack(user_factors, dim))
+        np.save(staging / "V.npy", _stack(job_factors, dim))
+        _write_json(staging / "user_ids.json", list(user_factors))
+        _write_json(staging / "job_ids.json", list(job_factors))
+        _write_json(staging / MANIFEST, {
+            **(manifest or {}),
+            'version': version,
+            'dim': dim,
+            'n_users': len(user_factors),
+            'n_jobs': len(job_factors),
+            'created_at': created_at.isoformat(),
+        })
+        os.rename(staging, root_path / version)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Atomic pointer swap: readers see either the old or the new name
+    pointer = root_path / f".{LATEST}.{os.getpid()}"
+    pointer.write_text(version)
+    os.replace(pointer, root_path / LATEST)
+    logger.info(f"Wrote CF artifact {version} ({len(user_factors)} users, {len(job_factors)} jobs)")
+
+    _prune(root_path, keep)
+    return version
+
+
+def _prune(root_path: Path, keep: int) -> None:
+    """Remove all but the newest `keep` versions (mapped files stay valid for open readers)"""
+    versions = list_versions(str(root_path))
+    for version in versions[:-max(keep, 1)]:
+        shutil.rmtree(root_path / version, ignore_errors=True)
+
+
+def list_versions(root: str) -> List[str]:
+    """Complete versions under root, oldest first"""
+    root_path = Path(root)
+    if not root_path.is_dir():
+        return []
+    return sorted(
+        entry.name for entry in root_path.iterdir()
+        if entry.is_dir() and not entry.name.startswith(".") and (entry / MANIFEST).exists()
+    )
+
+
+def latest_version(root: str) -> Optional[str]:
+    """Version named by LATEST, or None if nothing has been published"""
+    try:
+        version = (Path(root) / LATEST).read_text().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+class CFArtifact:
+    """One loaded artifact version with O(1) id -> factor row lookup"""
+
+    def __init__(self, root: str, version: str):
+        path = Path(root) / version
+        with open(path / MANIFEST) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        with open(path / "user_ids.json") as f:
+            user_ids = json.load(f)
+        with open(path / "job_ids.json") as f:
+            job_ids = json.load(f)
+
+        self.version = version
+        self.loaded_at = time.time()
+        self.U = np.load(path / "U.npy", mmap_mode="r")
+        self.V = np.load(path / "V.npy", mmap_mode="r")
+        self.user_index = {uid: i for i, uid in enumerate(user_ids)}
+        self.job_index = {jid: i for i, jid in enumerate(job_ids)}
+
+    @property
+    def dim(self) -> int:
+        return int(self.manifest['dim'])
+
+    def user_vector(self, user_id: str) -> Optional[np.ndarray]:
+        """Read-only view of the user's factors (no copy)"""
+        row = self.user_index.get(user_id)
+        return None if row is None else np.asarray(self.U[row])
+
+    def job_vector(self, job_id: str) -> Optional[np.ndarray]:
+        """Read-only view of the job's factors (no copy)"""
+        row = self.job_index.get(job_id)
+        return None if row is None else np.asarray(self.V[row])
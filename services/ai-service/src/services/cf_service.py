@@ -1,62 +1,355 @@
 import numpy as np
 import logging
-from typing import Optional
-import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from ..config import settings
 from ..database import db
+from ..utils.vector_codec import decode_vector, encode_vector, row_vector, vector_select
+from .als import create_cf_model, interaction_weight
+from .cf_artifacts import CFArtifact, list_versions
+from .embedding_store import JOB_CF_FACTORS, USER_CF_FACTORS, VectorTable, embedding_store
 
 logger = logging.getLogger(__name__)
 
 
+def cf_model_params(model: str) -> dict:
+    """Hyperparameters for create_cf_model() from settings"""
+    params = {
+        'n_factors': settings.cf_factors_dim,
+        'n_iterations': settings.cf_iterations,
+        'regularization': settings.cf_regularization,
+        'n_workers': settings.cf_n_workers,
+        'block_size': settings.cf_block_size,
+        'tolerance': settings.cf_tolerance,
+        'holdout_fraction': settings.cf_holdout_fraction,
+    }
+    if model.lower() == 'implicit':
+        params.update(alpha=settings.cf_implicit_alpha, cg_steps=settings.cf_cg_steps)
+    return params
+
+
 class CollaborativeFilteringService:
-    def __init__(self):
-        pass
-    
+    """
+    CF factor lookups and fold-in.
+
+    Factors are served from the memory-mapped training artifact (see
+    cf_artifacts.py) whose version is recorded in the database, and from the
+    database for ids the artifact does not contain or that were folded in
+    since that training run.
+    """
+
+    def __init__(self, artifact_dir: str = None):
+        # F^T F of the raw factors of each kind, needed by implicit fold-in, with the
+        # recorded version it was computed for and when (see _gram_matrix)
+        self._gram: Dict[str, Tuple[Optional[str], float, np.ndarray]] = {}
+        self._gram_lock = threading.Lock()
+
+        self.artifact_dir = artifact_dir or settings.cf_artifact_dir
+        self._artifact: Optional[CFArtifact] = None
+        self._artifact_checked = float('-inf')
+        self._artifact_lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._version_checked = float('-inf')
+        # Ids folded in since the current artifact's version was recorded, by kind
+        self._folded: Dict[str, Set[str]] = {'user': set(), 'job': set()}
+
+    def artifact(self) -> Optional[CFArtifact]:
+        """
+        Current factor artifact, re-checked periodically
+
+        The local artifact is used only while its version is the newest one
+        recorded in cf_factor_versions; a pod whose disk lags behind (or is
+        ahead of) the database reads factors from the database instead.
+        """
+        if not settings.cf_artifacts_enabled:
+            return None
+        if time.monotonic() - self._artifact_checked < settings.cf_artifact_check_interval:
+            return self._artifact
+
+        with self._artifact_lock:
+            now = time.monotonic()
+            if now - self._artifact_checked < settings.cf_artifact_check_interval:
+                return self._artifact
+            self._artifact_checked = now
+            try:
+                recorded = self._recorded_version()
+                if recorded is None or recorded[0] not in list_versions(self.artifact_dir):
+                    if self._artifact is not None:
+                        logger.warning(f"CF artifact {self._artifact.version} is no longer the recorded version, reading the database")
+                    self._artifact = None
+                else:
+                    version, created_at = recorded
+                    folded = self._folded_ids(created_at)
+                    if self._artifact is None or self._artifact.version != version:
+                        # Readers holding the old artifact keep a valid mapping; swap is one assignment
+                        self._artifact = CFArtifact(self.artifact_dir, version)
+                        logger.info(f"Loaded CF artifact {version} (dim={self._artifact.dim})")
+                    self._folded = folded
+            except Exception as e:
+                logger.error(f"Error loading CF artifact from {self.artifact_dir}: {e}")
+                self._artifact = None
+        return self._artifact
+
+    def _recorded_version(self) -> Optional[Tuple[str, datetime]]:
+        """Newest (version, createdAt) in cf_factor_versions, or None"""
+        results = db.execute_query(
+            'SELECT version, "createdAt" FROM cf_factor_versions ORDER BY "createdAt" DESC LIMIT 1'
+        )
+        if not results:
+            return None
+        return results[0]['version'], results[0]['createdAt']
+
+    def _folded_ids(self, since: datetime) -> Dict[str, Set[str]]:
+        """Ids folded in at or after since, by kind ('user' / 'job')"""
+        folded = {'user': set(), 'job': set()}
+        query = 'SELECT kind, "entityId" FROM cf_fold_ins WHERE "foldedAt" >= %s'
+        for row in db.execute_query(query, (since,)):
+            folded.setdefault(row['kind'], set()).add(str(row['entityId']))
+        return folded
+
+    def record_version(self, version: str) -> None:
+        """
+        Make an artifact version authoritative (call once its factors are in the database)
+
+        Fold-ins recorded before it are superseded by the new factors.
+        """
+        with db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    'INSERT INTO cf_factor_versions (version) VALUES (%s) '
+                    'ON CONFLICT (version) DO UPDATE SET "createdAt" = NOW() RETURNING "createdAt"',
+                    (version,),
+                )
+                created_at = cur.fetchone()[0]
+                cur.execute('DELETE FROM cf_fold_ins WHERE "foldedAt" < %s', (created_at,))
+
+    def _record_fold_in(self, kind: str, key: str) -> None:
+        """Serve a folded-in id from the database from now on, on every pod"""
+        self._folded.setdefault(kind, set()).add(key)
+        try:
+            db.execute_update(
+                """
+                INSERT INTO cf_fold_ins (kind, "entityId") VALUES (%s, %s)
+                ON CONFLICT (kind, "entityId") DO UPDATE SET "foldedAt" = NOW()
+                """,
+                (kind, key),
+            )
+        except Exception as e:
+            logger.warning(f"Error recording CF fold-in of {kind} {key}: {e}")
+
+    def _artifact_factors(self, kind: str, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Artifact rows for keys, skipping ids folded in after the artifact was trained"""
+        artifact = self.artifact()
+        if artifact is None:
+            return {}
+        folded = self._folded.get(kind, ())
+        lookup = artifact.user_vector if kind == 'user' else artifact.job_vector
+        found = {}
+        for key in keys:
+            if key not in folded:
+                factors = lookup(key)
+                if factors is not None:
+                    found[key] = factors
+        return found
+
     def get_job_cf_factors(self, job_id: str) -> Optional[np.ndarray]:
-        """Get job CF factors from database"""
+        """Get job CF factors (artifact first, then database)"""
+        factors = self._artifact_factors('job', [job_id]).get(job_id)
+        if factors is not None:
+            return factors
         try:
-            query = """
-                SELECT factors
+            query = f"""
+                SELECT {vector_select('factors', 'factorsBin')}
                 FROM job_cf_factors
                 WHERE "jobId" = %s
             """
             results = db.execute_query(query, (job_id,))
-            if results and results[0]['factors']:
-                factors_data = results[0]['factors']
-                if isinstance(factors_data, list):
-                    factors_list = factors_data
-                elif isinstance(factors_data, str):
-                    factors_list = json.loads(factors_data)
-                else:
-                    factors_list = factors_data
-                return np.array(factors_list, dtype=np.float32)
+            if results:
+                return row_vector(results[0], 'factors', 'factorsBin')
             return None
         except Exception as e:
             logger.error(f"Error getting job CF factors for {job_id}: {e}", exc_info=True)
             return None
     
     def get_user_cf_factors(self, user_id: str) -> Optional[np.ndarray]:
-        """Get user CF factors from database"""
+        """Get user CF factors (artifact first, then database)"""
+        factors = self._artifact_factors('user', [user_id]).get(user_id)
+        if factors is not None:
+            return factors
         try:
-            query = """
-                SELECT factors
+            query = f"""
+                SELECT {vector_select('factors', 'factorsBin')}
                 FROM user_cf_factors
                 WHERE "userId" = %s
             """
             results = db.execute_query(query, (user_id,))  # Fixed: was 'result'
-            if results and results[0]['factors']:
-                factors_data = results[0]['factors']
-                if isinstance(factors_data, list):
-                    factors_list = factors_data
-                elif isinstance(factors_data, str):
-                    factors_list = json.loads(factors_data)
-                else:
-                    factors_list = factors_data
-                return np.array(factors_list, dtype=np.float32)
+            if results:
+                return row_vector(results[0], 'factors', 'factorsBin')
             return None
         except Exception as e:
             logger.error(f"Error getting user CF factors for {user_id}: {e}")
             return None
     
+    def get_job_cf_factors_batch(self, job_ids: List[str]) -> Dict[str, np.ndarray]:
+        """CF factors for many jobs: artifact rows, plus one database query for the rest"""
+        found = self._artifact_factors('job', job_ids)
+        missing = [job_id for job_id in job_ids if job_id not in found]
+        if missing:
+            found.update(self._load_factors(JOB_CF_FACTORS, missing))
+        return found
+
+    def get_user_cf_factors_batch(self, user_ids: List[str]) -> Dict[str, np.ndarray]:
+        """CF factors for many users: artifact rows, plus one database query for the rest"""
+        found = self._artifact_factors('user', user_ids)
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if missing:
+            found.update(self._load_factors(USER_CF_FACTORS, missing))
+        return found
+
+    def _load_interactions(self, key_column: str, key: str) -> Dict[str, float]:
+        """Aggregated interaction weights of one user (by job) or one job (by user)"""
+        other_column = 'jobId' if key_column == 'userId' else 'userId'
+        query = f"""
+            SELECT "{other_column}", type, weight
+            FROM job_interactions
+            WHERE "{key_column}" = %s AND "createdAt" IS NOT NULL
+        """
+        weights = defaultdict(float)
+        for row in db.execute_query(query, (key,)):
+            weights[str(row[other_column])] += interaction_weight(row['type'], row['weight'])
+        return {other: weight for other, weight in weights.items() if weight > 0}
+
+    def _load_factors(self, target: VectorTable, keys) -> Dict[str, np.ndarray]:
+        query = f"""
+            SELECT "{target.key_column}", {vector_select(target.json_column, target.bin_column)}
+            FROM {target.table}
+            WHERE "{target.key_column}" = ANY(%s::uuid[])
+        """
+        results = db.execute_query(query, (list(keys),))
+        factors = {
+            str(row[target.key_column]): row_vector(row, target.json_column, target.bin_column) for row in results
+        }
+        return {key: vector for key, vector in factors.items() if vector is not None}
+
+    def load_raw_factors(self, kind: str, keys: List[str] = None) -> Dict[str, np.ndarray]:
+        """Unnormalized factors ('user' / 'job') of the last training run and fold-ins since, keyed by id"""
+        query = 'SELECT "entityId", "factorsBin" FROM cf_raw_factors WHERE kind = %s'
+        params = (kind,)
+        if keys is not None:
+            query += ' AND "entityId" = ANY(%s::uuid[])'
+            params = (kind, list(keys))
+        return {str(row['entityId']): decode_vector(row['factorsBin']) for row in db.execute_query(query, params)}
+
+    def save_raw_factors(self, kind: str, factors: Dict[str, np.ndarray]) -> int:
+        """Upsert unnormalized factors ('user' / 'job'); returns rows written"""
+        rows = ((kind, key, encode_vector(vector)) for key, vector in factors.items())
+        return db.bulk_upsert(
+            "cf_raw_factors", ["kind", "entityId", "factorsBin"], rows, conflict_columns=["kind", "entityId"]
+        )
+
+    def _gram_matrix(self, kind: str) -> np.ndarray:
+        """
+        F^T F over every raw factor of a kind
+
+        Cached per recorded training version (re-checked every
+        cf_artifact_check_interval); without a recorded version the cache
+        simply expires after that interval.
+        """
+        version = self._current_version()
+        with self._gram_lock:
+            cached = self._gram.get(kind)
+            if cached is not None:
+                cached_version, computed_at, gram = cached
+                fresh = time.monotonic() - computed_at < settings.cf_artifact_check_interval
+                if cached_version == version and (version is not None or fresh):
+                    return gram
+            query = 'SELECT "factorsBin" FROM cf_raw_factors WHERE kind = %s'
+            gram = np.zeros((settings.cf_factors_dim, settings.cf_factors_dim))
+            for row in db.execute_query(query, (kind,)):
+                vector = decode_vector(row['factorsBin'])
+                if len(vector) == settings.cf_factors_dim:
+                    gram += np.outer(vector, vector)
+            self._gram[kind] = (version, time.monotonic(), gram)
+            return gram
+
+    def _current_version(self) -> Optional[str]:
+        """Newest recorded version, re-read at most every cf_artifact_check_interval"""
+        now = time.monotonic()
+        if now - self._version_checked >= settings.cf_artifact_check_interval:
+            try:
+                recorded = self._recorded_version()
+                self._version = recorded[0] if recorded else None
+            except Exception as e:
+                logger.warning(f"Error reading the recorded CF version: {e}")
+                self._version = None
+            self._version_checked = now
+        return self._version
+
+    def invalidate(self) -> None:
+        """Drop state derived from the persisted factors (call after retraining)"""
+        with self._gram_lock:
+            self._gram.clear()
+        # Look for a new version and artifact on the next lookup
+        self._version_checked = float('-inf')
+        self._artifact_checked = float('-inf')
+
+    def _fold_in(self, weights: Dict[str, float], fixed_kind: str) -> Tuple[Optional[np.ndarray], int]:
+        """
+        ALS row solution against the raw opposite factors, as in training
+
+        Returns:
+            (raw factors or None, number of interacted ids with factors)
+        """
+        factors = self.load_raw_factors(fixed_kind, list(weights))
+        keys = [other for other in weights if other in factors]
+        if not keys:
+            return None, 0
+
+        model = create_cf_model(settings.cf_model, **cf_model_params(settings.cf_model))
+        gram = self._gram_matrix(fixed_kind) if settings.cf_model.lower() == 'implicit' else None
+        vector = model.fold_in(
+            np.vstack([factors[other] for other in keys]),
+            np.array([weights[other] for other in keys]),
+            gram,
+        )
+        return vector, len(keys)
+
+    def _save_fold_in(self, kind: str, key: str, raw: np.ndarray) -> np.ndarray:
+        """Persist a folded-in row: raw for later fold-ins and warm starts, L2-normalized for scoring"""
+        self.save_raw_factors(kind, {key: raw})
+        # Same L2 normalization as train_cf_factors
+        factors = raw / (np.linalg.norm(raw) + 1e-8)
+        if kind == 'user':
+            embedding_store.save_user_cf_factors(key, factors)
+        else:
+            embedding_store.save_job_cf_factors(key, factors)
+        self._record_fold_in(kind, key)
+        return factors
+
+    def fold_in_user(self, user_id: str) -> Tuple[Optional[np.ndarray], int]:
+        """
+        Compute and persist CF factors for a user from their interactions against the current job factors
+
+        Returns:
+            (factors or None if no interacted job has factors yet, number of interacted jobs used)
+        """
+        weights = self._load_interactions('userId', user_id)
+        raw, used = self._fold_in(weights, 'job')
+        if raw is None:
+            return None, used
+        return self._save_fold_in('user', user_id, raw), used
+
+    def fold_in_job(self, job_id: str) -> Tuple[Optional[np.ndarray], int]:
+        """Compute and persist CF factors for a job from its interactors against the current user factors"""
+        weights = self._load_interactions('jobId', job_id)
+        raw, used = self._fold_in(weights, 'user')
+        if raw is None:
+            return None, used
+        return self._save_fold_in('job', job_id, raw), used
+
     def dot_product(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Compute dot product for CF scoring"""
         if vec1 is None or vec2 is None:
@@ -1,19 +1,95 @@
 import hashlib
 import json
 import logging
+import struct
+import time
+import zlib
 import numpy as np
-import pickle
 from typing import Optional, Dict
 from threading import Lock
 import redis
 from redis.connection import ConnectionPool
 from ..config import settings
+from ..utils.vector_codec import decode_vector, encode_vector
+from .cache_namespace import CacheCounters, CacheGenerations, hit_ratio
+from .local_cache import LocalCache
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for EMBEDDING_CACHE_COMPRESSION=zstd
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
+# Redis value layout: 8-byte cache header followed by a vector_codec buffer
+# (itself 8-byte header + raw float32/float16), optionally zstd-compressed.
+#
+#     magic   2s   b"EC"
+#     version B    cache format version (1)
+#     flags   B    bit 0 = payload is zstd-compressed
+#     model   I    crc32 of the embedding model id; entries from another model are misses
+#
+# 16 bytes of overhead per vector instead of pickle's ~150, nothing is ever
+# unpickled, and uncompressed float32 payloads decode as a view of the reply.
+CACHE_MAGIC = b"EC"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<2sBBI")
+FLAG_ZSTD = 1
+
+
+def model_tag(model_id: str) -> int:
+    """32-bit fingerprint of an embedding model id"""
+    return zlib.crc32(model_id.encode('utf-8'))
+
+
+def pack_embedding(embedding: np.ndarray, tag: int, dtype: str = "float32", compression: str = "none",
+                   compress_min_dim: int = 0) -> bytes:
+    """Serialize an embedding for Redis (see CACHE_HEADER)"""
+    payload = encode_vector(embedding, dtype)
+    flags = 0
+    if compression == "zstd" and np.size(embedding) >= compress_min_dim:
+        if zstandard is None:
+            raise RuntimeError("EMBEDDING_CACHE_COMPRESSION=zstd requires the zstandard package")
+        payload = zstandard.ZstdCompressor().compress(payload)
+        flags |= FLAG_ZSTD
+    return CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, flags, tag) + payload
+
+
+def unpack_embedding(data: bytes, tag: int) -> Optional[np.ndarray]:
+    """
+    Decode a value written by pack_embedding
+
+    Returns:
+        float32 embedding, or None for entries in another format (including
+        legacy pickles) or from another model
+    """
+    if len(data) < CACHE_HEADER.size:
+        return None
+    magic, version, flags, entry_tag = CACHE_HEADER.unpack_from(data, 0)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or entry_tag != tag:
+        return None
+    payload = memoryview(data)[CACHE_HEADER.size:]
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Cached embedding is zstd-compressed but zstandard is not installed")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    return decode_vector(payload)
+
+
+def embedding_model_name() -> str:
+    """Model name of the configured embedding provider"""
+    provider = settings.embedding_provider.lower()
+    if provider == "openai":
+        return settings.openai_model or ""
+    if provider == "google":
+        return settings.google_model or ""
+    if provider in ("google-vertex", "vertex"):
+        return settings.google_vertex_model or ""
+    return settings.embedding_model
+
 
 class EmbeddingCache:
-    """Redis-based embeddings with efficient numpy array storage"""
+    """Redis-based embeddings stored in a compact binary format (see CACHE_HEADER)"""
     
     def __init__(
         self, 
@@ -44,8 +120,15 @@ class EmbeddingCache:
         self.db = int(db) if db is not None else int(settings.redis_db)
         self.ttl_seconds = ttl_seconds or settings.embedding_cache_ttl
         self.key_prefix = key_prefix or settings.embedding_cache_prefix
+        self.dtype = settings.embedding_cache_dtype
+        self.compression = settings.embedding_cache_compression
+        self.compress_min_dim = settings.embedding_cache_compress_min_dim
+        self.mget_chunk_size = max(1, settings.embedding_cache_mget_chunk)
+        self.model_tag = model_tag(f"{settings.embedding_provider}:{embedding_model_name()}")
+        if self.compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; caching embeddings uncompressed")
+            self.compression = "none"
 
-        
         if connection_pool:
             self.redis_client = redis.Redis(connection_pool=connection_pool)
         else: 
@@ -71,17 +154,53 @@ class EmbeddingCache:
         except redis.ConnectionError as e:
             logger.error(f"Failed to connect to Redis: {e}")
             raise
+        
+        self.generations = CacheGenerations(self.redis_client, self.key_prefix, scope_ttl_seconds=2 * self.ttl_seconds)
+        self.counters = CacheCounters(self.redis_client, f"{self.key_prefix.rstrip(':')}:stats")
+        self._known_generation: Optional[int] = None
+        self._generation_seen_at = float('-inf')  # monotonic time _known_generation was last confirmed
     
     def _hash_text(self, text: str) -> str:
         """Generate a hash for a text string"""
         return hashlib.md5(text.encode('utf-8')).hexdigest()
     
+    def _generation(self) -> int:
+        """Locally known cache generation (fetched once, then kept current by lookups)"""
+        if self._known_generation is None:
+            self._known_generation = self.generations.current()[0]
+            self._generation_seen_at = time.monotonic()
+        return self._known_generation
+    
+    def current_generation(self, max_age: float) -> int:
+        """Cache generation, re-read from Redis when not confirmed in the last max_age seconds"""
+        if time.monotonic() - self._generation_seen_at >= max_age:
+            try:
+                self._observe_generation(self.generations.current()[0])
+            except redis.RedisError as e:
+                logger.warning(f"Redis error reading cache generation: {e}")
+        return self._known_generation or 0
+    
+    def _observe_generation(self, value) -> bool:
+        """Adopt the generation returned alongside a lookup; False if it had moved on"""
+        generation = CacheGenerations.parse([value])[0]
+        self._generation_seen_at = time.monotonic()
+        if generation == self._known_generation:
+            return True
+        self._known_generation = generation
+        return False
+    
     def _make_key(self, text_hash: str) -> str: 
-        """Create a cache key from text hash and prefix"""
+        """Create a cache key from text hash, current generation and prefix"""
         # Remove trailing colon from prefix if present, then add it
         prefix = self.key_prefix.rstrip(':')
-        return f"{prefix}:{text_hash}"
+        return f"{prefix}:g{self._generation()}:{text_hash}"
     
+    def _encode(self, embedding: np.ndarray) -> bytes:
+        return pack_embedding(embedding, self.model_tag, self.dtype, self.compression, self.compress_min_dim)
+
+    def _decode(self, data: bytes) -> Optional[np.ndarray]:
+        return unpack_embedding(data, self.model_tag)
+
     def get(self, text: str) -> Optional[np.ndarray]:
         """
         Get cached embedding if available
@@ -90,27 +209,7 @@ class EmbeddingCache:
         Returns:
             Embedding if available, None otherwise
         """
-        try:
-            key = self._make_key(self._hash_text(text))
-            cached_data = self.redis_client.get(key)
-            
-            if cached_data is None:
-                return None
-            
-            embedding = pickle.loads(cached_data)
-            if not isinstance(embedding, np.ndarray):
-                logger.warning(f"Invalid cached data type for key: {key[:16]}...")
-                return None
-            
-            logger.debug(f"Cache hit for text hash: {key[len(self.key_prefix):16]}...")
-            return embedding.astype(np.float32)
-            
-        except redis.RedisError as e:
-            logger.warning(f"Redis error getting cache: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Error deserializing cached embedding: {e}")
-            return None
+        return self.get_many([text]).get(text)
     
     def set(self, text: str, embedding: np.ndarray, ttl: Optional[int] = None) -> bool:
         """
@@ -122,29 +221,14 @@ class EmbeddingCache:
         Returns:
             True if successful, False otherwise
         """
-        try:
-            key = self._make_key(self._hash_text(text))
-            
-            # Serialize numpy array
-            # Using pickle for numpy arrays (more efficient than JSON)
-            serialized = pickle.dumps(embedding.astype(np.float32), protocol=pickle.HIGHEST_PROTOCOL)
-            
-            # Store with TTL
-            ttl_to_use = ttl if ttl is not None else self.ttl_seconds
-            self.redis_client.setex(key, ttl_to_use, serialized)
-            
-            logger.debug(f"Cached embedding for text hash: {key[len(self.key_prefix):16]}...")
-            return True
-        except redis.RedisError as e:
-            logger.warning(f"Redis error setting cache: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Error serializing embedding for cache: {e}")
-            return False
+        return self.set_many({text: embedding}, ttl) == 1
 
     def get_many(self, texts: list) -> Dict[str, np.ndarray]:
         """
-        Get multiple cached embeddings efficiently using pipeline
+        Get multiple cached embeddings with one MGET per chunk of keys
+        
+        The generation counter rides along in the first MGET; if another
+        process invalidated the cache meanwhile, the lookup is a miss.
         
         Args:
             texts: List of texts to look up
@@ -157,31 +241,33 @@ class EmbeddingCache:
         
         try:
             # Create keys for all texts
-            text_hashes = {self._hash_text(text): text for text in texts}
-            keys = [self._make_key(hash_val) for hash_val in text_hashes.keys()]
-            
-            # Use pipeline for batch get
-            pipe = self.redis_client.pipeline()
-            for key in keys:
-                pipe.get(key)
-            results = pipe.execute()
+            keyed = {self._make_key(self._hash_text(text)): text for text in texts}
+            keys = list(keyed)
             
-            # Deserialize results
             cached = {}
-            for key, result in zip(keys, results):
-                if result is not None:
+            for start in range(0, len(keys), self.mget_chunk_size):
+                chunk = keys[start:start + self.mget_chunk_size]
+                if start == 0:
+                    generation, *results = self.redis_client.mget([self.generations.global_key] + chunk)
+                    if not self._observe_generation(generation):
+                        logger.info(f"Embedding cache generation is now {self._known_generation}")
+                        cached = {}
+                        break
+                else:
+                    results = self.redis_client.mget(chunk)
+                for key, result in zip(chunk, results):
+                    if result is None:
+                        continue
                     try:
-                        embedding = pickle.loads(result)
-                        if isinstance(embedding, np.ndarray):
-                            # Extract hash from key (remove prefix)
-                            prefix_len = len(self.key_prefix.rstrip(':')) + 1  # +1 for colon
-                            hash_val = key[prefix_len:]
-                            text = text_hashes[hash_val]
-                            cached[text] = embedding.astype(np.float32)
+                        embedding = self._decode(result)
                     except Exception as e:
-                        logger.warning(f"Error deserializing cached embedding: {e}")
+                        logger.warning(f"Error decoding cached embedding: {e}")
                         continue
+                    if embedding is not None:
+                        cached[keyed[key]] = embedding
             
+            self.counters.record(hits=len(cached), misses=len(keyed) - len(cached))
+            self.counters.flush()
             logger.debug(f"Cache batch get: {len(cached)}/{len(texts)} hits")
             return cached
             
@@ -209,14 +295,15 @@ class EmbeddingCache:
         try:
             ttl_to_use = ttl if ttl is not None else self.ttl_seconds
             
-            # Use pipeline for batch set
-            pipe = self.redis_client.pipeline()
+            # Use pipeline for batch set (no MULTI: entries are independent)
+            pipe = self.redis_client.pipeline(transaction=False)
             for text, embedding in text_embedding_pairs.items():
                 key = self._make_key(self._hash_text(text))
-                serialized = pickle.dumps(embedding.astype(np.float32), protocol=pickle.HIGHEST_PROTOCOL)
-                pipe.setex(key, ttl_to_use, serialized)
+                pipe.setex(key, ttl_to_use, self._encode(embedding))
             
-            results = pipe.execute()
+            self.counters.record(sets=len(text_embedding_pairs))
+            self.counters.flush(pipe)
+            results = pipe.execute()[:len(text_embedding_pairs)]
             success_count = sum(1 for r in results if r)
             
             logger.debug(f"Cached {success_count}/{len(text_embedding_pairs)} embeddings")
@@ -229,6 +316,19 @@ class EmbeddingCache:
             logger.error(f"Error in batch cache set: {e}")
             return 0
     
+    def remaining_ttls(self, texts: list) -> Dict[str, float]:
+        """Seconds until each text's entry expires, in one pipeline (texts without an entry are left out)"""
+        if not texts:
+            return {}
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for text in texts:
+                pipe.pttl(self._make_key(self._hash_text(text)))
+            return {text: ms / 1000 for text, ms in zip(texts, pipe.execute()) if ms is not None and ms > 0}
+        except redis.RedisError as e:
+            logger.warning(f"Redis error reading cache TTLs: {e}")
+            return {}
+
     def delete(self, text: str) -> bool:
         """Delete cached embedding"""
         try:
@@ -238,40 +338,41 @@ class EmbeddingCache:
             logger.warning(f"Redis error deleting cache: {e}")
             return False
     
-    def clear_pattern(self, pattern: str = None) -> int:
+    def clear(self) -> int:
         """
-        Clear cache entries matching pattern
+        Invalidate every cached embedding with a single INCR
+        
+        Entries from earlier generations are no longer addressed and expire
+        through their TTL.
         
-        Args:
-            pattern: Redis pattern (default: all embeddings)
-            
         Returns:
-            Number of keys deleted
+            The new generation
         """
         try:
-            if pattern is None:
-                pattern = f"{self.key_prefix.rstrip(':')}*"
-            
-            keys = list(self.redis_client.scan_iter(match=pattern))
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            self._known_generation = self.generations.bump()
+            self._generation_seen_at = time.monotonic()
+            logger.info(f"Embedding cache cleared (generation {self._known_generation})")
+            return self._known_generation
         except redis.RedisError as e:
             logger.warning(f"Redis error clearing cache: {e}")
-            return 0
+            return self._known_generation or 0
 
     def stats(self) -> Dict:
-        """Get cache statistics"""
+        """Get cache statistics (constant time: no keyspace scan)"""
         try:
-            pattern = f"{self.key_prefix.rstrip(':')}*"
-            keys = list(self.redis_client.scan_iter(match=pattern))
+            counters = self.counters.read()
             
             # Get memory usage (if available)
             info = self.redis_client.info('memory')
             memory_used = info.get('used_memory_human', 'N/A')
             
             return {
-                'total_keys': len(keys),
+                'generation': self.generations.current()[0],
+                'hits': counters['total'].get('hits', 0),
+                'misses': counters['total'].get('misses', 0),
+                'sets': counters['total'].get('sets', 0),
+                'hit_ratio': hit_ratio(counters['total']),
+                'process': counters['process'],
                 'memory_used': memory_used,
                 'ttl_seconds': self.ttl_seconds,
                 'key_prefix': self.key_prefix,
@@ -288,8 +389,149 @@ class EmbeddingCache:
             return False
 
 
+class TieredEmbeddingCache:
+    """
+    In-process LRU (L1) in front of the Redis EmbeddingCache (L2).
+
+    Lookups try L1 first and only go to Redis for the remainder; Redis hits
+    are promoted into L1 and writes go to both tiers. L1 keeps working when
+    Redis is disabled or unreachable. Entries expire from L1 no later than
+    they would from Redis, and L1 is emptied when the Redis generation moves
+    (EmbeddingCache.clear()).
+    """
+
+    def __init__(self, local: Optional[LocalCache], remote_getter=None):
+        """
+        Args:
+            local: L1 cache (None disables the tier)
+            remote_getter: Returns the Redis tier or None (default: get_cache)
+        """
+        self.local = local
+        self._remote_getter = remote_getter or get_cache
+        self._lock = Lock()
+        self._local_generation: Optional[int] = None  # Redis tier generation the L1 entries belong to
+        self._remote_hits = 0
+        self._remote_misses = 0
+
+    @property
+    def remote(self) -> Optional[EmbeddingCache]:
+        return self._remote_getter()
+
+    @staticmethod
+    def _key(text: str, generation: Optional[int]) -> tuple:
+        return generation, hashlib.md5(text.encode('utf-8')).hexdigest()
+
+    def _generation(self, remote: Optional[EmbeddingCache]) -> Optional[int]:
+        """
+        Redis tier generation for L1 keys (checked every EMBEDDING_L1_GENERATION_CHECK_SECONDS)
+
+        When EmbeddingCache.clear() moves it, in this or any other process,
+        L1 is emptied: its entries may come from the previous model.
+        """
+        if remote is None:
+            return self._local_generation
+        generation = remote.current_generation(settings.embedding_l1_generation_check_seconds)
+        with self._lock:
+            if generation != self._local_generation:
+                if self._local_generation is not None and self.local is not None:
+                    self.local.clear()
+                    logger.info(f"Embedding cache generation is now {generation}, cleared L1")
+                self._local_generation = generation
+        return generation
+
+    def _count_remote(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self._remote_hits += hits
+            self._remote_misses += misses
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text]).get(text)
+
+    def get_many(self, texts: list) -> Dict[str, np.ndarray]:
+        """Cache hits for texts, from L1 where possible and Redis for the rest"""
+        if not texts:
+            return {}
+        remote = self.remote
+        generation = self._generation(remote)
+        keys = {text: self._key(text, generation) for text in texts}
+
+        cached: Dict[str, np.ndarray] = {}
+        if self.local is not None:
+            local_hits = self.local.get_many(set(keys.values()))
+            cached = {text: local_hits[key] for text, key in keys.items() if key in local_hits}
+
+        missing = [text for text in keys if text not in cached]
+        if missing and remote is not None:
+            found = remote.get_many(missing)
+            self._count_remote(len(found), len(missing) - len(found))
+            if found and self.local is not None:
+                # Promoted entries expire from L1 when they do from Redis
+                for text, ttl in remote.remaining_ttls(list(found)).items():
+                    self.local.set(keys[text], found[text], ttl)
+            cached.update(found)
+        return cached
+
+    def set(self, text: str, embedding: np.ndarray, ttl: Optional[int] = None) -> bool:
+        return self.set_many({text: embedding}, ttl) > 0
+
+    def set_many(self, text_embedding_pairs: Dict[str, np.ndarray], ttl: Optional[int] = None) -> int:
+        """Write to both tiers; returns the number of items stored in the outermost available tier"""
+        if not text_embedding_pairs:
+            return 0
+        remote = self.remote
+        stored = 0
+        if remote is not None:
+            stored = remote.set_many(text_embedding_pairs, ttl)
+            ttl = min(ttl or remote.ttl_seconds, remote.ttl_seconds)
+        if self.local is not None:
+            generation = self._generation(remote)
+            self.local.set_many(
+                {self._key(text, generation): embedding for text, embedding in text_embedding_pairs.items()}, ttl
+            )
+            stored = stored or len(text_embedding_pairs)
+        return stored
+
+    def delete(self, text: str) -> bool:
+        remote = self.remote
+        deleted = self.local.delete(self._key(text, self._generation(remote))) if self.local is not None else False
+        if remote is not None:
+            deleted = remote.delete(text) or deleted
+        return deleted
+
+    def stats(self) -> Dict:
+        """Per-tier hit ratios for this process; 'hit_ratio' is the share of lookups served by either tier"""
+        local = self.local.stats() if self.local is not None else {'enabled': False}
+        with self._lock:
+            remote_hits, remote_misses = self._remote_hits, self._remote_misses
+        remote_lookups = remote_hits + remote_misses
+        remote = self.remote
+        l2 = {
+            'enabled': remote is not None,
+            'hits': remote_hits,
+            'misses': remote_misses,
+            'hit_ratio': round(remote_hits / remote_lookups, 4) if remote_lookups else 0.0,
+        }
+        if remote is not None:
+            # Counters merged across every worker, plus generation and memory
+            l2['all_processes'] = remote.stats()
+
+        lookups = local.get('hits', 0) + local.get('misses', 0) if self.local is not None else remote_lookups
+        hits = local.get('hits', 0) + remote_hits
+        return {
+            'enabled': True,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'l1': local,
+            'l2': l2,
+        }
+
+    def health_check(self) -> bool:
+        remote = self.remote
+        return remote.health_check() if remote is not None else self.local is not None
+
+
 # Global cache instance with thread-safe initialization
 _embedding_cache: Optional[EmbeddingCache] = None
+_tiered_cache: Optional[TieredEmbeddingCache] = None
 _cache_lock = Lock()
 
 
@@ -323,4 +565,26 @@ def get_cache() -> Optional[EmbeddingCache]:
             return None
 
         _embedding_cache = instance
-        return _embedding_cache
\ No newline at end of file
+        return _embedding_cache
+
+
+def get_tiered_cache() -> Optional[TieredEmbeddingCache]:
+    """Return the global L1 + Redis embedding cache (None if both tiers are disabled)"""
+    global _tiered_cache
+
+    if not (settings.embedding_l1_enabled or settings.embedding_cache_enabled):
+        return None
+
+    if _tiered_cache is not None:
+        return _tiered_cache
+
+    with _cache_lock:
+        if _tiered_cache is None:
+            local = None
+            if settings.embedding_l1_enabled:
+                ttl = settings.embedding_l1_ttl
+                if settings.embedding_cache_enabled:
+                    ttl = min(ttl, settings.embedding_cache_ttl)
+                local = LocalCache(int(settings.embedding_l1_max_mb * 1024 * 1024), ttl, name="embedding_l1")
+            _tiered_cache = TieredEmbeddingCache(local)
+        return _tiered_cache
@@ -1,39 +1,89 @@
+import asyncio
 import numpy as np
 import logging
+import threading
 from typing import List, Optional
-import json
 from ..config import settings
 from ..database import db
+from ..utils.vector_codec import row_vector, vector_select
 from .providers.factory import EmbeddingProviderFactory
 from .providers.base_embedding_provider import BaseEmbeddingProvider
-from .embedding_cache import get_cache
+from .embedding_cache import get_tiered_cache
+from .encode_batcher import EncodeBatcher
 
 logger = logging.getLogger(__name__)
 
 
 class EmbeddingService:
-    def __init__(self, use_cache: bool = None):
-        logger.info(f"Initializing EmbeddingService with provider: {settings.embedding_provider}")
-        self.provider: BaseEmbeddingProvider = EmbeddingProviderFactory.create_provider(
-            enable_fallback=False,      
-            fallback_to_local=False     
-        )
-        self.dim = self.provider.dimension        
-        # Use cache if enabled in settings
-        use_cache = use_cache if use_cache is not None else settings.embedding_cache_enabled
-        self.cache = get_cache() if use_cache else None
-        
-        if self.cache:
-            logger.info(f"EmbeddingService initialized with Redis cache. Dimension: {self.dim}")
-        else:
-            logger.info(f"EmbeddingService initialized without cache. Dimension: {self.dim}")
+    """
+    Text embeddings through the configured provider, cached in-process (L1)
+    and in Redis (L2).
+
+    Construction is free: the provider (model weights or API client) and the
+    Redis connection are created on first use, so importing the app does no
+    I/O. Call load() in the gunicorn master under --preload to share the
+    model weights copy-on-write, and warmup() in each worker before serving.
+    """
+
+    def __init__(self, use_cache: bool = None, use_batching: bool = None):
+        if use_cache is None:
+            use_cache = settings.embedding_cache_enabled or settings.embedding_l1_enabled
+        self.use_cache = use_cache
+        self._provider: Optional[BaseEmbeddingProvider] = None
+        self._provider_lock = threading.Lock()
+
+        use_batching = use_batching if use_batching is not None else settings.embedding_batching_enabled
+        # Single-text encodes from concurrent requests go through encode_texts() together
+        self.batcher = EncodeBatcher(
+            self.encode_texts,
+            max_batch_size=settings.embedding_batch_max_size,
+            max_wait_ms=settings.embedding_batch_max_wait_ms,
+        ) if use_batching else None
+
+    @property
+    def provider(self) -> BaseEmbeddingProvider:
+        if self._provider is None:
+            with self._provider_lock:
+                if self._provider is None:
+                    logger.info(f"Initializing embedding provider: {settings.embedding_provider}")
+                    self._provider = EmbeddingProviderFactory.create_provider(
+                        enable_fallback=False,
+                        fallback_to_local=False
+                    )
+                    logger.info(f"Embedding provider ready. Dimension: {self._provider.dimension}")
+        return self._provider
+
+    @property
+    def dim(self) -> int:
+        return self.provider.dimension
+
+    @property
+    def cache(self):
+        # The Redis tier connects once and retries later if Redis was unavailable
+        return get_tiered_cache() if self.use_cache else None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._provider is not None
+
+    def load(self) -> None:
+        """Create the provider now (loads local model weights)"""
+        self.provider
+
+    def warmup(self, texts: List[str] = None) -> None:
+        """Run encodes through the provider so the first request does not pay for lazy kernel/thread setup"""
+        texts = texts or ["warmup", "software engineer with python and sql experience"]
+        self.provider.encode(texts, normalize=True)
     
     def encode_text(self, text: str) -> np.ndarray:
-        """Encode text to embedding vector with Redis caching"""
+        """Encode text to embedding vector with L1/Redis caching (micro-batched with concurrent calls)"""
         if not text or not text.strip():
             return np.zeros(self.dim, dtype=np.float32)
         
-        # Check Redis cache first
+        if self.batcher:
+            return self.batcher.encode(text)
+        
+        # Check L1/Redis cache first
         if self.cache:
             cached = self.cache.get(text)
             if cached is not None:
@@ -42,20 +92,30 @@ class EmbeddingService:
         # Generate embedding
         embedding = self.provider.encode_single(text, normalize=True)
         
-        # Cache it in Redis
+        # Cache it in both tiers
         if self.cache:
             self.cache.set(text, embedding)
         
         return embedding
     
+    async def encode_text_async(self, text: str) -> np.ndarray:
+        """encode_text for async endpoints: awaits the batcher without tying up an executor thread"""
+        if not text or not text.strip():
+            return np.zeros(self.dim, dtype=np.float32)
+        if self.batcher:
+            return await asyncio.wrap_future(self.batcher.submit(text))
+        return await asyncio.get_running_loop().run_in_executor(None, self.encode_text, text)
+    
     def encode_texts(self, texts: List[str]) -> np.ndarray:
-        """Encode multiple texts to embeddings with efficient Redis batch caching"""
+        """Encode multiple texts to embeddings with efficient L1/Redis batch caching"""
         if not texts:
             return np.array([])
         
-        # Check Redis cache for all texts at once
+        # Check the cache for all texts at once
         if self.cache:
-            cached_dict = self.cache.get_many(texts)
+            # Empty texts are known zero vectors: never worth a Redis lookup or an encode
+            cached_dict = {t: np.zeros(self.dim, dtype=np.float32) for t in texts if not t.strip()}
+            cached_dict.update(self.cache.get_many([t for t in texts if t not in cached_dict]))
             
             # Separate cached and uncached texts
             texts_to_encode = [t for t in texts if t not in cached_dict]
@@ -99,21 +159,14 @@ class EmbeddingService:
     def get_job_embedding(self, job_id: str) -> Optional[np.ndarray]:
         """Get job embedding from database"""
         try:
-            query = """
-                SELECT embedding
+            query = f"""
+                SELECT {vector_select('embedding', 'embeddingBin')}
                 FROM job_content_embeddings
                 WHERE "jobId" = %s
             """
             results = db.execute_query(query, (job_id,))
-            if results and results[0]['embedding']:
-                emb_data = results[0]['embedding']
-                if isinstance(emb_data, list):
-                    emb_list = emb_data
-                elif isinstance(emb_data, str):
-                    emb_list = json.loads(emb_data)
-                else:
-                    emb_list = emb_data
-                return np.array(emb_list, dtype=np.float32)
+            if results:
+                return row_vector(results[0], 'embedding', 'embeddingBin')
             return None
         except Exception as e:
             logger.error(f"Error getting job embedding for {job_id}: {e}")
@@ -122,21 +175,14 @@ class EmbeddingService:
     def get_user_embedding(self, user_id: str) -> Optional[np.ndarray]:
         """Get user embedding from database"""
         try:
-            query = """
-                SELECT embedding
+            query = f"""
+                SELECT {vector_select('embedding', 'embeddingBin')}
                 FROM user_content_embeddings
                 WHERE "userId" = %s
             """
             results = db.execute_query(query, (user_id,))
-            if results and results[0]['embedding']:
-                emb_data = results[0]['embedding']
-                if isinstance(emb_data, list):
-                    emb_list = emb_data
-                elif isinstance(emb_data, str):
-                    emb_list = json.loads(emb_data)
-                else:
-                    emb_list = emb_data
-                return np.array(emb_list, dtype=np.float32)
+            if results:
+                return row_vector(results[0], 'embedding', 'embeddingBin')
             return None
         except Exception as e:
             logger.error(f"Error getting user embedding for {user_id}: {e}")
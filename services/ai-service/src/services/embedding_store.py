@@ -0,0 +1,111 @@
+import json
+import logging
+from typing import Dict, List, NamedTuple, Tuple
+import numpy as np
+from ..config import settings
+from ..database import db
+from ..async_database import async_db
+from ..utils.pgvector import to_pgvector
+from ..utils.vector_codec import encode_vector
+
+logger = logging.getLogger(__name__)
+
+
+class VectorTable(NamedTuple):
+    """Column layout of a table holding one vector per key"""
+    table: str
+    key_column: str
+    json_column: str
+    vector_column: str
+    bin_column: str
+
+
+JOB_EMBEDDINGS = VectorTable("job_content_embeddings", "jobId", "embedding", "embeddingVector", "embeddingBin")
+USER_EMBEDDINGS = VectorTable("user_content_embeddings", "userId", "embedding", "embeddingVector", "embeddingBin")
+JOB_CF_FACTORS = VectorTable("job_cf_factors", "jobId", "factors", "factorsVector", "factorsBin")
+USER_CF_FACTORS = VectorTable("user_cf_factors", "userId", "factors", "factorsVector", "factorsBin")
+
+
+class EmbeddingStore:
+    """Persists content embeddings and CF factors.
+
+    Every write goes to the JSONB column (still read by connect-career-be) and,
+    when enabled, to the native pgvector column used by the indexed queries and
+    the binary column read back by the ai-service.
+    """
+
+    def __init__(self, use_vector_columns: bool = None, use_binary_columns: bool = None):
+        self.use_vector_columns = (
+            use_vector_columns if use_vector_columns is not None else settings.pgvector_columns_enabled
+        )
+        self.use_binary_columns = (
+            use_binary_columns if use_binary_columns is not None else settings.binary_vectors_enabled
+        )
+
+    def _columns(self, target: VectorTable) -> List[str]:
+        columns = [target.key_column, target.json_column]
+        if self.use_vector_columns:
+            columns.append(target.vector_column)
+        if self.use_binary_columns:
+            columns.append(target.bin_column)
+        return columns
+
+    def _row(self, key: str, values: np.ndarray) -> tuple:
+        row = [key, json.dumps(values.tolist())]
+        if self.use_vector_columns:
+            row.append(to_pgvector(values))
+        if self.use_binary_columns:
+            row.append(encode_vector(values, settings.binary_vector_dtype))
+        return tuple(row)
+
+    def _upsert_statement(self, target: VectorTable, key: str, values: np.ndarray) -> Tuple[str, tuple]:
+        columns = [f'"{column}"' for column in self._columns(target)]
+        casts = {target.json_column: "::jsonb", target.vector_column: "::vector"}
+        placeholders = [f"%s{casts.get(column, '')}" for column in self._columns(target)]
+
+        updates = ",\n                              ".join(f"{column} = EXCLUDED.{column}" for column in columns[1:])
+        query = f"""
+                INSERT INTO {target.table} ({", ".join(columns)})
+                VALUES ({", ".join(placeholders)})
+                ON CONFLICT ("{target.key_column}")
+                DO UPDATE SET {updates}
+            """
+        return query, self._row(key, values)
+
+    def _upsert(self, target: VectorTable, key: str, values: np.ndarray) -> None:
+        db.execute_update(*self._upsert_statement(target, key, values))
+
+    async def _upsert_async(self, target: VectorTable, key: str, values: np.ndarray) -> None:
+        await async_db.execute_update(*self._upsert_statement(target, key, values))
+
+    def save_many(self, target: VectorTable, vectors: Dict[str, np.ndarray], batch_size: int = None) -> int:
+        """Bulk upsert {key: vector} into one of the vector tables via COPY; returns rows written"""
+        rows = (self._row(key, values) for key, values in vectors.items())
+        return db.bulk_upsert(target.table, self._columns(target), rows, [target.key_column], batch_size=batch_size)
+
+    def save_job_embedding(self, job_id: str, embedding: np.ndarray) -> None:
+        """Upsert a job content embedding"""
+        self._upsert(JOB_EMBEDDINGS, job_id, embedding)
+
+    def save_user_embedding(self, user_id: str, embedding: np.ndarray) -> None:
+        """Upsert a user content embedding"""
+        self._upsert(USER_EMBEDDINGS, user_id, embedding)
+
+    async def save_job_embedding_async(self, job_id: str, embedding: np.ndarray) -> None:
+        """Upsert a job content embedding without blocking the event loop"""
+        await self._upsert_async(JOB_EMBEDDINGS, job_id, embedding)
+
+    async def save_user_embedding_async(self, user_id: str, embedding: np.ndarray) -> None:
+        """Upsert a user content embedding without blocking the event loop"""
+        await self._upsert_async(USER_EMBEDDINGS, user_id, embedding)
+
+    def save_job_cf_factors(self, job_id: str, factors: np.ndarray) -> None:
+        """Upsert job CF factors"""
+        self._upsert(JOB_CF_FACTORS, job_id, factors)
+
+    def save_user_cf_factors(self, user_id: str, factors: np.ndarray) -> None:
+        """Upsert user CF factors"""
+        self._upsert(USER_CF_FACTORS, user_id, factors)
+
+
+embedding_store = EmbeddingStore()
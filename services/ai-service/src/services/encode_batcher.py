@@ -0,0 +1,168 @@
+"""
+Micro-batching for single-text encodes.
+
+Concurrent callers each submit one text; a dispatcher thread collects them
+for up to max_batch_size items or max_wait_ms after the oldest one arrived
+and makes a single batched encode call, then resolves every caller's
+future with its row. Identical texts in a batch are encoded once.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _Request(NamedTuple):
+    text: str
+    future: Future
+    enqueued_at: float
+
+
+def _bucket(size: int) -> str:
+    """Histogram bucket label: 1, 2, <=4, <=8, ..."""
+    if size <= 2:
+        return str(size)
+    return f"<={1 << (size - 1).bit_length()}"
+
+
+def _bucket_order(label: str) -> int:
+    return int(label.lstrip("<="))
+
+
+class EncodeBatcher:
+    """Coalesces concurrent single-text encodes into batched encode_fn(texts) calls"""
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        """
+        Args:
+            encode_fn: Encodes a list of texts into a (len(texts), dim) array
+            max_batch_size: Dispatch as soon as this many requests are queued
+            max_wait_ms: Longest the oldest queued request waits for company
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self._batches = 0
+        self._requests = 0
+        self._texts_encoded = 0
+        self._errors = 0
+        self._histogram: Dict[str, int] = {}
+        self._queue_wait_total = 0.0
+        self._encode_time_total = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent's dispatcher thread and queue do not exist here
+                self._queue = queue.Queue()
+                self._thread = None
+                self._pid = os.getpid()
+                self._reset_stats()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text; the future resolves to its (dim,) embedding"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put(_Request(text, future, time.monotonic()))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        """Blocking single-text encode through the batcher"""
+        return self.submit(text).result()
+
+    def _collect(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Past the deadline: only take what is already waiting
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                self._dispatch(batch)
+            except Exception as e:  # never let the dispatcher die
+                logger.error(f"Encode batch dispatch failed: {e}", exc_info=True)
+
+    def _dispatch(self, batch: List[_Request]) -> None:
+        # Drop requests whose caller already gave up
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        started = time.monotonic()
+        texts = list(dict.fromkeys(request.text for request in batch))
+        try:
+            embeddings = self.encode_fn(texts)
+        except Exception as e:
+            self._record(batch, len(texts), started, error=True)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        self._record(batch, len(texts), started)
+        rows = {text: i for i, text in enumerate(texts)}
+        for request in batch:
+            request.future.set_result(embeddings[rows[request.text]])
+
+    def _record(self, batch: List[_Request], n_texts: int, started: float, error: bool = False) -> None:
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._texts_encoded += n_texts
+            self._errors += int(error)
+            bucket = _bucket(len(batch))
+            self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+            self._queue_wait_total += sum(started - request.enqueued_at for request in batch)
+            self._encode_time_total += time.monotonic() - started
+
+    def stats(self) -> Dict:
+        """Batch-size histogram and timing counters since start"""
+        with self._lock:
+            batches = max(self._batches, 1)
+            requests = max(self._requests, 1)
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self._batches,
+                'requests': self._requests,
+                'texts_encoded': self._texts_encoded,
+                'errors': self._errors,
+                'avg_batch_size': round(self._requests / batches, 2),
+                'batch_size_histogram': dict(sorted(self._histogram.items(), key=lambda item: _bucket_order(item[0]))),
+                'avg_queue_wait_ms': round(self._queue_wait_total / requests * 1000.0, 3),
+                'avg_encode_ms': round(self._encode_time_total / batches * 1000.0, 3),
+                'queued': self._queue.qsize(),
+            }
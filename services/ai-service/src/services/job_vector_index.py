@@ -0,0 +1,519 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from ..config import settings
+from ..database import db
+from ..utils.vector_codec import row_vector, vector_select
+from .ann_index import BaseANNIndex, create_ann_index, npz_path, top_k_indices
+from .shared_vector_store import SharedVectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, leaving all-zero rows untouched"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+@dataclass(frozen=True)
+class _IndexSnapshot:
+    """Immutable view of the index; swapped atomically on refresh"""
+    job_ids: List[str] = field(default_factory=list)
+    id_to_row: Dict[str, int] = field(default_factory=dict)
+    matrix: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.float32))
+
+
+def _changed_ids(previous: _IndexSnapshot, current: _IndexSnapshot) -> Set[str]:
+    """Ids of current that are new or whose row differs from previous"""
+    if not previous.job_ids or previous.matrix.shape[1:] != current.matrix.shape[1:]:
+        return set(current.job_ids)
+    common = [job_id for job_id in current.job_ids if job_id in previous.id_to_row]
+    changed = set(current.job_ids) - set(common)
+    if common:
+        old_rows = np.array([previous.id_to_row[job_id] for job_id in common], dtype=np.int64)
+        new_rows = np.array([current.id_to_row[job_id] for job_id in common], dtype=np.int64)
+        differs = np.any(previous.matrix[old_rows] != current.matrix[new_rows], axis=1)
+        changed.update(job_id for job_id, flag in zip(common, differs) if flag)
+    return changed
+
+
+class JobVectorIndex:
+    """
+    Resident matrix of pre-normalized embeddings for all active jobs.
+
+    Readers always work on an immutable snapshot, so a request never sees a
+    half-applied refresh and never needs a lock.
+
+    With a SharedVectorStore, only the leader worker loads from the database;
+    it publishes each changed snapshot as a new generation and every worker
+    (leader included) serves from the memory-mapped generation. Upserts on a
+    follower stay local until the next generation replaces them. With
+    ANN_INDEX_PATH set, only the leader builds the ANN index; followers load
+    each file it saves.
+    """
+
+    def __init__(self, refresh_interval: int = None, shared_store: Optional[SharedVectorStore] = None):
+        self.refresh_interval = refresh_interval or settings.job_index_refresh_seconds
+        self._store = shared_store
+        self._generation = 0  # shared store generation the snapshot was attached from
+        self._dirty = False  # leader has changes not yet published
+        self._snapshot = _IndexSnapshot()
+        self._write_lock = threading.Lock()
+        self._watermark = None  # max jobs."updatedAt" (or embedding "updatedAt") seen so far
+        self._loaded = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # ANN index over a (possibly older) snapshot; rows upserted since its build are scored exactly
+        self._ann: Optional[BaseANNIndex] = None
+        self._ann_source: Optional[_IndexSnapshot] = None
+        self._ann_built_at = 0.0
+        self._ann_pending: Set[str] = set()
+        self._ann_file_mtime: Optional[float] = None  # ANN_INDEX_PATH version last loaded
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def size(self) -> int:
+        return len(self._snapshot.job_ids)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _is_follower(self) -> bool:
+        return self._store is not None and not self._store.is_leader()
+
+    def load(self) -> None:
+        """Full (re)load of every active job embedding (followers attach the leader's generation instead)"""
+        if self._is_follower():
+            self._sync_from_store()
+            return
+        self._load_from_db()
+        self._publish()
+
+    @staticmethod
+    def _updated_at_column() -> str:
+        """Change time compared against the watermark: the job's or its embedding's, whichever is later"""
+        if settings.job_embedding_updated_at_enabled:
+            return 'GREATEST(j."updatedAt", jce."updatedAt")'
+        return 'j."updatedAt"'
+
+    def _load_from_db(self) -> None:
+        query = f"""
+            SELECT jce."jobId", {vector_select('embedding', 'embeddingBin', 'jce')}, {self._updated_at_column()} AS "updatedAt"
+            FROM job_content_embeddings jce
+            INNER JOIN jobs j ON j.id = jce."jobId"
+            WHERE j.status = 'active'
+            AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+            AND jce.embedding IS NOT NULL
+        """
+        results = db.execute_query(query)
+
+        job_ids = []
+        vectors = []
+        watermark = None
+        for row in results:
+            vector = row_vector(row, 'embedding', 'embeddingBin')
+            if vector is None or vector.size == 0:
+                continue
+            job_ids.append(str(row['jobId']))
+            vectors.append(vector)
+            if row['updatedAt'] is not None and (watermark is None or row['updatedAt'] > watermark):
+                watermark = row['updatedAt']
+
+        matrix = _normalize_rows(np.vstack(vectors).astype(np.float32)) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+        with self._write_lock:
+            self._snapshot = _IndexSnapshot(
+                job_ids=job_ids,
+                id_to_row={job_id: i for i, job_id in enumerate(job_ids)},
+                matrix=np.ascontiguousarray(matrix),
+            )
+            self._watermark = watermark
+            self._loaded = True
+            # Any existing ANN index predates this snapshot: score everything exactly until rebuilt
+            self._ann_source = None
+            if self._ann is not None:
+                self._ann_pending = set(job_ids)
+
+        logger.info(f"Job vector index loaded: {len(job_ids)} jobs")
+
+    def _publish(self) -> None:
+        """Leader: write the current snapshot as a new shared generation and serve from its mapping"""
+        if self._store is None:
+            return
+        with self._write_lock:
+            snapshot = self._snapshot
+            self._dirty = False
+        try:
+            generation = self._store.publish(snapshot.job_ids, snapshot.matrix)
+            _, _, mapped = self._store.attach(generation)
+        except Exception as e:
+            with self._write_lock:
+                self._dirty = True
+            logger.error(f"Failed to publish job vector index: {e}", exc_info=True)
+            return
+        with self._write_lock:
+            # Swap our private matrix for the shared mapping unless it changed meanwhile
+            if self._snapshot is snapshot:
+                self._snapshot = _IndexSnapshot(snapshot.job_ids, snapshot.id_to_row, mapped)
+                if self._ann_source is snapshot:
+                    self._ann_source = self._snapshot
+            self._generation = generation
+        logger.info(f"Published job vector index generation {generation} ({len(snapshot.job_ids)} jobs)")
+
+    def _sync_from_store(self) -> bool:
+        """Follower: attach the newest published generation if it is not the current one"""
+        generation = self._store.generation()
+        if generation == 0 or generation == self._generation:
+            return False
+        attached = self._store.attach(generation)
+        if attached is None:
+            return False
+        generation, job_ids, matrix = attached
+        attached_snapshot = _IndexSnapshot(
+            job_ids=job_ids,
+            id_to_row={job_id: i for i, job_id in enumerate(job_ids)},
+            matrix=matrix,
+        )
+        with self._write_lock:
+            previous = self._snapshot
+            self._snapshot = attached_snapshot
+            self._generation = generation
+            self._loaded = True
+            # The ANN index still covers every unchanged row: only new or changed ids are scored exactly
+            self._ann_pending = (self._ann_pending & set(job_ids)) | _changed_ids(previous, attached_snapshot)
+            if self._ann_source is previous:
+                self._ann_source = attached_snapshot
+        logger.info(f"Attached job vector index generation {generation}: {len(job_ids)} jobs")
+        return True
+
+    def refresh(self) -> None:
+        """Incrementally sync with the database: drop inactive jobs, load new or updated ones"""
+        if self._is_follower():
+            self._sync_from_store()
+            return
+        if not self._loaded or (self._store is not None and self._watermark is None):
+            # Includes a follower that just took over leadership
+            self.load()
+            return
+
+        active_query = f"""
+            SELECT j.id, {self._updated_at_column()} AS "updatedAt"
+            FROM jobs j
+            INNER JOIN job_content_embeddings jce ON j.id = jce."jobId"
+            WHERE j.status = 'active'
+            AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+            AND jce.embedding IS NOT NULL
+        """
+        active_rows = db.execute_query(active_query)
+
+        snapshot = self._snapshot
+        active_ids = set()
+        to_fetch = []
+        watermark = self._watermark
+        for row in active_rows:
+            job_id = str(row['id'])
+            updated_at = row['updatedAt']
+            active_ids.add(job_id)
+            is_updated = updated_at is not None and (self._watermark is None or updated_at > self._watermark)
+            if job_id not in snapshot.id_to_row or is_updated:
+                to_fetch.append(job_id)
+            if updated_at is not None and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+
+        to_remove = [job_id for job_id in snapshot.job_ids if job_id not in active_ids]
+
+        fetched = {}
+        if to_fetch:
+            emb_query = f"""
+                SELECT "jobId", {vector_select('embedding', 'embeddingBin')}
+                FROM job_content_embeddings
+                WHERE "jobId" = ANY(%s::uuid[])
+            """
+            for row in db.execute_query(emb_query, (to_fetch,)):
+                vector = row_vector(row, 'embedding', 'embeddingBin')
+                if vector is not None and vector.size > 0:
+                    fetched[str(row['jobId'])] = vector
+
+        if fetched or to_remove:
+            self._apply(fetched, to_remove)
+            logger.info(f"Job vector index refreshed: +{len(fetched)} / -{len(to_remove)}, size {self.size}")
+        self._watermark = watermark
+        if self._dirty:
+            self._publish()
+
+    def upsert(self, job_id: str, embedding: np.ndarray) -> None:
+        """Insert or replace a single job vector (e.g. right after its embedding is regenerated)"""
+        if embedding is None or embedding.size == 0:
+            return
+        self._apply({str(job_id): np.asarray(embedding, dtype=np.float32)}, [])
+
+    def remove(self, job_id: str) -> None:
+        """Drop a job from the index"""
+        self._apply({}, [str(job_id)])
+
+    def _apply(self, vectors: Dict[str, np.ndarray], removed: List[str]) -> None:
+        """Build and publish a new snapshot with the given rows replaced/appended/removed"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            removed_set = set(removed)
+            self._ann_pending.update(vectors)
+            matrix = snapshot.matrix
+            if vectors and matrix.size and matrix.shape[1] != next(iter(vectors.values())).shape[0]:
+                logger.warning("Embedding dimension changed; rebuilding job vector index on next load")
+                self._loaded = False
+                return
+
+            # Fancy indexing copies, so readers holding the old snapshot are unaffected
+            keep = [i for i, job_id in enumerate(snapshot.job_ids) if job_id not in removed_set]
+            job_ids = [snapshot.job_ids[i] for i in keep]
+            matrix = matrix[keep] if matrix.size else matrix.copy()
+
+            id_to_row = {job_id: i for i, job_id in enumerate(job_ids)}
+            new_ids = []
+            new_vectors = []
+            for job_id, vector in vectors.items():
+                normalized = _normalize_rows(vector.reshape(1, -1))[0]
+                row = id_to_row.get(job_id)
+                if row is not None:
+                    matrix[row] = normalized
+                else:
+                    new_ids.append(job_id)
+                    new_vectors.append(normalized)
+
+            if new_vectors:
+                appended = np.vstack(new_vectors).astype(np.float32)
+                matrix = np.vstack([matrix, appended]) if matrix.size else appended
+                for job_id in new_ids:
+                    id_to_row[job_id] = len(job_ids)
+                    job_ids.append(job_id)
+
+            self._snapshot = _IndexSnapshot(
+                job_ids=job_ids,
+                id_to_row=id_to_row,
+                matrix=np.ascontiguousarray(matrix, dtype=np.float32),
+            )
+            self._dirty = True
+
+    def get(self, job_id: str) -> Optional[np.ndarray]:
+        """Return the normalized vector for a job, or None if it is not indexed"""
+        snapshot = self._snapshot
+        row = snapshot.id_to_row.get(str(job_id))
+        if row is None:
+            return None
+        return snapshot.matrix[row]
+
+    def vectors(self, job_ids: List[str]) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Gather normalized rows for job_ids in order.
+
+        Returns:
+            Tuple of (matrix, found) where rows for jobs missing from the index
+            are zero and found is a boolean mask; matrix is None when empty
+        """
+        snapshot = self._snapshot
+        found = np.zeros(len(job_ids), dtype=bool)
+        if not snapshot.job_ids:
+            return None, found
+        rows = np.array([snapshot.id_to_row.get(job_id, -1) for job_id in job_ids], dtype=np.int64)
+        found = rows >= 0
+        matrix = np.zeros((len(job_ids), snapshot.matrix.shape[1]), dtype=np.float32)
+        matrix[found] = snapshot.matrix[rows[found]]
+        return matrix, found
+
+    def score(self, query: np.ndarray, job_ids: List[str] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Cosine similarity of a query vector against indexed jobs.
+
+        Args:
+            query: Query embedding (need not be normalized)
+            job_ids: Restrict scoring to these jobs; None scores the whole index
+
+        Returns:
+            Tuple of (job_ids, scores) for the jobs present in the index
+        """
+        snapshot = self._snapshot
+        if not snapshot.job_ids:
+            return [], np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return [], np.zeros(0, dtype=np.float32)
+        query = query / norm
+
+        if job_ids is None:
+            return list(snapshot.job_ids), snapshot.matrix @ query
+
+        rows = []
+        found = []
+        for job_id in job_ids:
+            row = snapshot.id_to_row.get(job_id)
+            if row is not None:
+                rows.append(row)
+                found.append(job_id)
+        if not rows:
+            return [], np.zeros(0, dtype=np.float32)
+        return found, snapshot.matrix[np.asarray(rows)] @ query
+
+    def search(self, query: np.ndarray, k: int, exclude: Set[str] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Top-k most similar indexed jobs to a query vector.
+
+        Uses the ANN index for candidate generation when one is built, then
+        re-scores candidates exactly against the current snapshot, so removed
+        jobs never leak out and freshly upserted ones are still considered.
+        """
+        snapshot = self._snapshot
+        exclude = exclude or set()
+        if not snapshot.job_ids or k <= 0:
+            return [], np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return [], np.zeros(0, dtype=np.float32)
+        query = query / norm
+
+        ann = self._ann
+        if ann is None:
+            rows = np.arange(len(snapshot.job_ids))
+        else:
+            n_candidates = max(k * 4, k + len(exclude))
+            candidate_ids, _ = ann.search(
+                query, n_candidates, **self._ann_search_params()
+            )
+            candidate_ids = set(candidate_ids) | self._ann_pending
+            rows = np.array(
+                sorted(snapshot.id_to_row[job_id] for job_id in candidate_ids if job_id in snapshot.id_to_row),
+                dtype=np.int64,
+            )
+
+        if exclude:
+            rows = np.array([row for row in rows if snapshot.job_ids[row] not in exclude], dtype=np.int64)
+        if rows.size == 0:
+            return [], np.zeros(0, dtype=np.float32)
+
+        scores = snapshot.matrix[rows] @ query
+        top = top_k_indices(scores, k)
+        return [snapshot.job_ids[rows[i]] for i in top], scores[top]
+
+    def _ann_search_params(self) -> dict:
+        if settings.ann_backend.lower() == "hnsw":
+            return {'ef_search': settings.ann_ef_search}
+        return {'nprobe': settings.ann_nprobe}
+
+    def rebuild_ann(self) -> None:
+        """(Re)build the ANN index from the current snapshot"""
+        backend = settings.ann_backend.lower()
+        with self._write_lock:
+            snapshot = self._snapshot
+            pending_before = set(self._ann_pending)
+        if backend == "none" or len(snapshot.job_ids) < settings.ann_min_jobs:
+            self._ann = None
+            self._ann_source = snapshot
+            return
+
+        started = time.time()
+        params = {'nprobe': settings.ann_nprobe} if backend == "ivf" else {'ef_search': settings.ann_ef_search}
+        ann = create_ann_index(backend, **params).build(snapshot.matrix, snapshot.job_ids)
+
+        with self._write_lock:
+            self._ann = ann
+            self._ann_source = snapshot
+            self._ann_built_at = time.time()
+            # Keep ids upserted while we were building
+            self._ann_pending -= pending_before
+        logger.info(f"Built {backend} ANN index over {len(ann)} jobs in {time.time() - started:.1f}s")
+
+        # Followers load the leader's file instead of writing their own
+        if settings.ann_index_path and not self._is_follower():
+            try:
+                ann.save(settings.ann_index_path)
+            except Exception as e:
+                logger.warning(f"Could not save ANN index to {settings.ann_index_path}: {e}")
+
+    def load_ann(self, path: str = None) -> bool:
+        """Load a previously saved ANN index (stale entries are filtered at query time)"""
+        path = path or settings.ann_index_path
+        if not path:
+            return False
+        path = npz_path(path)
+        if not os.path.exists(path):
+            return False
+        try:
+            mtime = os.path.getmtime(path)
+            ann = BaseANNIndex.load(path)
+        except Exception as e:
+            logger.warning(f"Could not load ANN index from {path}: {e}")
+            return False
+        with self._write_lock:
+            self._ann = ann
+            self._ann_source = self._snapshot
+            self._ann_built_at = mtime
+            self._ann_file_mtime = mtime
+            ann_ids = set(ann.ids)
+            self._ann_pending = {job_id for job_id in self._snapshot.job_ids if job_id not in ann_ids}
+        logger.info(f"Loaded ANN index from {path}: {len(ann)} jobs")
+        return True
+
+    def _maybe_rebuild_ann(self) -> None:
+        if self._is_follower() and settings.ann_index_path:
+            # Only the leader builds; followers pick up each file it saves
+            self._maybe_reload_ann()
+            return
+        snapshot = self._snapshot
+        if snapshot is self._ann_source:
+            return
+        too_many_pending = len(self._ann_pending) > 0.1 * max(len(snapshot.job_ids), 1)
+        stale = time.time() - self._ann_built_at >= settings.ann_rebuild_seconds
+        if self._ann is None or too_many_pending or stale:
+            self.rebuild_ann()
+
+    def _maybe_reload_ann(self) -> None:
+        """Follower: load ANN_INDEX_PATH again when the leader has replaced it"""
+        try:
+            mtime = os.path.getmtime(npz_path(settings.ann_index_path))
+        except OSError:
+            return
+        if mtime != self._ann_file_mtime:
+            self.load_ann()
+
+    def start_background_refresh(self) -> None:
+        """Start a daemon thread that refreshes the index every refresh_interval seconds"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="job-vector-index-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            try:
+                if self._loaded:
+                    self._maybe_rebuild_ann()
+            except Exception as e:
+                logger.error(f"ANN index rebuild failed: {e}", exc_info=True)
+            if self._stop_event.wait(self.refresh_interval):
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Job vector index refresh failed: {e}", exc_info=True)
+
+
+job_vector_index = JobVectorIndex(
+    shared_store=SharedVectorStore("jobs", settings.shared_vector_dir) if settings.shared_vector_store_enabled else None
+)
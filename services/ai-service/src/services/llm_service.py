@@ -1,6 +1,7 @@
 # services/ai-service/src/services/llm_service.py
 import logging
 import os
+import threading
 from typing import List, Dict, Optional
 from google import genai
 from google.genai import types
@@ -12,14 +13,22 @@ class LLMService:
     """Service for LLM-based text analysis and generation"""
     
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-        if api_key:
-            self.client = genai.Client(api_key=api_key)
-            self.model = "gemini-2.5-flash"
-            self.enabled = True
-        else:
+        self._api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.model = "gemini-2.5-flash"
+        self.enabled = bool(self._api_key)
+        if not self.enabled:
             logger.warning("No LLM API key found - LLM features disabled")
-            self.enabled = False
+
+    @property
+    def client(self):
+        """Gemini client, created on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = genai.Client(api_key=self._api_key)
+        return self._client
     
     async def analyze_skills_match(
         self, 
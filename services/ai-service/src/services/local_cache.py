@@ -0,0 +1,129 @@
+"""
+Bounded in-process cache (L1) for numpy values.
+
+LRU over an OrderedDict with a byte budget and a per-entry TTL. Values are
+stored read-only and handed out without copying, so a hit costs one dict
+lookup and no deserialization.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, NamedTuple, Optional
+import numpy as np
+
+# Rough per-entry bookkeeping cost (key string, tuple, OrderedDict node)
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class _Entry(NamedTuple):
+    value: np.ndarray
+    expires_at: float
+    size: int
+
+
+class LocalCache:
+    """Thread-safe LRU cache with a byte budget and TTL"""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, name: str = "l1"):
+        self.name = name
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._sets = 0
+        self._evictions = 0
+        self._expired = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            self._expired += 1
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.value
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            return self._lookup(key, time.monotonic())
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, np.ndarray]:
+        """Hits only, keyed like the input"""
+        found = {}
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                value = self._lookup(key, now)
+                if value is not None:
+                    found[key] = value
+        return found
+
+    def set(self, key: Hashable, value: np.ndarray, ttl: Optional[float] = None) -> None:
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: Dict[Hashable, np.ndarray], ttl: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl is None else min(ttl, self.ttl_seconds)
+        with self._lock:
+            expires_at = time.monotonic() + ttl
+            for key, value in items.items():
+                value = np.array(value, copy=True)
+                value.flags.writeable = False
+                size = value.nbytes + ENTRY_OVERHEAD_BYTES
+                if size > self.max_bytes:
+                    continue
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = _Entry(value, expires_at, size)
+                self._bytes += size
+                self._sets += 1
+            self._evict()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'sets': self._sets,
+                'evictions': self._evictions,
+                'expired': self._expired,
+            }
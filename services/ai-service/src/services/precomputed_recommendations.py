@@ -0,0 +1,296 @@
+"""
+Precomputed recommendation lists and similar-jobs graph.
+
+- user_recommendations (migrations/003_user_recommendations.sql):
+  scripts/precompute_recommendations.py scores every active user against
+  every active job in blocked matrix-matrix products (scoring.blocked_top_k)
+  and stores each user's top-N.
+- job_similar_jobs (migrations/004_job_similar_jobs.sql):
+  scripts/precompute_similar_jobs.py stores each active job's top-K
+  neighbours; refresh_job() keeps a job's row and its neighbours' rows
+  current when its embedding changes between runs.
+
+RecommendationService reads these first and scores live only when a list is
+missing, too old, or too few of its jobs survive the request's filters, and
+when the request uses fields the lists cannot apply (see serves()).
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from ..config import settings
+from ..database import db
+from ..models.schemas import RecommendationRequest, UserPreferences
+from ..utils.vector_codec import row_vector, vector_select
+from . import scoring
+
+logger = logging.getLogger(__name__)
+
+Lists = Iterable[Tuple[str, Sequence[str], Sequence[float]]]
+
+# Preference fields PrecomputedRecommendations.lookup() applies as real-time filters and boosts
+APPLIED_PREFERENCES = frozenset({'hiddenCompanyIds', 'preferredLocations', 'minSalary'})
+
+
+def _array_literal(values: Iterable) -> str:
+    """Postgres array literal for COPY (ids and floats need no quoting)"""
+    return "{" + ",".join(values) + "}"
+
+
+def load_active_job_vectors() -> Tuple[List[str], np.ndarray]:
+    """
+    L2-normalized content embeddings of every active job
+
+    Rows whose dimension differs from the majority (e.g. left over from a
+    previous embedding model) are skipped.
+
+    Returns:
+        (job_ids, (n, d) float32 matrix)
+    """
+    query = f"""
+        SELECT jce."jobId", {vector_select('embedding', 'embeddingBin', 'jce')}
+        FROM job_content_embeddings jce
+        INNER JOIN jobs j ON j.id = jce."jobId"
+        WHERE j.status = 'active'
+        AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+        AND jce.embedding IS NOT NULL
+        ORDER BY jce."jobId"
+    """
+    vectors = {}
+    for row in db.execute_query(query):
+        vector = row_vector(row, 'embedding', 'embeddingBin')
+        if vector is not None and vector.size > 0:
+            vectors[str(row['jobId'])] = vector
+    if not vectors:
+        return [], np.zeros((0, 0), dtype=np.float32)
+
+    dim = Counter(len(vector) for vector in vectors.values()).most_common(1)[0][0]
+    job_ids = [job_id for job_id, vector in vectors.items() if len(vector) == dim]
+    if len(job_ids) < len(vectors):
+        logger.warning(f"Skipped {len(vectors) - len(job_ids)} job embeddings with a dimension other than {dim}")
+    matrix = scoring.normalize_rows(np.vstack([vectors[job_id] for job_id in job_ids]))
+    return job_ids, np.ascontiguousarray(matrix)
+
+
+class _PrecomputedLists:
+    """A table of (key, job ids, scores) rows, best first"""
+
+    table: str = ""
+    key_column: str = ""
+    ids_column: str = ""
+
+    def __init__(self, max_age_hours: float = None):
+        self.max_age_hours = max_age_hours if max_age_hours is not None else settings.precomputed_max_age_hours
+
+    def save(self, lists: Lists, computed_at: datetime) -> int:
+        """
+        Upsert (key, job_ids, scores) lists, best first
+
+        Returns:
+            Number of rows written
+        """
+        rows = (
+            (key, _array_literal(job_ids), _array_literal(f"{score:.6g}" for score in scores), computed_at)
+            for key, job_ids, scores in lists
+        )
+        return db.bulk_upsert(
+            self.table, [self.key_column, self.ids_column, "scores", "computedAt"], rows,
+            conflict_columns=[self.key_column],
+        )
+
+    def load(self, keys: List[str]) -> Dict[str, Tuple[List[str], List[float], datetime]]:
+        """Stored rows for keys, as (job_ids, scores, computedAt)"""
+        query = f"""
+            SELECT "{self.key_column}", "{self.ids_column}", scores, "computedAt"
+            FROM {self.table}
+            WHERE "{self.key_column}" = ANY(%s::uuid[])
+        """
+        return {
+            str(row[self.key_column]): ([str(job_id) for job_id in row[self.ids_column]], list(row['scores']), row['computedAt'])
+            for row in db.execute_query(query, (list(keys),))
+        }
+
+    def delete(self, keys: List[str]) -> None:
+        db.execute_update(f'DELETE FROM {self.table} WHERE "{self.key_column}" = ANY(%s::uuid[])', (list(keys),))
+
+    def prune(self, computed_before: datetime) -> None:
+        """Drop rows that were not part of the latest run"""
+        db.execute_update(f'DELETE FROM {self.table} WHERE "computedAt" < %s', (computed_before,))
+
+
+class PrecomputedRecommendations(_PrecomputedLists):
+    """Reads and writes the user_recommendations table"""
+
+    table = "user_recommendations"
+    key_column = "userId"
+    ids_column = "jobIds"
+
+    def serves(self, request: RecommendationRequest) -> bool:
+        """
+        Whether lookup() can answer the request exactly as asked
+
+        A search term, any preference outside APPLIED_PREFERENCES, or a limit
+        beyond the stored top-N sends the request to live scoring.
+        """
+        if request.searchTerm or request.limit > settings.precompute_top_n:
+            return False
+        if request.preferences is None:
+            return True
+        used = {name for name, value in request.preferences.model_dump().items() if value}
+        return used <= APPLIED_PREFERENCES
+
+    def lookup(
+        self,
+        user_id: str,
+        preferences: Optional[UserPreferences],
+        limit: int,
+    ) -> Optional[Tuple[List[str], List[float]]]:
+        """
+        A user's precomputed list after real-time filters, in one query
+
+        Closed jobs, hidden companies, other locations and salaries below
+        minSalary are dropped; preference boosts are applied as in live scoring.
+
+        Returns:
+            (job_ids, scores), or None when the list is missing, older than
+            max_age_hours or has fewer than limit jobs left after filtering
+        """
+        hidden_companies = preferences.hiddenCompanyIds if preferences else None
+        preferred_locations = preferences.preferredLocations if preferences else None
+        min_salary = preferences.minSalary if preferences else None
+        query = f"""
+            SELECT r.job_id, r.score, j."organizationId" AS organization_id, j.location
+            FROM {self.table} ur
+            CROSS JOIN LATERAL unnest(ur."jobIds", ur.scores) WITH ORDINALITY AS r(job_id, score, rank)
+            INNER JOIN jobs j ON j.id = r.job_id
+            WHERE ur."userId" = %s
+            AND ur."computedAt" > NOW() - %s * INTERVAL '1 hour'
+            AND j.status = 'active'
+            AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+            AND (%s::uuid[] IS NULL OR j."organizationId" != ALL(%s::uuid[]))
+            AND (%s::text[] IS NULL OR j.location = ANY(%s::text[]))
+            AND (%s::int IS NULL OR (j."salaryDetails"->>'minAmount')::int >= %s)
+            ORDER BY r.rank
+        """
+        params = (
+            user_id,
+            self.max_age_hours,
+            hidden_companies, hidden_companies,
+            preferred_locations, preferred_locations,
+            min_salary, min_salary,
+        )
+        try:
+            rows = db.execute_query(query, params)
+        except Exception as e:
+            logger.warning(f"Error reading precomputed recommendations for {user_id}: {e}")
+            return None
+        if len(rows) < limit:
+            return None
+
+        job_ids = [str(row['job_id']) for row in rows]
+        scores = np.array([row['score'] for row in rows], dtype=np.float32)
+        if preferences:
+            boosts = scoring.preference_boosts(
+                preferences,
+                [row['location'] for row in rows],
+                [row['organization_id'] for row in rows],
+            )
+            scores = scoring.apply_boosts(scores, boosts, preferences)
+        top, top_scores = scoring.top_k(scores, limit)
+        return [job_ids[i] for i in top], top_scores.tolist()
+
+
+class PrecomputedSimilarJobs(_PrecomputedLists):
+    """Reads and writes the job_similar_jobs graph"""
+
+    table = "job_similar_jobs"
+    key_column = "jobId"
+    ids_column = "similarJobIds"
+
+    def __init__(self, max_age_hours: float = None, top_k: int = None):
+        super().__init__(max_age_hours)
+        self.top_k = top_k or settings.similar_jobs_top_k
+
+    def lookup(self, job_id: str, limit: int, exclude_job_id: bool = True) -> Optional[Tuple[List[str], List[float]]]:
+        """
+        A job's stored neighbours that are still active, in one query
+
+        The graph never lists a job as its own neighbour; with
+        exclude_job_id=False the job itself comes first (similarity 1), as
+        in the live query.
+
+        Returns:
+            (job_ids, scores), or None when the row is missing, older than
+            max_age_hours or too few of its neighbours are still active
+        """
+        query = f"""
+            SELECT r.job_id, r.score
+            FROM {self.table} js
+            CROSS JOIN LATERAL unnest(js."{self.ids_column}", js.scores) WITH ORDINALITY AS r(job_id, score, rank)
+            INNER JOIN jobs j ON j.id = r.job_id
+            WHERE js."{self.key_column}" = %s
+            AND js."computedAt" > NOW() - %s * INTERVAL '1 hour'
+            AND j.status = 'active'
+            AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+            ORDER BY r.rank
+            LIMIT %s
+        """
+        wanted = limit if exclude_job_id else limit - 1
+        try:
+            rows = db.execute_query(query, (job_id, self.max_age_hours, max(wanted, 0)))
+        except Exception as e:
+            logger.warning(f"Error reading precomputed similar jobs for {job_id}: {e}")
+            return None
+        if len(rows) < wanted:
+            return None
+
+        job_ids = [str(row['job_id']) for row in rows]
+        scores = [float(row['score']) for row in rows]
+        if not exclude_job_id:
+            job_ids, scores = [job_id] + job_ids, [1.0] + scores
+        return job_ids[:limit], scores[:limit]
+
+    def refresh_job(self, job_id: str) -> List[str]:
+        """
+        Incremental update after a job's embedding changed
+
+        Recomputes the job's own neighbours from the job vector index and
+        inserts the job into those neighbours' lists where it now ranks in
+        their top-K (similarity is symmetric). Lists that merely lose the job
+        keep a stale entry until the next batch run.
+
+        Returns:
+            Jobs whose lists changed (only job_id when the job vector index is
+            not loaded: its row is dropped and served live until the next run)
+        """
+        from .job_vector_index import job_vector_index
+
+        embedding = job_vector_index.get(job_id) if job_vector_index.is_loaded else None
+        if embedding is None:
+            self.delete([job_id])
+            return [job_id]
+
+        neighbour_ids, similarities = job_vector_index.search(embedding, self.top_k, exclude={job_id})
+        similarities = similarities.tolist()
+        self.save([(job_id, neighbour_ids, similarities)], datetime.now(timezone.utc))
+
+        # Neighbours keep their computedAt: only their membership changes
+        updated = {}
+        for neighbour_id, (ids, scores, computed_at) in self.load(neighbour_ids).items():
+            similarity = similarities[neighbour_ids.index(neighbour_id)]
+            merged = [(other, score) for other, score in zip(ids, scores) if other != job_id]
+            merged.append((job_id, similarity))
+            merged.sort(key=lambda item: item[1], reverse=True)
+            merged = merged[:self.top_k]
+            if merged != list(zip(ids, scores)):
+                updated.setdefault(computed_at, []).append(
+                    (neighbour_id, [other for other, _ in merged], [score for _, score in merged])
+                )
+        for computed_at, lists in updated.items():
+            self.save(lists, computed_at)
+        return [job_id] + [neighbour_id for lists in updated.values() for neighbour_id, _, _ in lists]
+
+
+precomputed_recommendations = PrecomputedRecommendations()
+precomputed_similar_jobs = PrecomputedSimilarJobs()
@@ -14,9 +14,11 @@ class SentenceTransformerProvider(BaseEmbeddingProvider):
         self.model_name = model_name
         logger.info(f"Loading SentenceTransformer model: {model_name}")
         self.model = SentenceTransformer(model_name)
-        # Get dimension from model
-        test_embedding = self.model.encode("test", normalize_embeddings=True)
-        self._dimension = len(test_embedding)
+        # Read the dimension from the model config rather than a test encode, so loading
+        # in the gunicorn master does not start inference threads before workers fork
+        self._dimension = self.model.get_sentence_embedding_dimension()
+        if not self._dimension:
+            self._dimension = len(self.model.encode("test", normalize_embeddings=True))
         logger.info(f"Model loaded. Dimension: {self._dimension}")
     
     @property
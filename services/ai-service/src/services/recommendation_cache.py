@@ -1,32 +1,94 @@
+import functools
 import hashlib
+import inspect
 import json
 import logging
-from typing import Optional, Tuple, List
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, List
 import redis
+from ..config import settings
+from .cache_namespace import CacheCounters, CacheGenerations, hit_ratio
 from .embedding_cache import get_cache
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Per-user/per-job generation counters outlive any entry written before their bump
+SCOPE_GENERATION_TTL = 7 * 24 * 3600
+
+# How often a caller waiting on another process's computation re-reads the entry
+LOCK_POLL_SECONDS = 0.05
+
+Result = Tuple[List[str], List[float]]
+
+
+class _Request(NamedTuple):
+    """One get_or_compute() call, carried into locked and background computations"""
+    key: str
+    scope: str
+    compute: Callable[[], Result]
+    ttl: int
+    endpoint: Optional[str]
+    cache_empty: bool
+
 
 class RecommendationCache:
-    """Redis-based cache for recommendation results, reusing EmbeddingCache connection pool"""
+    """
+    Redis-based cache for recommendation results, reusing EmbeddingCache connection pool
+    
+    Invalidation bumps generation counters (see cache_namespace.py) instead
+    of scanning for keys: clear_all() for everything, delete(user_id) for
+    one user, delete_similar_jobs(job_id) for one job.
+    
+    get_or_compute() protects expensive computations from stampedes:
+    single-flight on a miss, stale-while-revalidate past the fresh TTL and
+    probabilistic early refresh (XFetch) just before it.
+    """
     
-    def __init__(self, ttl_seconds: int = 300, key_prefix: str = "rec:"):
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        key_prefix: str = "rec:",
+        stale_ttl_seconds: int = None,
+        xfetch_beta: float = None,
+        lock_timeout: float = None,
+    ):
         """
         Initialize recommendation cache using existing Redis connection
         
         Args:
             ttl_seconds: TTL for cached recommendations (default: 300 = 5 minutes)
             key_prefix: Prefix for cache keys
+            stale_ttl_seconds: How long get_or_compute() may serve an entry past
+                ttl_seconds while a background refresh runs
+            xfetch_beta: Eagerness of probabilistic early refresh (0 disables)
+            lock_timeout: Longest a miss waits for another process's computation
         """
         self.ttl_seconds = ttl_seconds
         self.key_prefix = key_prefix
+        self.stale_ttl_seconds = stale_ttl_seconds if stale_ttl_seconds is not None else settings.recommendation_cache_stale_ttl
+        self.xfetch_beta = xfetch_beta if xfetch_beta is not None else settings.recommendation_cache_xfetch_beta
+        self.lock_timeout = lock_timeout if lock_timeout is not None else settings.recommendation_cache_lock_timeout
+        self._flight = SingleFlight()
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
         
         # Reuse connection pool from EmbeddingCache
         embedding_cache = get_cache()
         if embedding_cache and hasattr(embedding_cache, 'redis_client'):
             self.redis_client = embedding_cache.redis_client
             self.enabled = True
+            self.generations = CacheGenerations(
+                self.redis_client, self.key_prefix,
+                scope_ttl_seconds=max(SCOPE_GENERATION_TTL, 2 * self.ttl_seconds),
+            )
+            self.counters = CacheCounters(self.redis_client, f"{self.key_prefix.rstrip(':')}:stats")
             logger.info(f"Recommendation cache initialized using shared Redis connection, TTL: {self.ttl_seconds}s")
         else:
             self.enabled = False
@@ -37,11 +99,258 @@ class RecommendationCache:
         """Create cache key from user ID and request hash"""
         return f"{self.key_prefix}{user_id}:{request_hash}"
     
+    def _make_similar_key(self, job_id: str, request_hash: str) -> str:
+        """Create cache key for similar jobs from job ID and request hash"""
+        return f"{self.key_prefix}similar:{job_id}:{request_hash}"
+    
     def _hash_request(self, request_dict: dict) -> str:
         """Create hash from request parameters"""
-        sorted_dict = json.dumps(request_dict, sort_keys=True)
+        sorted_dict = json.dumps(request_dict, sort_keys=True, default=str)
         return hashlib.md5(sorted_dict.encode('utf-8')).hexdigest()[:16]
     
+    def endpoint_key(self, endpoint: str, scope: str, arguments: dict) -> str:
+        """Cache key for one call of a cached_result() entry point"""
+        return f"{self.key_prefix}{endpoint}:{scope}:{self._hash_request(arguments)}"
+    
+    def _read(self, key: str, scope: str, record: bool = True) -> Tuple[Optional[dict], List[int]]:
+        """
+        Read an entry together with the generations it must match (one MGET)
+        
+        Entries store the [global, scope] generations they were written
+        under; a bump of either since then makes the entry a miss.
+        
+        Returns:
+            (entry or None, current generations)
+        """
+        *generation_values, cached_data = self.redis_client.mget(self.generations.keys([scope]) + [key])
+        generations = CacheGenerations.parse(generation_values)
+        if cached_data is None:
+            if record:
+                self.counters.record(misses=1)
+            return None, generations
+        
+        # Decode bytes to string if needed (shared connection uses decode_responses=False)
+        if isinstance(cached_data, bytes):
+            cached_data = cached_data.decode('utf-8')
+        
+        data = json.loads(cached_data)
+        if data.get('gen') != generations:
+            if record:
+                self.counters.record(misses=1, invalidated=1)
+            return None, generations
+        
+        if record:
+            self.counters.record(hits=1)
+            self.counters.flush()
+        return data, generations
+    
+    def _get_entry(self, key: str, scope: str) -> Optional[dict]:
+        """Entry if still fresh (the stale window is only for get_or_compute)"""
+        data = self._read(key, scope)[0]
+        if data is not None and 'createdAt' in data and time.time() >= data['createdAt'] + data.get('ttl', self.ttl_seconds):
+            return None
+        return data
+    
+    def _set_entry(
+        self,
+        key: str,
+        scope: str,
+        data: dict,
+        ttl: int,
+        generations: List[int] = None,
+        compute_seconds: float = 0.0,
+        stale_window: bool = False,
+    ) -> None:
+        """
+        Args:
+            generations: Generations observed before computing data (default:
+                current); an invalidation during the computation then wins
+            compute_seconds: Recompute cost, used for early refresh
+            stale_window: Keep the entry stale_ttl_seconds past ttl for get_or_compute()
+        """
+        data = dict(
+            data,
+            gen=generations if generations is not None else self.generations.current([scope]),
+            createdAt=time.time(),
+            ttl=ttl,
+            delta=round(compute_seconds, 4),
+        )
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        # Encode to bytes since shared connection uses decode_responses=False
+        pipe.setex(key, ttl + (self.stale_ttl_seconds if stale_window else 0), json.dumps(data).encode('utf-8'))
+        self.counters.record(sets=1)
+        self.counters.flush(pipe)
+        pipe.execute()
+    
+    def get_or_compute(
+        self,
+        key: str,
+        scope: str,
+        compute: Callable[[], Result],
+        ttl: Optional[int] = None,
+        endpoint: str = None,
+        cache_empty: bool = True,
+        on_hit: Callable[[Result], Result] = None,
+    ) -> Result:
+        """
+        Cached (ids, scores) for key, computed by compute() at most once at a time
+        
+        - fresh entry: returned; close to expiry a background refresh may
+          start early (XFetch: the costlier the computation, the earlier)
+        - stale entry (past ttl, within stale_ttl_seconds): returned while a
+          single background refresh replaces it
+        - missing: one thread per process computes (single-flight) and,
+          across processes, the holder of a short Redis lock; the others
+          wait for its result
+        
+        Exceptions from compute() propagate and nothing is cached.
+        
+        Args:
+            key: Cache key
+            scope: Invalidation scope, e.g. "user:<id>" or "job:<id>"
+            compute: Produces (ids, scores) on a miss
+            ttl: Fresh lifetime in seconds (default: ttl_seconds)
+            endpoint: Name for per-endpoint counters (see stats())
+            cache_empty: Store empty results (callers that turn errors into
+                empty lists pass False)
+            on_hit: Applied to results served from an existing (fresh or
+                stale) entry, never to one just computed
+        """
+        if not self.enabled or not self.redis_client:
+            return compute()
+        request = _Request(key, scope, compute, ttl if ttl is not None else self.ttl_seconds, endpoint, cache_empty)
+        
+        try:
+            data, generations = self._read(key, scope)
+        except Exception as e:
+            logger.warning(f"Recommendation cache read failed, computing directly: {e}")
+            return compute()
+        
+        if data is not None:
+            self._record(request, hits=1)
+            if self._needs_refresh(data, request.ttl):
+                self._refresh_in_background(request)
+            result = data.get('jobIds', []), data.get('scores', [])
+            return on_hit(result) if on_hit is not None else result
+        
+        self._record(request, misses=1)
+        result, leader = self._flight.do(key, lambda: self._compute_once(request, generations))
+        if not leader:
+            self.counters.record(coalesced=1)
+        return result
+    
+    def _record(self, request: "_Request", **deltas: int) -> None:
+        """Count per endpoint as "<endpoint>.<counter>" (merged into stats()['endpoints'])"""
+        if request.endpoint:
+            self.counters.record(**{f"{request.endpoint}.{name}": delta for name, delta in deltas.items()})
+    
+    def _needs_refresh(self, data: dict, ttl: int) -> bool:
+        created_at = data.get('createdAt')
+        if created_at is None:
+            return False
+        now = time.time()
+        expires_at = created_at + data.get('ttl', ttl)
+        if now >= expires_at:
+            self.counters.record(stale_served=1)
+            return True
+        delta = data.get('delta') or 0.0
+        # XFetch: refresh early with probability rising as expiry approaches
+        if self.xfetch_beta > 0 and delta > 0:
+            if now - delta * self.xfetch_beta * math.log(1.0 - random.random()) >= expires_at:
+                self.counters.record(early_refresh=1)
+                return True
+        return False
+    
+    def _acquire(self, key: str) -> Optional[str]:
+        """Short cross-process compute lock for key; returns the token if acquired"""
+        token = uuid.uuid4().hex
+        acquired = self.redis_client.set(f"{key}:lock", token, nx=True, px=int(self.lock_timeout * 1000))
+        return token if acquired else None
+    
+    def _release(self, key: str, token: str) -> None:
+        try:
+            lock_key = f"{key}:lock"
+            if self.redis_client.get(lock_key) == token.encode():
+                self.redis_client.delete(lock_key)
+        except redis.RedisError as e:
+            logger.warning(f"Redis error releasing cache lock: {e}")
+    
+    def _compute_and_store(self, request: "_Request", generations: List[int]) -> Result:
+        started = time.time()
+        job_ids, scores = request.compute()
+        compute_seconds = time.time() - started
+        self._record(request, computes=1, compute_ms=int(compute_seconds * 1000))
+        if not job_ids and not request.cache_empty:
+            return job_ids, scores
+        try:
+            self._set_entry(
+                request.key, request.scope, {'jobIds': list(job_ids), 'scores': list(scores)}, request.ttl,
+                generations=generations, compute_seconds=compute_seconds, stale_window=True,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache {request.key}: {e}")
+        return job_ids, scores
+    
+    def _compute_once(self, request: "_Request", generations: List[int]) -> Result:
+        try:
+            token = self._acquire(request.key)
+        except redis.RedisError as e:
+            logger.warning(f"Redis error acquiring cache lock, computing anyway: {e}")
+            return request.compute()
+        
+        if token is None:
+            # Another process is computing this key: wait for its entry
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_SECONDS)
+                try:
+                    data, _ = self._read(request.key, request.scope, record=False)
+                except Exception:
+                    break
+                if data is not None:
+                    self.counters.record(coalesced=1)
+                    return data.get('jobIds', []), data.get('scores', [])
+            logger.info(f"Timed out waiting for {request.key} from another process, computing it here")
+            return self._compute_and_store(request, generations)
+        
+        try:
+            return self._compute_and_store(request, generations)
+        finally:
+            self._release(request.key, token)
+    
+    def _refresh_in_background(self, request: "_Request") -> None:
+        key = request.key
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=settings.recommendation_cache_refresh_workers,
+                    thread_name_prefix="rec-cache-refresh",
+                )
+        
+        def refresh():
+            try:
+                # Another process may already be refreshing this key
+                token = self._acquire(key)
+                if token is None:
+                    return
+                try:
+                    generations = self.generations.current([request.scope])
+                    self._compute_and_store(request, generations)
+                    self.counters.record(refreshes=1)
+                finally:
+                    self._release(key, token)
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+        
+        self._refresh_executor.submit(refresh)
+    
     def get(
         self, 
         user_id: str, 
@@ -55,17 +364,9 @@ class RecommendationCache:
             request_hash = self._hash_request(request_dict)
             key = self._make_cache_key(user_id, request_hash)
             
-            # Use get with decode_responses=False since we're sharing connection
-            # But we need to decode manually for JSON
-            cached_data = self.redis_client.get(key)
-            if cached_data is None:
+            data = self._get_entry(key, f"user:{user_id}")
+            if data is None:
                 return None
-            
-            # Decode bytes to string if needed
-            if isinstance(cached_data, bytes):
-                cached_data = cached_data.decode('utf-8')
-            
-            data = json.loads(cached_data)
             job_ids = data.get('jobIds', [])
             scores = data.get('scores', [])
             
@@ -103,10 +404,7 @@ class RecommendationCache:
             }
             
             ttl_to_use = ttl if ttl is not None else self.ttl_seconds
-            # Encode to bytes since shared connection uses decode_responses=False
-            json_data = json.dumps(data).encode('utf-8')
-            
-            self.redis_client.setex(key, ttl_to_use, json_data)
+            self._set_entry(key, f"user:{user_id}", data, ttl_to_use)
             
             logger.debug(f"Cached recommendations for user {user_id} (TTL: {ttl_to_use}s)")
             return True
@@ -119,7 +417,7 @@ class RecommendationCache:
             return False
     
     def delete(self, user_id: str, request_dict: dict = None) -> bool:
-        """Delete cached recommendations for a user"""
+        """Delete cached recommendations for one request, or all of a user's (one INCR)"""
         if not self.enabled or not self.redis_client:
             return False
         
@@ -129,29 +427,64 @@ class RecommendationCache:
                 key = self._make_cache_key(user_id, request_hash)
                 return bool(self.redis_client.delete(key))
             else:
-                pattern = f"{self.key_prefix}{user_id}:*"
-                keys = list(self.redis_client.scan_iter(match=pattern))
-                if keys:
-                    return bool(self.redis_client.delete(*keys))
+                self.generations.bump(f"user:{user_id}")
                 return True
         except redis.RedisError as e:
             logger.warning(f"Redis error deleting recommendation cache: {e}")
             return False
     
+    def delete_similar_jobs(self, job_id: str) -> bool:
+        """Invalidate every cached similar-jobs list for a job (one INCR)"""
+        if not self.enabled or not self.redis_client:
+            return False
+        
+        try:
+            self.generations.bump(f"job:{job_id}")
+            return True
+        except redis.RedisError as e:
+            logger.warning(f"Redis error deleting similar jobs cache: {e}")
+            return False
+    
     def clear_all(self) -> int:
-        """Clear all recommendation cache"""
+        """
+        Invalidate all recommendation cache entries with a single INCR
+        
+        Returns:
+            The new global generation (0 if the cache is unavailable)
+        """
         if not self.enabled or not self.redis_client:
             return 0
         
         try:
-            pattern = f"{self.key_prefix}*"
-            keys = list(self.redis_client.scan_iter(match=pattern))
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            generation = self.generations.bump()
+            logger.info(f"Recommendation cache cleared (generation {generation})")
+            return generation
         except redis.RedisError as e:
             logger.warning(f"Redis error clearing recommendation cache: {e}")
             return 0
+    
+    def stats(self) -> dict:
+        """Hit/miss/set counters merged across processes (constant time: no keyspace scan)"""
+        if not self.enabled or not self.redis_client:
+            return {'enabled': False}
+        
+        try:
+            counters = self.counters.read()
+            totals, endpoints = _split_endpoint_counters(counters['total'])
+            return {
+                'enabled': True,
+                'generation': self.generations.current()[0],
+                'hit_ratio': hit_ratio(totals),
+                'counters': totals,
+                'endpoints': endpoints,
+                'process': counters['process'],
+                'ttl_seconds': self.ttl_seconds,
+                'key_prefix': self.key_prefix,
+            }
+        except redis.RedisError as e:
+            logger.warning(f"Redis error getting recommendation cache stats: {e}")
+            return {'enabled': True, 'error': str(e)}
+
     def get_similar_jobs(
         self,
         job_id: str,
@@ -163,16 +496,11 @@ class RecommendationCache:
         
         try:
             request_hash = self._hash_request(request_dict)
-            key = f"{self.key_prefix}similar:{job_id}:{request_hash}"
+            key = self._make_similar_key(job_id, request_hash)
             
-            cached_data = self.redis_client.get(key)
-            if cached_data is None:
+            data = self._get_entry(key, f"job:{job_id}")
+            if data is None:
                 return None
-            
-            if isinstance(cached_data, bytes):
-                cached_data = cached_data.decode('utf-8')
-            
-            data = json.loads(cached_data)
             job_ids = data.get('jobIds', [])
             scores = data.get('scores', [])
             
@@ -200,7 +528,7 @@ class RecommendationCache:
         
         try:
             request_hash = self._hash_request(request_dict)
-            key = f"{self.key_prefix}similar:{job_id}:{request_hash}"
+            key = self._make_similar_key(job_id, request_hash)
             
             data = {
                 'jobIds': job_ids,
@@ -208,9 +536,7 @@ class RecommendationCache:
             }
             
             ttl_to_use = ttl if ttl is not None else self.ttl_seconds
-            json_data = json.dumps(data).encode('utf-8')
-            
-            self.redis_client.setex(key, ttl_to_use, json_data)
+            self._set_entry(key, f"job:{job_id}", data, ttl_to_use)
             
             logger.debug(f"Cached similar jobs for job {job_id} (TTL: {ttl_to_use}s)")
             return True
@@ -222,6 +548,86 @@ class RecommendationCache:
             logger.error(f"Error serializing similar jobs for cache: {e}")
             return False
 
+
+def _split_endpoint_counters(counters: Dict[str, int]) -> Tuple[Dict[str, int], Dict[str, dict]]:
+    """Separate "<endpoint>.<counter>" fields into a per-endpoint breakdown"""
+    totals, endpoints = {}, {}
+    for name, value in counters.items():
+        endpoint, dot, counter = name.rpartition('.')
+        if dot:
+            endpoints.setdefault(endpoint, {})[counter] = value
+        else:
+            totals[name] = value
+    for values in endpoints.values():
+        values['hit_ratio'] = hit_ratio(values)
+        if values.get('computes'):
+            values['avg_compute_ms'] = round(values.get('compute_ms', 0) / values['computes'], 1)
+    return totals, endpoints
+
+
+def _key_value(value: Any, ignore: Tuple[str, ...]) -> Any:
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json', exclude=set(ignore) or None)
+    return value
+
+
+def cached_result(
+    endpoint: str,
+    scope: Callable[[dict], str],
+    ttl: Callable[[], int] = None,
+    cache_empty: bool = False,
+    postprocess: Callable[[Any, List[str], List[float]], Result] = None,
+    ignore: Tuple[str, ...] = (),
+):
+    """
+    Cache a service method returning (ids, scores) through RecommendationCache.get_or_compute()
+    
+    The key hashes every argument of the call (pydantic models in full), so
+    two calls share an entry only if they would compute the same result.
+    The decorated object must expose the cache as self.cache (None = off);
+    the undecorated method stays available as .uncached.
+    
+    Args:
+        endpoint: Name used in keys and per-endpoint stats
+        scope: Invalidation scope from the bound arguments, e.g. "user:<id>"
+        ttl: Fresh lifetime, read on every call (default: cache ttl_seconds)
+        cache_empty: Store empty results (off: most entry points return
+            empty lists on errors)
+        postprocess: Applied as postprocess(self, ids, scores) to results served
+            from the cache, not to freshly computed ones
+        ignore: Model fields left out of the key (accepted but never read)
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            cache = self.cache
+            if cache is None:
+                return fn(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                name: _key_value(value, ignore)
+                for name, value in list(bound.arguments.items())[1:]
+            }
+            call_scope = scope(arguments)
+            return cache.get_or_compute(
+                cache.endpoint_key(endpoint, call_scope, arguments),
+                call_scope,
+                lambda: fn(self, *args, **kwargs),
+                ttl=ttl() if ttl else None,
+                endpoint=endpoint,
+                cache_empty=cache_empty,
+                on_hit=(lambda result: postprocess(self, *result)) if postprocess is not None else None,
+            )
+        
+        wrapper.uncached = fn
+        return wrapper
+    
+    return decorator
+
+
 _recommendation_cache: Optional[RecommendationCache] = None
 
 
@@ -230,6 +636,6 @@ def get_recommendation_cache() -> Optional[RecommendationCache]:
     global _recommendation_cache
     
     if _recommendation_cache is None:
-        _recommendation_cache = RecommendationCache(ttl_seconds=300)  # 5 minutes
+        _recommendation_cache = RecommendationCache(ttl_seconds=settings.recommendation_cache_ttl)
     
     return _recommendation_cache if _recommendation_cache.enabled else None
\ No newline at end of file
@@ -1,20 +1,50 @@
+import functools
 import numpy as np
 import logging
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 from ..database import db
 from ..config import settings
 from ..services.embedding_service import embedding_service
 from ..services.cf_service import cf_service
 from ..models.schemas import RecommendationRequest, UserPreferences
-from .recommendation_cache import get_recommendation_cache
+from ..utils.pgvector import to_pgvector
+from ..utils.vector_codec import row_vector, vector_select
+from .recommendation_cache import cached_result, get_recommendation_cache
+from .job_vector_index import job_vector_index
+from .precomputed_recommendations import precomputed_recommendations, precomputed_similar_jobs
+from . import scoring
 
 logger = logging.getLogger(__name__)
 
 
+def _user_scope(arguments: dict) -> str:
+    return f"user:{arguments['request']['userId']}"
+
+
+def _job_scope(arguments: dict) -> str:
+    return f"job:{arguments['job_id']}"
+
+
+def _active_jobs(service: "RecommendationService", job_ids: List[str], scores: List[float]) -> Tuple[List[str], List[float]]:
+    return service._drop_removed_jobs(job_ids, scores)
+
+
+# recentInteractions is accepted by RecommendationRequest but read by no path
+cached_user_endpoint = functools.partial(
+    cached_result, scope=_user_scope, postprocess=_active_jobs, ignore=('recentInteractions',)
+)
+cached_job_endpoint = functools.partial(cached_result, scope=_job_scope)
+
+
 class RecommendationService:
     def __init__(self):
         self.alpha = settings.hybrid_alpha
-        self.cache = get_recommendation_cache()  #
+        self.job_index = job_vector_index
+
+    @property
+    def cache(self):
+        # Resolved on first use so importing the service does not connect to Redis
+        return get_recommendation_cache()
     
     def get_candidate_jobs(self, user_id: str, preferences: UserPreferences = None) -> List[str]:
         """Get candidate job IDs with basic filtering"""
@@ -107,61 +137,130 @@ class RecommendationService:
         if not preferences:
             return job_scores
         
-        # Get job details for boosting
         job_ids = [job_id for job_id, _ in job_scores]
         if not job_ids:
             return job_scores
         
+        boost_fields = self._job_boost_fields(job_ids)
+        if boost_fields is None:
+            return job_scores
+        
+        scores = np.array([score for _, score in job_scores], dtype=np.float32)
+        boosts = scoring.preference_boosts(preferences, *boost_fields)
+        boosted = scoring.apply_boosts(scores, boosts, preferences)
+        return list(zip(job_ids, boosted.tolist()))
+    
+    def _job_boost_fields(self, job_ids: List[str]) -> Optional[Tuple[List, List]]:
+        """Location and organization of each job (aligned with job_ids) for preference masks"""
         try:
-            placeholders = ','.join(['%s'] * len(job_ids))
-            query = f"""
-                SELECT id, "organizationId" as organization_id, location, "salaryDetails" as salary_details
+            query = """
+                SELECT id, "organizationId" as organization_id, location
                 FROM jobs
-                WHERE id IN ({placeholders})
+                WHERE id = ANY(%s::uuid[])
             """
-            job_details = db.execute_query(query, tuple(job_ids))
-            job_map = {str(row['id']): row for row in job_details}
-            
-            boosted = []
-            for job_id, score in job_scores:
-                boost = 0.0
-                job = job_map.get(job_id)
-                
-                if job and preferences:
-                    # Boost for preferred locations
-                    if preferences.preferredLocations and job.get('location'):
-                        if job['location'] in preferences.preferredLocations:
-                            boost += 0.1
-                    
-                    # Penalty for hidden companies
-                    if preferences.hiddenCompanyIds and job.get('organization_id'):
-                        if str(job['organization_id']) in preferences.hiddenCompanyIds:
-                            boost -= 0.5
-                    
-                    # Boost for preferred company size (if available)
-                    # This would require joining with organizations table
-                
-                boosted.append((job_id, max(0.0, score + boost)))
-            
-            return boosted
+            job_map = {str(row['id']): row for row in db.execute_query(query, (job_ids,))}
         except Exception as e:
             logger.error(f"Error applying preference boosts: {e}")
-            return job_scores
+            return None
+        
+        locations = [job_map[job_id]['location'] if job_id in job_map else None for job_id in job_ids]
+        organization_ids = [job_map[job_id]['organization_id'] if job_id in job_map else None for job_id in job_ids]
+        return locations, organization_ids
+    
+    def _job_content_matrix(self, job_ids: List[str]) -> Optional[np.ndarray]:
+        """Normalized job embeddings aligned with job_ids (zero rows for jobs without one)"""
+        matrix, found = None, np.zeros(len(job_ids), dtype=bool)
+        if self.job_index.is_loaded:
+            matrix, found = self.job_index.vectors(job_ids)
+        
+        missing = [job_ids[i] for i in np.flatnonzero(~found)]
+        if not missing:
+            return matrix
+        
+        # Index not loaded yet, or jobs added since the last refresh
+        try:
+            job_embeddings = self.batch_load_embeddings(missing)
+        except Exception as e:
+            logger.error(f"Error batch loading job embeddings: {e}")
+            job_embeddings = {}
+        if not job_embeddings:
+            return matrix
+        
+        if matrix is None:
+            dim = len(next(iter(job_embeddings.values())))
+            matrix = np.zeros((len(job_ids), dim), dtype=np.float32)
+        for i in np.flatnonzero(~found):
+            job_emb = job_embeddings.get(job_ids[i])
+            if job_emb is not None and len(job_emb) == matrix.shape[1]:
+                norm = np.linalg.norm(job_emb)
+                if norm > 0:
+                    matrix[i] = job_emb / norm
+        return matrix
+    
+    def _job_cf_matrix(self, job_ids: List[str], cf_dim: int) -> Optional[np.ndarray]:
+        """Job CF factors aligned with job_ids (zero rows for jobs without factors)"""
+        try:
+            job_factors = cf_service.get_job_cf_factors_batch(job_ids)
+        except Exception as e:
+            logger.error(f"Error batch loading job CF factors: {e}")
+            return None
+        
+        return self._stack_vectors(job_ids, job_factors, cf_dim)
+    
+    @staticmethod
+    def _stack_vectors(ids: List[str], vectors: dict, dim: int) -> np.ndarray:
+        """Stack vectors into a matrix aligned with ids, zero-filling missing or mis-sized ones"""
+        matrix = np.zeros((len(ids), dim), dtype=np.float32)
+        for i, key in enumerate(ids):
+            vector = vectors.get(key)
+            if vector is not None and len(vector) == dim:
+                matrix[i] = vector
+        return matrix
+    
+    def _rank_jobs(
+        self,
+        user_emb: np.ndarray,
+        user_cf: Optional[np.ndarray],
+        job_ids: List[str],
+        preferences: UserPreferences,
+        limit: int,
+    ) -> Tuple[List[str], List[float]]:
+        """Hybrid-score candidate jobs in one pass and return the top `limit`"""
+        job_matrix = self._job_content_matrix(job_ids)
+        if job_matrix is None:
+            return [], []
+        
+        cf_matrix = self._job_cf_matrix(job_ids, len(user_cf)) if user_cf is not None else None
+        scores = scoring.hybrid_scores(user_emb, job_matrix, user_cf, cf_matrix, self.alpha, normalized=True)
+        
+        if preferences:
+            boost_fields = self._job_boost_fields(job_ids)
+            if boost_fields is not None:
+                boosts = scoring.preference_boosts(preferences, *boost_fields)
+                scores = scoring.apply_boosts(scores, boosts, preferences)
+        
+        top, top_scores = scoring.top_k(scores, limit)
+        return [job_ids[i] for i in top], top_scores.tolist()
         
+    @cached_user_endpoint("recommendations_hybrid", ttl=lambda: settings.recommendation_cache_ttl)
     def get_recommendations(self, request: RecommendationRequest) -> Tuple[List[str], List[float]]:
         """Main recommendation logic with caching"""
-        cache_key = {
-            'userId': request.userId,
-            'limit': request.limit,
-            'preferences': self._serialize_preferences(request.preferences) if request.preferences else None,
-        }
-        
-        if self.cache:
-            cached_result = self.cache.get(request.userId, cache_key)
-            if cached_result is not None:
-                logger.info(f"Returning cached recommendations for user {request.userId}")
-                return cached_result
+        return self._compute_recommendations(request)
     
+    def _drop_removed_jobs(self, job_ids: List[str], scores: List[float]) -> Tuple[List[str], List[float]]:
+        """
+        Filter a cached list down to jobs still in the job vector index
+        
+        Closed or deleted jobs leave the index (through refresh or an
+        invalidation event) while lists containing them may stay cached.
+        """
+        if not self.job_index.is_loaded:
+            return job_ids, scores
+        kept = [(job_id, score) for job_id, score in zip(job_ids, scores) if self.job_index.get(job_id) is not None]
+        return [job_id for job_id, _ in kept], [score for _, score in kept]
+    
+    def _compute_recommendations(self, request: RecommendationRequest) -> Tuple[List[str], List[float]]:
+        """Uncached body of get_recommendations"""
         candidate_job_ids = self.get_candidate_jobs_optimized(request.userId, request.preferences)
         
         if not candidate_job_ids:
@@ -186,101 +285,41 @@ class RecommendationService:
         if user_cf is None:
             logger.warning(f"User {request.userId} has no CF factors in database")
 
-        # Batch load all job embeddings
-        job_embeddings = {}
-        job_cf_factors = {}
-        
-        # Load job embeddings in batch
-        try:
-            emb_query = """
-                SELECT "jobId", embedding
-                FROM job_content_embeddings
-                WHERE "jobId" = ANY(%s::uuid[])
-            """
-            emb_results = db.execute_query(emb_query, tuple(candidate_job_ids))
-            for row in emb_results:
-                job_id = str(row['jobId'])
-                emb_data = row['embedding']
-                if emb_data:
-                    if isinstance(emb_data, list):
-                        job_embeddings[job_id] = np.array(emb_data, dtype=np.float32)
-                    elif isinstance(emb_data, str):
-                        import json
-                        job_embeddings[job_id] = np.array(json.loads(emb_data), dtype=np.float32)
-                    else:
-                        job_embeddings[job_id] = np.array(emb_data, dtype=np.float32)
-        except Exception as e:
-            logger.error(f"Error batch loading job embeddings: {e}")
-        
-        # Load job CF factors in batch
-        try:
-            cf_query = """
-                SELECT "jobId", factors
-                FROM job_cf_factors
-                WHERE "jobId" = ANY(%s::uuid[])
-            """
-            cf_results = db.execute_query(cf_query, tuple(candidate_job_ids))
-            for row in cf_results:
-                job_id = str(row['jobId'])
-                factors_data = row['factors']
-                if factors_data:
-                    if isinstance(factors_data, list):
-                        job_cf_factors[job_id] = np.array(factors_data, dtype=np.float32)
-                    elif isinstance(factors_data, str):
-                        import json
-                        job_cf_factors[job_id] = np.array(json.loads(factors_data), dtype=np.float32)
-                    else:
-                        job_cf_factors[job_id] = np.array(factors_data, dtype=np.float32)
-        except Exception as e:
-            logger.error(f"Error batch loading job CF factors: {e}")
-        
-        # 3. Score each candidate using pre-loaded data - VECTORIZED APPROACH
-        scored_jobs = []
-        user_emb_norm = np.linalg.norm(user_emb) if user_emb is not None else 1.0
-        
-        for job_id in candidate_job_ids:
-            try:
-                job_emb = job_embeddings.get(job_id)
-                job_cf = job_cf_factors.get(job_id)
-                
-                # Content-based score
-                if job_emb is not None:
-                    content_score = float(np.dot(user_emb, job_emb) / (user_emb_norm * np.linalg.norm(job_emb)))
-                else:
-                    content_score = 0.0
-
-                # Collaborative filtering score
-                if user_cf is not None and job_cf is not None:
-                    cf_score = float(np.dot(user_cf, job_cf))
-                else:
-                    cf_score = 0.0
-
-                # Hybrid combination
-                final_score = self.alpha * content_score + (1 - self.alpha) * cf_score
-                
-                # Append the score
-                scored_jobs.append((job_id, final_score))
-            except Exception as e:
-                logger.error(f"Error scoring job {job_id}: {e}")
-                continue
-        
-        # 4. Apply preference boosts
-        scored_jobs = self.apply_preference_boosts(scored_jobs, request.preferences)
-        
-        # 5. Sort by score (descending)
-        scored_jobs.sort(key=lambda x: x[1], reverse=True)
-        
-        # 6. Return top N
-        top_jobs = scored_jobs[:request.limit]
-        top_job_ids = [job_id for job_id, _ in top_jobs]
-        top_scores = [score for _, score in top_jobs]
+        # Content rows come from the resident job vector index; scoring, boosts and top-k are vectorized
+        top_job_ids, top_scores = self._rank_jobs(
+            user_emb, user_cf, candidate_job_ids, request.preferences, request.limit
+        )
         
         logger.info(f"Generated {len(top_job_ids)} recommendations for user {request.userId}")
-        self.cache.set_recommendations(request.userId, cache_key, top_job_ids, top_scores, ttl=300)
         return top_job_ids, top_scores
     
+    def _job_vector_column(self) -> str:
+        """SQL expression for the job embedding as a pgvector value"""
+        if settings.pgvector_columns_enabled:
+            return 'jce."embeddingVector"'
+        # Legacy path: cast JSONB on every row (sequential scan, no index)
+        return 'jce.embedding::text::vector'
+    
+    def _ef_search_settings(self, limit: int) -> Optional[Dict[str, int]]:
+        """
+        hnsw.ef_search for an index scan that must return `limit` rows
+
+        The HNSW scan yields at most ef_search rows, so it is widened to the
+        query's LIMIT when that is larger (up to pgvector's maximum of 1000).
+        """
+        if settings.pgvector_columns_enabled:
+            return {'hnsw.ef_search': min(max(int(settings.pgvector_ef_search), limit), 1000)}
+        return None
+    
+    @cached_user_endpoint("recommendations", ttl=lambda: settings.recommendation_cache_ttl)
     def get_recommendations_optimized(self, request: RecommendationRequest) -> Tuple[List[str], List[float]]:
-        """Optimized version using pgvector database-level search"""
+        """Optimized version using pgvector database-level search, with caching"""
+        
+        # Nightly list for this user, if fresh and enough of it passes the filters
+        if settings.precomputed_recommendations_enabled and precomputed_recommendations.serves(request):
+            precomputed = precomputed_recommendations.lookup(request.userId, request.preferences, request.limit)
+            if precomputed is not None:
+                return precomputed
         
         # Get user embedding once
         user_emb = embedding_service.get_user_embedding(request.userId)
@@ -288,10 +327,13 @@ class RecommendationService:
             return [], []
         
         # Convert to pgvector format: '[0.1,0.2,...]'
-        user_emb_str = '[' + ','.join(map(str, user_emb.tolist())) + ']'
+        user_emb_str = to_pgvector(user_emb)
+        vector_column = self._job_vector_column()
         
-        # Single query with database-level vector similarity search
-        query = """
+        # Single query with database-level vector similarity search.
+        # ORDER BY distance on the native column + LIMIT lets Postgres use the HNSW index;
+        # ef_search (set for this transaction) bounds how many candidates the scan returns.
+        query = f"""
             WITH vector_similarity AS (
                 SELECT 
                     j.id,
@@ -299,34 +341,30 @@ class RecommendationService:
                     j.location,
                     j."salaryDetails",
                     -- Content-based score using pgvector cosine distance
-                    -- Cast jsonb to vector for pgvector operations
-                    1 - (jce.embedding::text::vector <=> %s::vector) AS content_score,
+                    1 - ({vector_column} <=> %s::vector) AS content_score,
                     -- Get CF factors if available
-                    jcf.factors AS cf_factors
+                    {vector_select('factors', 'factorsBin', 'jcf')}
                 FROM jobs j
                 INNER JOIN job_content_embeddings jce ON j.id = jce."jobId"
                 LEFT JOIN job_cf_factors jcf ON j.id = jcf."jobId"
                 WHERE j.status = 'active'
                 AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+                AND {vector_column} IS NOT NULL
                 -- Apply preference filters
                 AND (%s::uuid[] IS NULL OR j."organizationId" != ALL(%s::uuid[]))
                 AND (%s::text[] IS NULL OR j.location = ANY(%s::text[]))
                 AND (%s::int IS NULL OR (j."salaryDetails"->>'minAmount')::int >= %s)
-                -- Use vector index for fast similarity search
-                -- Cast jsonb to vector for ordering
-                ORDER BY jce.embedding::text::vector <=> %s::vector
-                LIMIT 1000  -- Get more candidates for re-ranking
+                ORDER BY {vector_column} <=> %s::vector
+                LIMIT %s  -- Candidate pool for re-ranking
             )
-            SELECT 
-                id,
-                content_score,
-                cf_factors
+            SELECT *
             FROM vector_similarity
             ORDER BY content_score DESC
             LIMIT %s
         """
         
         # Prepare parameters
+        candidate_limit = max(settings.pgvector_candidate_limit, request.limit)
         hidden_companies = request.preferences.hiddenCompanyIds if request.preferences else None
         preferred_locations = request.preferences.preferredLocations if request.preferences else None
         min_salary = request.preferences.minSalary if request.preferences else None
@@ -337,10 +375,11 @@ class RecommendationService:
             preferred_locations, preferred_locations,
             min_salary, min_salary,
             user_emb_str,  # vector query for ORDER BY
+            candidate_limit,
             request.limit
         )
         
-        results = db.execute_query(query, params)
+        results = db.execute_query(query, params, local_settings=self._ef_search_settings(candidate_limit))
         
         # Process results and compute hybrid scores
         user_cf = cf_service.get_user_cf_factors(request.userId)
@@ -351,8 +390,8 @@ class RecommendationService:
             content_score = float(row['content_score'])
             
             # CF score
-            if user_cf is not None and row['cf_factors']:
-                cf_factors = np.array(row['cf_factors'], dtype=np.float32)
+            cf_factors = row_vector(row, 'factors', 'factorsBin') if user_cf is not None else None
+            if cf_factors is not None:
                 cf_score = float(np.dot(user_cf, cf_factors))
             else:
                 cf_score = 0.0
@@ -369,139 +408,136 @@ class RecommendationService:
         top_scores = [score for _, score in scored_jobs]
         
         return top_job_ids, top_scores
+    @cached_job_endpoint("similar_jobs", ttl=lambda: settings.similar_jobs_cache_ttl, postprocess=_active_jobs)
     def get_similar_jobs(self, job_id: str, limit: int = 10, exclude_job_id: bool = True) -> Tuple[List[str], List[float]]:
         """Get similar jobs based on job embedding similarity with caching"""   
         try:
-            cache_key = {
-                'jobId': job_id,
-                'limit': limit,
-                'excludeJobId': exclude_job_id,
-            }
-            
-            if self.cache:
-                cached_result = self.cache.get_similar_jobs(job_id, cache_key)
-                if cached_result is not None:
-                    logger.info(f"Returning cached similar jobs for job {job_id}")
-                    return cached_result
-            
-            # Get the source job's embedding
+            return self._compute_similar_jobs(job_id, limit, exclude_job_id)
+        except Exception as e:
+            logger.error(f"Error getting similar jobs for {job_id}: {e}", exc_info=True)
+            return [], []
+    
+    def _compute_similar_jobs(self, job_id: str, limit: int, exclude_job_id: bool) -> Tuple[List[str], List[float]]:
+        """Similar jobs from the job vector index, or the database when it is not loaded"""
+        # Get the source job's embedding
+        source_emb = self.job_index.get(job_id) if self.job_index.is_loaded else None
+        if source_emb is None:
             source_emb = embedding_service.get_job_embedding(job_id)
-            if source_emb is None:
-                logger.warning(f"Job {job_id} has no embedding in database")
-                return [], []
-            
-            # Get candidate jobs (active jobs only)
-            query = """
-                SELECT j.id
-                FROM jobs j
-                WHERE j.status = 'active'
-                AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
-            """
-            if exclude_job_id:
-                query += " AND j.id != %s"
-                params = (job_id,)
-            else:
-                params = None
-            
-            try:
-                results = db.execute_query(query, params)
-                candidate_job_ids = [str(row['id']) for row in results]
-            except Exception as e:
-                logger.error(f"Error getting candidate jobs: {e}")
-                return [], []
-            
-            if not candidate_job_ids:
-                logger.warning("No candidate jobs found")
-                return [], []
-            
-            # Limit candidates for performance
-            if len(candidate_job_ids) > 500:
-                candidate_job_ids = candidate_job_ids[:500]
-            
-            # Batch load all job embeddings
-            logger.info(f"Loading embeddings for {len(candidate_job_ids)} candidate jobs")
+        if source_emb is None:
+            logger.warning(f"Job {job_id} has no embedding in database")
+            return [], []
+        
+        if self.job_index.is_loaded:
+            # Nearest neighbours over all active jobs (ANN-backed on large catalogues)
+            candidate_ids, similarities = self.job_index.search(
+                source_emb,
+                limit,
+                exclude={job_id} if exclude_job_id else None,
+            )
+            scored_jobs = list(zip(candidate_ids, similarities.tolist()))
+        else:
+            scored_jobs = self._similar_jobs_from_db(job_id, source_emb, exclude_job_id)
+        
+        # Sort by similarity (descending)
+        scored_jobs.sort(key=lambda x: x[1], reverse=True)
+        
+        # Return top N
+        top_jobs = scored_jobs[:limit]
+        top_job_ids = [job_id for job_id, _ in top_jobs]
+        top_scores = [score for _, score in top_jobs]
+        
+        logger.info(f"Generated {len(top_job_ids)} similar jobs for job {job_id}")
+        return top_job_ids, top_scores
+
+    def _similar_jobs_from_db(self, job_id: str, source_emb: np.ndarray, exclude_job_id: bool) -> List[Tuple[str, float]]:
+        """Score active jobs against source_emb by loading their embeddings from the database"""
+        # Get candidate jobs (active jobs only)
+        query = """
+            SELECT j.id
+            FROM jobs j
+            WHERE j.status = 'active'
+            AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+        """
+        if exclude_job_id:
+            query += " AND j.id != %s"
+            params = (job_id,)
+        else:
+            params = None
+        
+        try:
+            results = db.execute_query(query, params)
+            candidate_job_ids = [str(row['id']) for row in results]
+        except Exception as e:
+            logger.error(f"Error getting candidate jobs: {e}")
+            return []
+        
+        if not candidate_job_ids:
+            logger.warning("No candidate jobs found")
+            return []
+        
+        # Limit candidates for performance
+        if len(candidate_job_ids) > 500:
+            candidate_job_ids = candidate_job_ids[:500]
+        
+        # Batch load all job embeddings
+        logger.info(f"Loading embeddings for {len(candidate_job_ids)} candidate jobs")
+        try:
+            job_embeddings = self.batch_load_embeddings(candidate_job_ids)
+        except Exception as e:
+            logger.error(f"Error batch loading job embeddings: {e}")
             job_embeddings = {}
-            
-            placeholders = ','.join(['%s'] * len(candidate_job_ids))
+        
+        # Compute similarity scores
+        scored_jobs = []
+        source_emb_norm = np.linalg.norm(source_emb)
+        
+        for candidate_id in candidate_job_ids:
             try:
-                emb_query =  """
-                    SELECT "jobId", embedding
-                    FROM job_content_embeddings
-                    WHERE "jobId" = ANY(%s::uuid[])
-                """
-                emb_results = db.execute_query(emb_query, tuple(candidate_job_ids))
-                for row in emb_results:
-                    job_id_candidate = str(row['jobId'])
-                    emb_data = row['embedding']
-                    if emb_data:
-                        if isinstance(emb_data, list):
-                            job_embeddings[job_id_candidate] = np.array(emb_data, dtype=np.float32)
-                        elif isinstance(emb_data, str):
-                            import json
-                            job_embeddings[job_id_candidate] = np.array(json.loads(emb_data), dtype=np.float32)
-                        else:
-                            job_embeddings[job_id_candidate] = np.array(emb_data, dtype=np.float32)
+                candidate_emb = job_embeddings.get(candidate_id)
+                if candidate_emb is not None:
+                    # Compute cosine similarity
+                    similarity = float(np.dot(source_emb, candidate_emb) / (source_emb_norm * np.linalg.norm(candidate_emb)))
+                    scored_jobs.append((candidate_id, similarity))
             except Exception as e:
-                logger.error(f"Error batch loading job embeddings: {e}")
-            
-            # Compute similarity scores
-            scored_jobs = []
-            source_emb_norm = np.linalg.norm(source_emb)
-            
-            for candidate_id in candidate_job_ids:
-                try:
-                    candidate_emb = job_embeddings.get(candidate_id)
-                    if candidate_emb is not None:
-                        # Compute cosine similarity
-                        similarity = float(np.dot(source_emb, candidate_emb) / (source_emb_norm * np.linalg.norm(candidate_emb)))
-                        scored_jobs.append((candidate_id, similarity))
-                except Exception as e:
-                    logger.error(f"Error computing similarity for job {candidate_id}: {e}")
-                    continue
-            
-            # Sort by similarity (descending)
-            scored_jobs.sort(key=lambda x: x[1], reverse=True)
-            
-            # Return top N
-            top_jobs = scored_jobs[:limit]
-            top_job_ids = [job_id for job_id, _ in top_jobs]
-            top_scores = [score for _, score in top_jobs]
-            
-            if self.cache:
-                self.cache.set_similar_jobs(
-                    job_id,
-                    cache_key,
-                    top_job_ids,
-                    top_scores,
-                    ttl=300  # 5 minutes
-                )
-            
-            logger.info(f"Generated {len(top_job_ids)} similar jobs for job {job_id}")
-            return top_job_ids, top_scores
+                logger.error(f"Error computing similarity for job {candidate_id}: {e}")
+                continue
+        
+        return scored_jobs
+        
+    # Same endpoint name as get_similar_jobs: both paths share cache entries
+    @cached_job_endpoint("similar_jobs", ttl=lambda: settings.similar_jobs_cache_ttl, postprocess=_active_jobs)
+    def get_similar_jobs_optimized(self, job_id: str, limit: int = 10, exclude_job_id: bool = True) -> Tuple[List[str], List[float]]:
+        """Precomputed similar-jobs graph, else pgvector database-level search, with caching"""
+        try:
+            if settings.precomputed_similar_jobs_enabled and limit <= settings.similar_jobs_top_k:
+                precomputed = precomputed_similar_jobs.lookup(job_id, limit, exclude_job_id)
+                if precomputed is not None:
+                    return precomputed
+            return self._similar_jobs_pgvector(job_id, limit, exclude_job_id)
         except Exception as e:
             logger.error(f"Error getting similar jobs for {job_id}: {e}", exc_info=True)
             return [], []
-        
-    def get_similar_jobs_optimized(self, job_id: str, limit: int = 10, exclude_job_id: bool = True) -> Tuple[List[str], List[float]]:
-        """Optimized using pgvector database-level search"""
-        
+    
+    def _similar_jobs_pgvector(self, job_id: str, limit: int, exclude_job_id: bool) -> Tuple[List[str], List[float]]:
+        """Similar jobs from one pgvector query (served by the HNSW index)"""
         # Get source job embedding
         source_emb = embedding_service.get_job_embedding(job_id)
         if source_emb is None:
             return [], []
         
-        source_emb_str = '[' + ','.join(map(str, source_emb.tolist())) + ']'
+        source_emb_str = to_pgvector(source_emb)
+        vector_column = self._job_vector_column()
         
-        # Single query with vector similarity
-        # Cast jsonb to vector for pgvector operations
-        query = """
+        # Single query with vector similarity, served by the HNSW index on the native column
+        query = f"""
             SELECT 
                 j.id,
-                1 - (jce.embedding::text::vector <=> %s::vector) AS similarity
+                1 - ({vector_column} <=> %s::vector) AS similarity
             FROM jobs j
             INNER JOIN job_content_embeddings jce ON j.id = jce."jobId"
             WHERE j.status = 'active'
             AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+            AND {vector_column} IS NOT NULL
         """
         
         params = [source_emb_str]
@@ -511,14 +547,14 @@ class RecommendationService:
             query += " AND j.id != %s"
             params.append(job_id)
         
-        query += """
-            ORDER BY jce.embedding::text::vector <=> %s::vector
+        query += f"""
+            ORDER BY {vector_column} <=> %s::vector
             LIMIT %s
         """
         params.extend([source_emb_str, limit])
         
         try:
-            results = db.execute_query(query, tuple(params))
+            results = db.execute_query(query, tuple(params), local_settings=self._ef_search_settings(limit))
             
             job_ids = [str(row['id']) for row in results]
             scores = [float(row['similarity']) for row in results]
@@ -526,17 +562,9 @@ class RecommendationService:
             return job_ids, scores
         except Exception as e:
             logger.error(f"Error in optimized similar jobs: {e}")
-            # Fallback to old method
-            return self.get_similar_jobs(job_id, limit, exclude_job_id=exclude_job_id)
-    def _serialize_preferences(self, preferences: UserPreferences) -> dict:
-        """Serialize preferences for cache key"""
-        if not preferences:
-            return None
-        return {
-            'hiddenCompanyIds': sorted(preferences.hiddenCompanyIds) if preferences.hiddenCompanyIds else None,
-            'preferredLocations': sorted(preferences.preferredLocations) if preferences.preferredLocations else None,
-            'minSalary': preferences.minSalary,
-        }
+            # Fallback to old method (uncached: we are already inside the cache's computation)
+            return self._compute_similar_jobs(job_id, limit, exclude_job_id)
+    @cached_job_endpoint("candidates", ttl=lambda: settings.candidate_cache_ttl)
     def get_candidate_recommendations(
     self, 
     job_id: str, 
@@ -553,7 +581,6 @@ class RecommendationService:
                 return [], []
             
             job_cf = cf_service.get_job_cf_factors(job_id)
-            job_emb_norm = np.linalg.norm(job_emb)
             
             # OPTIMIZATION 1: Only get users who have embeddings (early filtering)
             query = """
@@ -596,8 +623,8 @@ class RecommendationService:
             logger.info(f"Loading embeddings for {len(candidate_user_ids)} candidate users")
             
             # Use PostgreSQL array parameter instead of IN clause
-            emb_query = """
-                SELECT "userId", embedding
+            emb_query = f"""
+                SELECT "userId", {vector_select('embedding', 'embeddingBin')}
                 FROM user_content_embeddings
                 WHERE "userId" = ANY(%s::uuid[])
             """
@@ -605,78 +632,32 @@ class RecommendationService:
             
             user_embeddings = {}
             for row in emb_results:
-                user_id = str(row['userId'])
-                emb_data = row['embedding']
-                if emb_data:
-                    if isinstance(emb_data, list):
-                        user_embeddings[user_id] = np.array(emb_data, dtype=np.float32)
-                    elif isinstance(emb_data, str):
-                        import json
-                        user_embeddings[user_id] = np.array(json.loads(emb_data), dtype=np.float32)
-                    else:
-                        user_embeddings[user_id] = np.array(emb_data, dtype=np.float32)
+                user_emb = row_vector(row, 'embedding', 'embeddingBin')
+                if user_emb is not None:
+                    user_embeddings[str(row['userId'])] = user_emb
+            # Skip users without an embedding
+            user_ids = [user_id for user_id in candidate_user_ids if user_id in user_embeddings]
+            if not user_ids:
+                return [], []
+            user_matrix = self._stack_vectors(user_ids, user_embeddings, len(job_emb))
             
             # OPTIMIZATION 4: Batch load CF factors
-            cf_query = """
-                SELECT "userId", factors
-                FROM user_cf_factors
-                WHERE "userId" = ANY(%s::uuid[])
-            """
-            cf_results = db.execute_query(cf_query, (candidate_user_ids,))
-            
-            user_cf_factors = {}
-            for row in cf_results:
-                user_id = str(row['userId'])
-                factors_data = row['factors']
-                if factors_data:
-                    if isinstance(factors_data, list):
-                        user_cf_factors[user_id] = np.array(factors_data, dtype=np.float32)
-                    elif isinstance(factors_data, str):
-                        import json
-                        user_cf_factors[user_id] = np.array(json.loads(factors_data), dtype=np.float32)
-                    else:
-                        user_cf_factors[user_id] = np.array(factors_data, dtype=np.float32)
-            
-            # OPTIMIZATION 5: Vectorized scoring (process all at once)
-            scored_candidates = []
-            
-            for user_id in candidate_user_ids:
-                try:
-                    user_emb = user_embeddings.get(user_id)
-                    user_cf = user_cf_factors.get(user_id)
-                    
-                    # Skip if no embedding
-                    if user_emb is None:
-                        continue
-                    
-                    # Content-based score (cosine similarity)
-                    content_score = float(np.dot(job_emb, user_emb) / (job_emb_norm * np.linalg.norm(user_emb)))
-                    
-                    # Collaborative filtering score
-                    if job_cf is not None and user_cf is not None:
-                        cf_score = float(np.dot(job_cf, user_cf))
-                    else:
-                        cf_score = 0.0
-                    
-                    # Hybrid combination
-                    final_score = self.alpha * content_score + (1 - self.alpha) * cf_score
-                    
-                    # Apply minimum score threshold
-                    if min_score is not None and final_score < min_score:
-                        continue
-                    
-                    scored_candidates.append((user_id, final_score))
-                except Exception as e:
-                    logger.error(f"Error scoring candidate {user_id}: {e}")
-                    continue
-            
-            # Sort by score (descending)
-            scored_candidates.sort(key=lambda x: x[1], reverse=True)
+            user_cf_matrix = None
+            if job_cf is not None:
+                cf_query = f"""
+                    SELECT "userId", {vector_select('factors', 'factorsBin')}
+                    FROM user_cf_factors
+                    WHERE "userId" = ANY(%s::uuid[])
+                """
+                cf_results = db.execute_query(cf_query, (user_ids,))
+                user_factors = {str(row['userId']): row_vector(row, 'factors', 'factorsBin') for row in cf_results}
+                user_cf_matrix = self._stack_vectors(user_ids, user_factors, len(job_cf))
             
-            # Return top N
-            top_candidates = scored_candidates[:limit]
-            top_user_ids = [user_id for user_id, _ in top_candidates]
-            top_scores = [score for _, score in top_candidates]
+            # OPTIMIZATION 5: Vectorized scoring, threshold and top-k
+            scores = scoring.hybrid_scores(job_emb, user_matrix, job_cf, user_cf_matrix, self.alpha)
+            top, top_scores = scoring.top_k(scores, limit, min_score=min_score)
+            top_user_ids = [user_ids[i] for i in top]
+            top_scores = top_scores.tolist()
             
             logger.info(f"Generated {len(top_user_ids)} candidate recommendations for job {job_id}")
             return top_user_ids, top_scores
@@ -685,6 +666,7 @@ class RecommendationService:
             logger.error(f"Error getting candidate recommendations for {job_id}: {e}", exc_info=True)
             return [], []
 
+    @cached_user_endpoint("search", ttl=lambda: settings.search_cache_ttl)
     def get_search_recommendations(self, request: RecommendationRequest) -> Tuple[List[str], List[float]]:
         """
         Get job recommendations using ML (embeddings + CF) with search filters applied.
@@ -718,93 +700,10 @@ class RecommendationService:
             if user_cf is None:
                 logger.warning(f"User {request.userId} has no CF factors in database")
 
-            # Batch load all job embeddings
-            job_embeddings = {}
-            job_cf_factors = {}
-            
-            placeholders = ','.join(['%s'] * len(candidate_job_ids))
-            try:
-                emb_query = f"""
-                    SELECT "jobId", embedding
-                    FROM job_content_embeddings
-                    WHERE "jobId" IN ({placeholders})
-                """
-                emb_results = db.execute_query(emb_query, tuple(candidate_job_ids))
-                for row in emb_results:
-                    job_id = str(row['jobId'])
-                    emb_data = row['embedding']
-                    if emb_data:
-                        if isinstance(emb_data, list):
-                            job_embeddings[job_id] = np.array(emb_data, dtype=np.float32)
-                        elif isinstance(emb_data, str):
-                            import json
-                            job_embeddings[job_id] = np.array(json.loads(emb_data), dtype=np.float32)
-                        else:
-                            job_embeddings[job_id] = np.array(emb_data, dtype=np.float32)
-            except Exception as e:
-                logger.error(f"Error batch loading job embeddings: {e}")
-            
-            # Load job CF factors in batch
-            try:
-                cf_query = f"""
-                    SELECT "jobId", factors
-                    FROM job_cf_factors
-                    WHERE "jobId" IN ({placeholders})
-                """
-                cf_results = db.execute_query(cf_query, tuple(candidate_job_ids))
-                for row in cf_results:
-                    job_id = str(row['jobId'])
-                    factors_data = row['factors']
-                    if factors_data:
-                        if isinstance(factors_data, list):
-                            job_cf_factors[job_id] = np.array(factors_data, dtype=np.float32)
-                        elif isinstance(factors_data, str):
-                            import json
-                            job_cf_factors[job_id] = np.array(json.loads(factors_data), dtype=np.float32)
-                        else:
-                            job_cf_factors[job_id] = np.array(factors_data, dtype=np.float32)
-            except Exception as e:
-                logger.error(f"Error batch loading job CF factors: {e}")
-            
-            # Score each candidate using ML (embeddings + CF)
-            scored_jobs = []
-            user_emb_norm = np.linalg.norm(user_emb) if user_emb is not None else 1.0
-            
-            for job_id in candidate_job_ids:
-                try:
-                    job_emb = job_embeddings.get(job_id)
-                    job_cf = job_cf_factors.get(job_id)
-                    
-                    # Content-based score (cosine similarity)
-                    if job_emb is not None:
-                        content_score = float(np.dot(user_emb, job_emb) / (user_emb_norm * np.linalg.norm(job_emb)))
-                    else:
-                        content_score = 0.0
-
-                    # Collaborative filtering score
-                    if user_cf is not None and job_cf is not None:
-                        cf_score = float(np.dot(user_cf, job_cf))
-                    else:
-                        cf_score = 0.0
-
-                    # Hybrid combination (same as get_recommendations)
-                    final_score = self.alpha * content_score + (1 - self.alpha) * cf_score
-                    
-                    scored_jobs.append((job_id, final_score))
-                except Exception as e:
-                    logger.error(f"Error scoring job {job_id}: {e}")
-                    continue
-            
-            # Apply preference boosts (location, role type, company size, etc.)
-            scored_jobs = self.apply_preference_boosts(scored_jobs, request.preferences)
-                                    
-            # Sort by score (descending)
-            scored_jobs.sort(key=lambda x: x[1], reverse=True)
-            
-            # Return top N
-            top_jobs = scored_jobs[:request.limit]
-            top_job_ids = [job_id for job_id, _ in top_jobs]
-            top_scores = [score for _, score in top_jobs]
+            # Score candidates using ML (embeddings + CF), preference boosts and top-k in one pass
+            top_job_ids, top_scores = self._rank_jobs(
+                user_emb, user_cf, candidate_job_ids, request.preferences, request.limit
+            )
             
             # Fallback to semantic search if results are empty or insufficient
             if not top_job_ids or len(top_job_ids) < request.limit:
@@ -867,98 +766,24 @@ class RecommendationService:
                 logger.warning("Failed to generate query embedding for semantic search")
                 return [], []
             
-            # Get all active jobs with their embeddings, applying filters
-            base_query = """
-                SELECT j.id, jce.embedding
-                FROM jobs j
-                LEFT JOIN job_content_embeddings jce ON j.id = jce."jobId"
-                WHERE j.status = 'active'
-                AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
-                AND jce.embedding IS NOT NULL
-            """
-            params = []
-            
-            # Exclude already recommended jobs
-            if exclude_job_ids:
-                placeholders = ','.join(['%s'] * len(exclude_job_ids))
-                base_query += f" AND j.id NOT IN ({placeholders})"
-                params.extend(exclude_job_ids)
-            
-            # Apply preference filters
-            if request.preferences:
-                if request.preferences.hiddenCompanyIds:
-                    base_query += " AND j.\"organizationId\" != ALL(%s)"
-                    params.append(request.preferences.hiddenCompanyIds)
-                
-                if request.preferences.preferredLocations:
-                    base_query += " AND j.location = ANY(%s)"
-                    params.append(request.preferences.preferredLocations)
-                
-                if request.preferences.minSalary:
-                    base_query += " AND (j.\"salaryDetails\"->>'minAmount')::int >= %s"
-                    params.append(request.preferences.minSalary)
-                
-                if request.preferences.preferredRoleTypes:
-                    # Cast enum to text for comparison
-                    base_query += " AND j.type::text = ANY(%s)"
-                    params.append(request.preferences.preferredRoleTypes)
-            
-            # Limit for performance (get more candidates than needed for better results)
             limit = needed if needed else request.limit
-            base_query += f" LIMIT %s"
-            params.append(min(limit * 3, 1000))  # Get 3x more for better selection
             
-            # Execute query
-            results = db.execute_query(base_query, tuple(params) if params else None)
+            if self.job_index.is_loaded:
+                scored_jobs = self._semantic_candidates_from_index(query_embedding, request, exclude_job_ids, limit)
+            else:
+                scored_jobs = self._semantic_candidates_from_db(query_embedding, request, exclude_job_ids, limit)
             
-            if not results:
+            if not scored_jobs:
                 logger.warning("No jobs found for semantic search")
                 return [], []
             
-            # Compute similarity scores
-            scored_jobs = []
-            query_norm = np.linalg.norm(query_embedding)
-            
-            for row in results:
-                job_id = str(row['id'])
-                emb_data = row['embedding']
-                
-                if not emb_data:
-                    continue
-                
-                try:
-                    # Parse embedding
-                    if isinstance(emb_data, list):
-                        job_emb = np.array(emb_data, dtype=np.float32)
-                    elif isinstance(emb_data, str):
-                        import json
-                        job_emb = np.array(json.loads(emb_data), dtype=np.float32)
-                    else:
-                        job_emb = np.array(emb_data, dtype=np.float32)
-                    
-                    # Compute cosine similarity
-                    similarity = float(np.dot(query_embedding, job_emb) / (query_norm * np.linalg.norm(job_emb)))
-                    
-                    # Filter by minimum similarity threshold
-                    if similarity >= 0.3:  # Minimum similarity threshold
-                        scored_jobs.append((job_id, similarity))
-                except Exception as e:
-                    logger.error(f"Error computing similarity for job {job_id}: {e}")
-                    continue
-            
-            # Sort by similarity (descending)
-            scored_jobs.sort(key=lambda x: x[1], reverse=True)
-            
             # Apply preference boosts
             scored_jobs = self.apply_preference_boosts(scored_jobs, request.preferences)
             
-            # Re-sort after boosts
-            scored_jobs.sort(key=lambda x: x[1], reverse=True)
-            
             # Return top N
-            top_jobs = scored_jobs[:limit]
-            top_job_ids = [job_id for job_id, _ in top_jobs]
-            top_scores = [score for _, score in top_jobs]
+            top, top_scores = scoring.top_k(np.array([score for _, score in scored_jobs], dtype=np.float32), limit)
+            top_job_ids = [scored_jobs[i][0] for i in top]
+            top_scores = top_scores.tolist()
             
             logger.info(f"Semantic search returned {len(top_job_ids)} jobs")
             return top_job_ids, top_scores
@@ -967,6 +792,132 @@ class RecommendationService:
             logger.error(f"Error in semantic search fallback: {e}", exc_info=True)
             return [], []
         
+    def _semantic_candidates_from_index(
+        self,
+        query_embedding: np.ndarray,
+        request: RecommendationRequest,
+        exclude_job_ids: List[str],
+        limit: int,
+    ) -> List[Tuple[str, float]]:
+        """Nearest jobs to the query from the job vector index, filtered by preferences in SQL"""
+        pool_size = min(max(limit * 10, 100), 1000)
+        candidate_ids, similarities = self.job_index.search(
+            query_embedding,
+            pool_size,
+            exclude=set(exclude_job_ids or []),
+        )
+        # Minimum similarity threshold
+        candidates = [(job_id, score) for job_id, score in zip(candidate_ids, similarities.tolist()) if score >= 0.3]
+        if not candidates:
+            return []
+        
+        filter_query = """
+            SELECT j.id
+            FROM jobs j
+            WHERE j.id = ANY(%s::uuid[])
+            AND j.status = 'active'
+            AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+        """
+        params = [[job_id for job_id, _ in candidates]]
+        if request.preferences:
+            if request.preferences.hiddenCompanyIds:
+                filter_query += " AND j.\"organizationId\" != ALL(%s)"
+                params.append(request.preferences.hiddenCompanyIds)
+            
+            if request.preferences.preferredLocations:
+                filter_query += " AND j.location = ANY(%s)"
+                params.append(request.preferences.preferredLocations)
+            
+            if request.preferences.minSalary:
+                filter_query += " AND (j.\"salaryDetails\"->>'minAmount')::int >= %s"
+                params.append(request.preferences.minSalary)
+            
+            if request.preferences.preferredRoleTypes:
+                # Cast enum to text for comparison
+                filter_query += " AND j.type::text = ANY(%s)"
+                params.append(request.preferences.preferredRoleTypes)
+        
+        allowed = {str(row['id']) for row in db.execute_query(filter_query, tuple(params))}
+        return [(job_id, score) for job_id, score in candidates if job_id in allowed]
+    
+    def _semantic_candidates_from_db(
+        self,
+        query_embedding: np.ndarray,
+        request: RecommendationRequest,
+        exclude_job_ids: List[str],
+        limit: int,
+    ) -> List[Tuple[str, float]]:
+        """Score a filtered slice of active jobs loaded from the database against the query"""
+        # Get all active jobs with their embeddings, applying filters
+        base_query = f"""
+            SELECT j.id, {vector_select('embedding', 'embeddingBin', 'jce')}
+            FROM jobs j
+            LEFT JOIN job_content_embeddings jce ON j.id = jce."jobId"
+            WHERE j.status = 'active'
+            AND (j."deletedAt" IS NULL OR j."deletedAt" > NOW())
+            AND jce.embedding IS NOT NULL
+        """
+        params = []
+        
+        # Exclude already recommended jobs
+        if exclude_job_ids:
+            placeholders = ','.join(['%s'] * len(exclude_job_ids))
+            base_query += f" AND j.id NOT IN ({placeholders})"
+            params.extend(exclude_job_ids)
+        
+        # Apply preference filters
+        if request.preferences:
+            if request.preferences.hiddenCompanyIds:
+                base_query += " AND j.\"organizationId\" != ALL(%s)"
+                params.append(request.preferences.hiddenCompanyIds)
+            
+            if request.preferences.preferredLocations:
+                base_query += " AND j.location = ANY(%s)"
+                params.append(request.preferences.preferredLocations)
+            
+            if request.preferences.minSalary:
+                base_query += " AND (j.\"salaryDetails\"->>'minAmount')::int >= %s"
+                params.append(request.preferences.minSalary)
+            
+            if request.preferences.preferredRoleTypes:
+                # Cast enum to text for comparison
+                base_query += " AND j.type::text = ANY(%s)"
+                params.append(request.preferences.preferredRoleTypes)
+        
+        # Limit for performance (get more candidates than needed for better results)
+        base_query += f" LIMIT %s"
+        params.append(min(limit * 3, 1000))  # Get 3x more for better selection
+        
+        # Execute query
+        results = db.execute_query(base_query, tuple(params) if params else None)
+        
+        if not results:
+            return []
+        
+        # Compute similarity scores
+        scored_jobs = []
+        query_norm = np.linalg.norm(query_embedding)
+        
+        for row in results:
+            job_id = str(row['id'])
+            
+            try:
+                job_emb = row_vector(row, 'embedding', 'embeddingBin')
+                if job_emb is None:
+                    continue
+                
+                # Compute cosine similarity
+                similarity = float(np.dot(query_embedding, job_emb) / (query_norm * np.linalg.norm(job_emb)))
+                
+                # Filter by minimum similarity threshold
+                if similarity >= 0.3:  # Minimum similarity threshold
+                    scored_jobs.append((job_id, similarity))
+            except Exception as e:
+                logger.error(f"Error computing similarity for job {job_id}: {e}")
+                continue
+        
+        return scored_jobs
+        
     # Optimized version using PostgreSQL array
     def batch_load_embeddings(self, job_ids: List[str]) -> dict[str, np.ndarray]:
         """Optimized batch loading using array parameters"""
@@ -974,8 +925,8 @@ class RecommendationService:
             return {}
         
         # Use PostgreSQL array parameter (more efficient than IN clause)
-        query = """
-            SELECT "jobId", embedding
+        query = f"""
+            SELECT "jobId", {vector_select('embedding', 'embeddingBin')}
             FROM job_content_embeddings
             WHERE "jobId" = ANY(%s::uuid[])
         """
@@ -984,16 +935,9 @@ class RecommendationService:
         
         embeddings = {}
         for row in results:
-            job_id = str(row['jobId'])
-            emb_data = row['embedding']
-            if emb_data:
-                if isinstance(emb_data, list):
-                    embeddings[job_id] = np.array(emb_data, dtype=np.float32)
-                elif isinstance(emb_data, str):
-                    import json
-                    embeddings[job_id] = np.array(json.loads(emb_data), dtype=np.float32)
-                else:
-                    embeddings[job_id] = np.array(emb_data, dtype=np.float32)
+            job_emb = row_vector(row, 'embedding', 'embeddingBin')
+            if job_emb is not None:
+                embeddings[str(row['jobId'])] = job_emb
         
         return embeddings
 recommendation_service = RecommendationService()
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Vectorized hybrid scoring shared by every recommendation entry point.
+
+final = alpha * cos(user, job) + (1 - alpha) * dot(user_cf, job_cf)
+
+Content rows are L2-normalized and laid side by side with the CF factors, so
+both terms come out of a single matrix-vector product (or, for batch jobs
+scoring many queries at once, blocked matrix-matrix products).
+"""
+from typing import Iterator, Optional, Sequence, Tuple
+import numpy as np
+from ..models.schemas import UserPreferences
+from .ann_index import top_k_indices
+
+# Boost/penalty weights for preference masks
+PREFERRED_LOCATION_BOOST = 0.1
+HIDDEN_COMPANY_PENALTY = 0.5
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, leaving all-zero rows untouched"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def stack_features(job_matrix: np.ndarray, cf_matrix: Optional[np.ndarray] = None, normalized: bool = False) -> np.ndarray:
+    """Build the [content | cf] feature matrix scored by hybrid_query()"""
+    content = job_matrix if normalized else normalize_rows(job_matrix)
+    if cf_matrix is None:
+        return np.ascontiguousarray(content, dtype=np.float32)
+    return np.ascontiguousarray(np.hstack([content, cf_matrix]), dtype=np.float32)
+
+
+def hybrid_query(
+    user_vec: np.ndarray,
+    cf_vec: Optional[np.ndarray],
+    alpha: float,
+    cf_dim: int,
+) -> np.ndarray:
+    """Query vector matching stack_features(): [alpha * user/|user| ; (1 - alpha) * user_cf]"""
+    user_vec = np.asarray(user_vec, dtype=np.float32)
+    norm = np.linalg.norm(user_vec)
+    content = alpha * (user_vec / norm if norm > 0 else user_vec)
+    if cf_dim == 0:
+        return content.astype(np.float32)
+    if cf_vec is None or len(cf_vec) != cf_dim:
+        cf_part = np.zeros(cf_dim, dtype=np.float32)
+    else:
+        cf_part = (1 - alpha) * np.asarray(cf_vec, dtype=np.float32)
+    return np.concatenate([content, cf_part]).astype(np.float32)
+
+
+def hybrid_queries(
+    user_matrix: np.ndarray,
+    cf_matrix: Optional[np.ndarray],
+    alpha: float,
+    cf_dim: int,
+) -> np.ndarray:
+    """hybrid_query() for every row (all-zero CF rows mean "no factors")"""
+    content = alpha * normalize_rows(user_matrix)
+    if cf_dim == 0:
+        return np.ascontiguousarray(content, dtype=np.float32)
+    if cf_matrix is None:
+        cf_part = np.zeros((len(content), cf_dim), dtype=np.float32)
+    else:
+        cf_part = (1 - alpha) * np.asarray(cf_matrix, dtype=np.float32)
+    return np.ascontiguousarray(np.hstack([content, cf_part]), dtype=np.float32)
+
+
+def hybrid_scores(
+    user_vec: np.ndarray,
+    job_matrix: np.ndarray,
+    cf_vec: Optional[np.ndarray] = None,
+    cf_matrix: Optional[np.ndarray] = None,
+    alpha: float = 0.6,
+    normalized: bool = False,
+) -> np.ndarray:
+    """
+    Hybrid content + CF scores for every row of job_matrix
+
+    Args:
+        user_vec: Query content embedding
+        job_matrix: (n, d) content embeddings
+        cf_vec: Query CF factors (None -> CF term is 0)
+        cf_matrix: (n, f) CF factors; all-zero rows mean "no factors"
+        alpha: Content weight
+        normalized: job_matrix rows are already L2-normalized
+
+    Returns:
+        (n,) float32 scores
+    """
+    if len(job_matrix) == 0:
+        return np.zeros(0, dtype=np.float32)
+    if cf_vec is None or cf_matrix is None:
+        cf_matrix = None
+    features = stack_features(job_matrix, cf_matrix, normalized=normalized)
+    cf_dim = 0 if cf_matrix is None else cf_matrix.shape[1]
+    return features @ hybrid_query(user_vec, cf_vec, alpha, cf_dim)
+
+
+def preference_boosts(
+    preferences: Optional[UserPreferences],
+    locations: Sequence,
+    organization_ids: Sequence,
+) -> np.ndarray:
+    """Additive boost per job from preference masks (preferred location +, hidden company -)"""
+    boosts = np.zeros(len(locations), dtype=np.float32)
+    if not preferences or len(locations) == 0:
+        return boosts
+    if preferences.preferredLocations:
+        locations = np.asarray(locations, dtype=object)
+        boosts += PREFERRED_LOCATION_BOOST * np.isin(locations, preferences.preferredLocations)
+    if preferences.hiddenCompanyIds:
+        organization_ids = np.asarray([str(o) if o is not None else None for o in organization_ids], dtype=object)
+        boosts -= HIDDEN_COMPANY_PENALTY * np.isin(organization_ids, preferences.hiddenCompanyIds)
+    return boosts
+
+
+def apply_boosts(scores: np.ndarray, boosts: np.ndarray, preferences: Optional[UserPreferences]) -> np.ndarray:
+    """Add boosts and clamp at 0, matching RecommendationService.apply_preference_boosts"""
+    if not preferences:
+        return scores
+    return np.maximum(scores + boosts, 0.0)
+
+
+def top_k(scores: np.ndarray, k: int, min_score: float = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k best scores with argpartition
+
+    Returns:
+        Tuple of (indices, scores), best first
+    """
+    if min_score is not None:
+        candidates = np.flatnonzero(scores >= min_score)
+        order = top_k_indices(scores[candidates], k)
+        indices = candidates[order]
+    else:
+        indices = top_k_indices(scores, k)
+    return indices, scores[indices]
+
+
+def blocked_top_k(
+    queries: np.ndarray,
+    items: np.ndarray,
+    k: int,
+    query_block: int = 1024,
+    item_block: int = 65536,
+    exclude_self: bool = False,
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    Top-k items for every query row, from blocked matrix-matrix products
+
+    Scores live only for one query_block x item_block tile at a time; each
+    tile is merged into a running top-k per query with argpartition.
+
+    Args:
+        queries: (m, d) query rows
+        items: (n, d) item rows
+        k: Items kept per query (capped at the number of items)
+        exclude_self: queries and items are the same rows: never return a row as its own neighbour
+
+    Yields:
+        (first query row, (b, k) item indices, (b, k) scores) per query block, best first
+    """
+    k = max(0, min(k, len(items) - int(exclude_self)))
+    for start in range(0, len(queries), query_block):
+        block = queries[start:start + query_block]
+        best_idx = np.zeros((len(block), 0), dtype=np.int64)
+        best_scores = np.zeros((len(block), 0), dtype=np.float32)
+        for item_start in range(0, len(items) if k else 0, item_block):
+            scores = block @ items[item_start:item_start + item_block].T
+            if exclude_self:
+                rows = np.arange(len(block))
+                cols = rows + start - item_start
+                inside = (cols >= 0) & (cols < scores.shape[1])
+                scores[rows[inside], cols[inside]] = -np.inf
+            idx = np.broadcast_to(np.arange(item_start, item_start + scores.shape[1]), scores.shape)
+            best_scores = np.hstack([best_scores, scores])
+            best_idx = np.hstack([best_idx, idx])
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_idx = np.take_along_axis(best_idx, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        yield start, np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
@@ -0,0 +1,128 @@
+"""
+Vector matrices shared read-only across gunicorn workers.
+
+One process (the leader, elected with a non-blocking flock) builds the
+matrix and publishes it as a generation:
+
+    <root>/<name>/gen-<N>/vectors.npy   (n, dim) float32
+    <root>/<name>/gen-<N>/ids.json      row -> id
+    <root>/<name>/GENERATION            N of the newest complete generation
+    <root>/<name>/.leader               flock target
+
+Every worker np.load()s the current generation with mmap_mode='r', so all
+of them map the same page-cache pages and memory per pod stays flat as
+workers are added. A generation directory is complete before GENERATION is
+atomically replaced, and superseded generations are unlinked only after a
+newer one exists; mappings held by workers stay valid after unlink.
+
+If the leader exits, its lock is released and the next worker to try
+acquires it.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX: every process loads for itself
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+GENERATION = "GENERATION"
+
+
+class SharedVectorStore:
+    """Generation-counted, memory-mapped (ids, matrix) pairs published by a single leader"""
+
+    def __init__(self, name: str, root: str, keep: int = 2):
+        self.path = Path(root) / name
+        self.keep = max(keep, 1)
+        self._leader_fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def is_leader(self) -> bool:
+        """Try to become (or confirm being) the process that builds and publishes"""
+        if fcntl is None:
+            return True
+        with self._lock:
+            if self._leader_fd is not None:
+                return True
+            self.path.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path / ".leader", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._leader_fd = fd
+            logger.info(f"Process {os.getpid()} is the shared vector store leader for {self.path.name}")
+            return True
+
+    def release(self) -> None:
+        """Give up leadership (another worker can take over)"""
+        with self._lock:
+            if self._leader_fd is not None:
+                os.close(self._leader_fd)
+                self._leader_fd = None
+
+    def generation(self) -> int:
+        """Newest published generation (0 = nothing published yet)"""
+        try:
+            return int((self.path / GENERATION).read_text().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def publish(self, ids: List[str], matrix: np.ndarray) -> int:
+        """Write a new generation and make it current; returns its number"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        generation = self.generation() + 1
+        staging = Path(tempfile.mkdtemp(prefix=f".gen-{generation}-", dir=self.path))
+        try:
+            np.save(staging / "vectors.npy", np.ascontiguousarray(matrix, dtype=np.float32))
+            with open(staging / "ids.json", "w") as f:
+                json.dump(list(ids), f)
+            target = self.path / f"gen-{generation}"
+            if target.exists():
+                shutil.rmtree(target)
+            os.rename(staging, target)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        pointer = self.path / f".{GENERATION}.{os.getpid()}"
+        pointer.write_text(str(generation))
+        os.replace(pointer, self.path / GENERATION)
+        self._prune(generation)
+        return generation
+
+    def _prune(self, current: int) -> None:
+        for entry in self.path.glob("gen-*"):
+            try:
+                generation = int(entry.name[len("gen-"):])
+            except ValueError:
+                continue
+            if generation <= current - self.keep:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def attach(self, generation: int = None) -> Optional[Tuple[int, List[str], np.ndarray]]:
+        """
+        Map a published generation read-only
+
+        Returns:
+            (generation, ids, matrix) or None if nothing is published
+        """
+        generation = generation or self.generation()
+        if generation <= 0:
+            return None
+        directory = self.path / f"gen-{generation}"
+        with open(directory / "ids.json") as f:
+            ids = json.load(f)
+        matrix = np.load(directory / "vectors.npy", mmap_mode="r")
+        return generation, ids, matrix
@@ -0,0 +1,53 @@
+"""
+In-process request coalescing.
+
+SingleFlight.do(key, fn) runs fn once per key at a time: callers arriving
+while it runs block on the same result (or exception) instead of running
+fn themselves.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Tuple[Future, int]] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Returns:
+            (result, leader) - leader is False when the result came from
+            another caller's execution
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                future: Future = Future()
+                self._calls[key] = (future, thread_id)
+        if call is not None:
+            future, owner = call
+            if owner == thread_id:
+                # Re-entered from inside fn: waiting on ourselves would deadlock
+                return fn(), True
+            return future.result(), False
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -1,3 +1,5 @@
 from .embedding_builders import build_job_text, build_user_text
+from .pgvector import to_pgvector
+from .vector_codec import encode_vector, decode_vector, parse_vector
 
-__all__ = ['build_job_text', 'build_user_text']
\ No newline at end of file
+__all__ = ['build_job_text', 'build_user_text', 'to_pgvector', 'encode_vector', 'decode_vector', 'parse_vector']
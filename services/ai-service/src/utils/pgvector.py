@@ -0,0 +1,9 @@
+"""Helpers for passing numpy vectors to pgvector"""
+from typing import Iterable
+
+
+def to_pgvector(values: Iterable[float]) -> str:
+    """Format a vector as a pgvector text literal: '[0.1,0.2,...]'"""
+    if hasattr(values, 'tolist'):
+        values = values.tolist()
+    return '[' + ','.join(map(str, values)) + ']'
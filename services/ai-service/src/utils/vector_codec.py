@@ -0,0 +1,94 @@
+"""
+Compact binary encoding for embeddings and CF factors (bytea columns).
+
+Layout: 8-byte little-endian header followed by the raw vector.
+
+    magic   2s   b"EV"
+    version B    format version (1)
+    dtype   B    0 = float32, 1 = float16
+    dim     I    number of components
+
+The header is 8 bytes so the float32 payload stays 4-byte aligned and
+np.frombuffer can decode it without copying.
+"""
+import json
+import struct
+from typing import Any, Optional
+import numpy as np
+from ..config import settings
+
+MAGIC = b"EV"
+VERSION = 1
+HEADER = struct.Struct("<2sBBI")
+
+_DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<f2")}
+_DTYPE_CODES = {"float32": 0, "float16": 1}
+
+
+def encode_vector(values, dtype: str = "float32") -> bytes:
+    """Serialize a 1-D vector as header + little-endian float32/float16 payload"""
+    code = _DTYPE_CODES.get(dtype)
+    if code is None:
+        raise ValueError(f"Unsupported vector dtype: {dtype}")
+    array = np.asarray(values).ravel().astype(_DTYPES[code], copy=False)
+    return HEADER.pack(MAGIC, VERSION, code, array.size) + array.tobytes()
+
+
+def decode_vector(buffer) -> np.ndarray:
+    """
+    Decode a buffer produced by encode_vector.
+
+    float32 payloads are returned as a read-only view of the buffer (no
+    copy); float16 payloads are upcast to float32.
+    """
+    magic, version, code, dim = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded vector")
+    if version != VERSION:
+        raise ValueError(f"Unsupported vector format version: {version}")
+    dtype = _DTYPES.get(code)
+    if dtype is None:
+        raise ValueError(f"Unsupported vector dtype code: {code}")
+    array = np.frombuffer(buffer, dtype=dtype, count=dim, offset=HEADER.size)
+    return array if code == 0 else array.astype(np.float32)
+
+
+def parse_vector(value: Any) -> Optional[np.ndarray]:
+    """Convert any stored vector representation (bytea, JSONB list or JSON text) to float32"""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return decode_vector(value)
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, np.ndarray):
+        return value.astype(np.float32, copy=False)
+    if not value:
+        return None
+    return np.asarray(value, dtype=np.float32)
+
+
+def vector_select(json_column: str, bin_column: str, alias: str = None, binary: bool = None) -> str:
+    """
+    SELECT fragment that fetches the binary column and falls back to JSONB
+    only for rows not yet backfilled, so JSON is not transferred otherwise.
+
+    Use with row_vector() on the result row.
+    """
+    if binary is None:
+        binary = settings.binary_vectors_enabled
+    prefix = f"{alias}." if alias else ""
+    if not binary:
+        return f"{prefix}{json_column}"
+    return (
+        f'{prefix}"{bin_column}", '
+        f'CASE WHEN {prefix}"{bin_column}" IS NULL THEN {prefix}{json_column} END AS {json_column}'
+    )
+
+
+def row_vector(row: dict, json_column: str, bin_column: str) -> Optional[np.ndarray]:
+    """Vector from a row selected with vector_select(), preferring the binary column"""
+    value = row.get(bin_column)
+    if value is None:
+        value = row.get(json_column)
+    return parse_vector(value)
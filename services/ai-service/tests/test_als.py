@@ -0,0 +1,228 @@
+import numpy as np
+import pytest
+
+from src.services.als import ALSMatrixFactorization, ImplicitALS, InteractionMatrix, create_cf_model
+
+
+def _interactions(n_users=40, n_jobs=30, density=0.15, seed=0):
+    rng = np.random.default_rng(seed)
+    interactions = {}
+    for u in range(n_users):
+        for j in range(n_jobs):
+            if rng.random() < density:
+                interactions[(f"u{u:03d}", f"j{j:03d}")] = float(rng.choice([1.0, 2.0, 3.0, 5.0]))
+    return interactions
+
+
+def _dense_reference(interactions, n_factors, n_iterations, regularization):
+    """The original dense-matrix ALS, kept as an oracle"""
+    user_ids = sorted({u for u, _ in interactions})
+    job_ids = sorted({j for _, j in interactions})
+    R = np.zeros((len(user_ids), len(job_ids)), dtype=np.float32)
+    for (u, j), w in interactions.items():
+        R[user_ids.index(u), job_ids.index(j)] = w
+    np.random.seed(42)
+    U = np.random.normal(0, 0.1, (len(user_ids), n_factors)).astype(np.float32)
+    V = np.random.normal(0, 0.1, (len(job_ids), n_factors)).astype(np.float32)
+    reg = np.eye(n_factors) * regularization
+    for _ in range(n_iterations):
+        for i in range(len(user_ids)):
+            idx = np.where(R[i, :] > 0)[0]
+            if len(idx):
+                U[i] = np.linalg.solve(V[idx].T @ V[idx] + reg, V[idx].T @ R[i, idx])
+        for j in range(len(job_ids)):
+            idx = np.where(R[:, j] > 0)[0]
+            if len(idx):
+                V[j] = np.linalg.solve(U[idx].T @ U[idx] + reg, U[idx].T @ R[idx, j])
+    return dict(zip(user_ids, U)), dict(zip(job_ids, V))
+
+
+def test_sparse_matrix_rows_and_columns():
+    matrix = InteractionMatrix({("a", "x"): 1.0, ("a", "y"): 2.0, ("b", "y"): 3.0, ("b", "z"): 0.0})
+
+    assert matrix.user_ids == ["a", "b"] and matrix.job_ids == ["x", "y"]
+    assert matrix.nnz == 3
+    assert list(matrix.by_user.row(0)[0]) == [0, 1]
+    assert list(matrix.by_job.row(1)[0]) == [0, 1]
+    assert list(matrix.by_job.row(1)[1]) == [2.0, 3.0]
+
+
+def test_matches_dense_reference():
+    interactions = _interactions()
+
+    user_factors, job_factors = ALSMatrixFactorization(n_factors=8, n_iterations=3).fit(interactions)
+    ref_users, ref_jobs = _dense_reference(interactions, 8, 3, 0.1)
+
+    assert set(user_factors) == set(ref_users) and set(job_factors) == set(ref_jobs)
+    for uid, factors in user_factors.items():
+        assert factors.shape == (8,) and factors.dtype == np.float32
+        assert np.allclose(factors, ref_users[uid], atol=1e-4)
+    for jid, factors in job_factors.items():
+        assert np.allclose(factors, ref_jobs[jid], atol=1e-4)
+
+
+def test_observed_loss_decreases():
+    interactions = _interactions(seed=1)
+    matrix = InteractionMatrix(interactions)
+
+    losses = []
+    for n_iterations in (1, 5):
+        user_factors, job_factors = ALSMatrixFactorization(n_factors=8, n_iterations=n_iterations).fit(interactions)
+        U = np.vstack([user_factors[u] for u in matrix.user_ids])
+        V = np.vstack([job_factors[j] for j in matrix.job_ids])
+        losses.append(ALSMatrixFactorization.observed_loss(matrix, U, V))
+
+    assert losses[1] < losses[0]
+
+
+def _dense_implicit_system(matrix, fixed, row, alpha, regularization):
+    """Exact normal equations of the implicit objective for one user"""
+    indices, weights = matrix.by_user.row(row)
+    confidence = np.ones(matrix.n_jobs)
+    confidence[indices] = 1 + alpha * weights
+    preference = np.zeros(matrix.n_jobs)
+    preference[indices] = 1.0
+    A = fixed.T @ (confidence[:, None] * fixed) + regularization * np.eye(fixed.shape[1])
+    return A, fixed.T @ (confidence * preference)
+
+
+def test_implicit_cg_converges_to_exact_solution():
+    matrix = InteractionMatrix(_interactions(seed=2))
+    model = ImplicitALS(n_factors=6, regularization=0.1, alpha=2.0, cg_steps=50)
+    V = np.random.default_rng(0).normal(0, 0.5, (matrix.n_jobs, 6))
+    U = np.zeros((matrix.n_users, 6))
+
+    model._solve_rows(matrix.by_user, V, U)
+
+    for row in range(matrix.n_users):
+        A, b = _dense_implicit_system(matrix, V, row, 2.0, 0.1)
+        assert np.allclose(U[row], np.linalg.solve(A, b), atol=1e-6)
+
+
+def test_implicit_loss_matches_dense_objective():
+    matrix = InteractionMatrix(_interactions(seed=3))
+    model = ImplicitALS(n_factors=4, regularization=0.1, alpha=3.0)
+    rng = np.random.default_rng(1)
+    U, V = rng.normal(size=(matrix.n_users, 4)), rng.normal(size=(matrix.n_jobs, 4))
+
+    confidence = np.ones((matrix.n_users, matrix.n_jobs))
+    preference = np.zeros_like(confidence)
+    confidence[matrix.rows, matrix.cols] = 1 + 3.0 * matrix.data
+    preference[matrix.rows, matrix.cols] = 1.0
+    dense = np.sum(confidence * (preference - U @ V.T) ** 2) + 0.1 * (np.sum(U ** 2) + np.sum(V ** 2))
+
+    assert np.isclose(model.loss(matrix, U, V), dense)
+
+
+def test_implicit_model_ranks_observed_jobs_first():
+    interactions = _interactions(n_users=60, n_jobs=40, density=0.1, seed=4)
+    user_factors, job_factors = create_cf_model("implicit", n_factors=16, n_iterations=10, alpha=5.0).fit(interactions)
+    job_ids = sorted(job_factors)
+    V = np.vstack([job_factors[j] for j in job_ids])
+
+    hits = 0
+    users = sorted(user_factors)
+    for uid in users:
+        observed = {j for (u, j) in interactions if u == uid}
+        top = {job_ids[i] for i in np.argsort(-(V @ user_factors[uid]))[:len(observed)]}
+        hits += len(top & observed) / len(observed)
+    assert hits / len(users) > 0.5
+
+
+def test_unknown_cf_model_is_rejected():
+    with pytest.raises(ValueError):
+        create_cf_model("bpr")
+
+
+@pytest.mark.parametrize("model", ["als", "implicit"])
+def test_parallel_fit_is_bit_identical_to_serial(model):
+    interactions = _interactions(n_users=70, n_jobs=50, density=0.1, seed=5)
+    params = dict(n_factors=8, n_iterations=3, block_size=16)
+
+    serial = create_cf_model(model, **params).fit(interactions)
+    parallel = create_cf_model(model, n_workers=2, **params).fit(interactions)
+
+    for expected, actual in zip(serial, parallel):
+        assert expected.keys() == actual.keys()
+        for key in expected:
+            assert np.array_equal(expected[key], actual[key])
+
+
+def test_block_size_does_not_change_result():
+    interactions = _interactions(seed=6)
+    small = ALSMatrixFactorization(n_factors=6, n_iterations=3, block_size=1).fit(interactions)
+    large = ALSMatrixFactorization(n_factors=6, n_iterations=3, block_size=1000).fit(interactions)
+
+    for expected, actual in zip(small, large):
+        for key in expected:
+            assert np.allclose(expected[key], actual[key], atol=1e-5)
+
+
+def test_fold_in_matches_training_row_solve():
+    matrix = InteractionMatrix(_interactions(seed=7))
+    model = ALSMatrixFactorization(n_factors=6, regularization=0.1)
+    V = np.random.default_rng(2).normal(0, 0.5, (matrix.n_jobs, 6)).astype(np.float32)
+    U = np.zeros((matrix.n_users, 6), dtype=np.float32)
+    model._solve_rows(matrix.by_user, V, U)
+
+    indices, weights = matrix.by_user.row(0)
+    assert np.allclose(model.fold_in(V[indices], weights), U[0], atol=1e-5)
+
+
+def test_implicit_fold_in_solves_dense_system():
+    matrix = InteractionMatrix(_interactions(seed=8))
+    model = ImplicitALS(n_factors=5, regularization=0.1, alpha=2.0)
+    V = np.random.default_rng(3).normal(0, 0.5, (matrix.n_jobs, 5))
+    indices, weights = matrix.by_user.row(1)
+
+    A, b = _dense_implicit_system(matrix, V, 1, 2.0, 0.1)
+    assert np.allclose(model.fold_in(V[indices], weights, gram=V.T @ V), np.linalg.solve(A, b), atol=1e-5)
+    with pytest.raises(ValueError):
+        model.fold_in(V[indices], weights)
+
+
+def test_early_stopping_and_warm_start():
+    interactions = _interactions(seed=9)
+    params = dict(n_factors=6, n_iterations=30, regularization=0.1)
+
+    full = ALSMatrixFactorization(**params)
+    full.fit(interactions)
+    assert len(full.history) == 30
+
+    cold = ALSMatrixFactorization(tolerance=1e-3, **params)
+    user_factors, job_factors = cold.fit(interactions)
+    assert len(cold.history) < 30
+    assert all(entry['seconds'] >= 0 for entry in cold.history)
+
+    # Restarting from converged factors needs (almost) no further iterations
+    warm = ALSMatrixFactorization(tolerance=1e-3, **params)
+    warm.fit(interactions, user_factors, job_factors)
+    assert len(warm.history) < len(cold.history)
+    assert warm.history[0]['loss'] <= cold.history[0]['loss']
+
+
+def test_warm_start_ignores_unknown_ids_and_wrong_dimensions():
+    interactions = _interactions(seed=10)
+    model = ALSMatrixFactorization(n_factors=4, n_iterations=0)
+    baseline, _ = model.fit(interactions)
+    previous = {"u000": np.ones(4, dtype=np.float32), "u001": np.ones(3, dtype=np.float32), "gone": np.ones(4)}
+
+    user_factors, _ = model.fit(interactions, initial_user_factors=previous)
+
+    assert np.array_equal(user_factors["u000"], np.ones(4))
+    assert np.array_equal(user_factors["u001"], baseline["u001"])
+
+
+def test_holdout_split_keeps_both_sides_in_training():
+    interactions = _interactions(seed=11)
+    model = ALSMatrixFactorization(n_factors=4, n_iterations=5, holdout_fraction=0.2)
+    train, holdout = model._split_holdout(interactions)
+
+    assert holdout and not set(train) & set(holdout)
+    assert len(train) + len(holdout) == len(interactions)
+    assert {u for u, _ in holdout} <= {u for u, _ in train}
+    assert {j for _, j in holdout} <= {j for _, j in train}
+    assert model._split_holdout(interactions) == (train, holdout)
+
+    model.fit(interactions)
+    assert all(entry['holdout_loss'] is not None for entry in model.history)
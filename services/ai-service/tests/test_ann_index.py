@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from src.services.ann_index import BaseANNIndex, create_ann_index
+
+
+def _clustered_data(n=600, n_queries=20, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    vectors = centers[rng.integers(0, 20, n)] + 0.3 * rng.normal(size=(n, dim))
+    queries = centers[rng.integers(0, 20, n_queries)] + 0.3 * rng.normal(size=(n_queries, dim))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def _recall_at_10(index, vectors, queries, **search_params):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    hits = 0
+    for query in queries:
+        truth = {str(i) for i in np.argsort(-(normalized @ query))[:10]}
+        found, _ = index.search(query, 10, **search_params)
+        hits += len(truth & set(found))
+    return hits / (10 * len(queries))
+
+
+@pytest.mark.parametrize("backend", ["ivf", "hnsw"])
+def test_recall_on_clustered_data(backend):
+    vectors, queries = _clustered_data()
+    index = create_ann_index(backend).build(vectors, [str(i) for i in range(len(vectors))])
+
+    assert _recall_at_10(index, vectors, queries) >= 0.9
+
+
+def test_ivf_nprobe_trades_recall():
+    vectors, queries = _clustered_data()
+    index = create_ann_index("ivf", n_lists=24).build(vectors, [str(i) for i in range(len(vectors))])
+
+    assert _recall_at_10(index, vectors, queries, nprobe=24) == 1.0
+    assert _recall_at_10(index, vectors, queries, nprobe=1) <= _recall_at_10(index, vectors, queries, nprobe=24)
+
+
+def test_scores_are_cosine_similarities_best_first():
+    vectors, queries = _clustered_data(n=200)
+    index = create_ann_index("hnsw").build(vectors, [str(i) for i in range(len(vectors))])
+
+    ids, scores = index.search(queries[0], 5)
+
+    expected = vectors[[int(i) for i in ids]] @ queries[0]
+    expected /= np.linalg.norm(vectors[[int(i) for i in ids]], axis=1) * np.linalg.norm(queries[0])
+    assert np.allclose(scores, expected, atol=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("backend", ["ivf", "hnsw"])
+def test_save_and_load_round_trip(backend, tmp_path):
+    vectors, queries = _clustered_data(n=300)
+    index = create_ann_index(backend).build(vectors, [f"job-{i}" for i in range(len(vectors))])
+    path = str(tmp_path / "index.npz")
+
+    index.save(path)
+    loaded = BaseANNIndex.load(path)
+
+    assert type(loaded) is type(index)
+    for query in queries[:5]:
+        assert loaded.search(query, 10)[0] == index.search(query, 10)[0]
+
+
+def test_save_without_suffix_loads_from_same_path(tmp_path):
+    vectors, _ = _clustered_data(n=50)
+    index = create_ann_index("ivf").build(vectors, [f"job-{i}" for i in range(len(vectors))])
+    path = str(tmp_path / "index")
+
+    written = index.save(path)
+
+    assert written == path + ".npz"
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["index.npz"]
+    assert BaseANNIndex.load(path).ids == index.ids
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_ann_index("faiss")
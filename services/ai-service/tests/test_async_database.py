@@ -0,0 +1,21 @@
+import numpy as np
+
+from src.async_database import _decode_vector, _encode_json, to_asyncpg_query
+
+
+def test_placeholders_are_numbered_in_order():
+    query = 'SELECT * FROM jobs WHERE id = %s AND "organizationId" != ALL(%s) LIMIT %s'
+
+    assert to_asyncpg_query(query) == 'SELECT * FROM jobs WHERE id = $1 AND "organizationId" != ALL($2) LIMIT $3'
+
+
+def test_escaped_percent_is_unescaped():
+    assert to_asyncpg_query("SELECT * FROM jobs WHERE title LIKE '%%dev%%' AND id = %s") == (
+        "SELECT * FROM jobs WHERE title LIKE '%dev%' AND id = $1"
+    )
+
+
+def test_codecs_accept_pre_serialized_values():
+    assert _encode_json('[1, 2]') == '[1, 2]'
+    assert _encode_json([1, 2]) == '[1, 2]'
+    assert np.allclose(_decode_vector('[0.5,1,2]'), [0.5, 1.0, 2.0])
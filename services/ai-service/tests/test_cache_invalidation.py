@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from src.config import settings
+from src.services import cache_invalidation
+from src.services import job_vector_index as job_vector_index_module
+from src.services import recommendation_cache as recommendation_cache_module
+from src.services.cache_invalidation import CacheInvalidator
+from src.services.embedding_service import embedding_service
+from src.services.job_vector_index import JobVectorIndex
+from src.services.precomputed_recommendations import precomputed_similar_jobs
+from src.services.recommendation_cache import RecommendationCache
+from test_cache_namespace import _FakeRedis, _SharedConnection
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    redis_client = _FakeRedis()
+    monkeypatch.setattr(recommendation_cache_module, "get_cache", lambda: _SharedConnection(redis_client))
+    cache = RecommendationCache(ttl_seconds=3600)
+    monkeypatch.setattr(cache_invalidation, "get_recommendation_cache", lambda: cache)
+    monkeypatch.setattr(cache_invalidation, "get_cache", lambda: None)  # no pub/sub: applied in-process
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def graph(monkeypatch):
+    monkeypatch.setattr(settings, "precomputed_similar_jobs_enabled", True)
+    calls = []
+    monkeypatch.setattr(precomputed_similar_jobs, "refresh_job", lambda job_id: calls.append(job_id) or [job_id, "j2"])
+    monkeypatch.setattr(precomputed_similar_jobs, "delete", lambda job_ids: calls.append(tuple(job_ids)))
+    return calls
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = JobVectorIndex(refresh_interval=3600)
+    for job_id, vector in {"j1": [1, 0], "j2": [0, 1], "j3": [1, 1]}.items():
+        index.upsert(job_id, np.asarray(vector, dtype=np.float32))
+    index._loaded = True
+    monkeypatch.setattr(job_vector_index_module, "job_vector_index", index)
+    return index
+
+
+def test_user_event_invalidates_only_that_user(cache, index):
+    cache.set("u1", {"limit": 10}, ["j1"], [0.9])
+    cache.set("u2", {"limit": 10}, ["j2"], [0.8])
+
+    result = CacheInvalidator().invalidate({'userIds': ["u1"], 'reason': "user.applied"})
+
+    assert result['receivers'] == 0 and result['applied']['generationsBumped'] == 1
+    assert cache.get("u1", {"limit": 10}) is None
+    assert cache.get("u2", {"limit": 10}) == (["j2"], [0.8])
+
+
+def test_job_events_invalidate_similar_jobs_and_evict_vectors(cache, index, graph, monkeypatch):
+    monkeypatch.setattr(embedding_service, "get_job_embedding", lambda job_id: np.array([0.0, 2.0], dtype=np.float32))
+    cache.set_similar_jobs("j1", {"limit": 5}, ["j2"], [0.5])
+    cache.set_similar_jobs("j2", {"limit": 5}, ["j1"], [0.5])
+
+    applied = CacheInvalidator().apply({'jobIds': ["j1"], 'removedJobIds': ["j3"]})
+
+    assert applied == {'generationsBumped': 2, 'jobVectorsReloaded': 1, 'jobVectorsRemoved': 1, 'similarJobsUpdated': 3}
+    assert graph == ["j1", ("j3",)]
+    assert cache.get_similar_jobs("j1", {"limit": 5}) is None
+    # j2's graph row gained j1, so its cached lists go too
+    assert cache.get_similar_jobs("j2", {"limit": 5}) is None
+    assert np.allclose(index.get("j1"), [0.0, 1.0])
+    assert index.get("j3") is None
+
+
+def test_shared_effects_apply_once_per_message_id(cache, index, monkeypatch):
+    monkeypatch.setattr(embedding_service, "get_job_embedding", lambda job_id: np.array([1.0, 0.0], dtype=np.float32))
+    cache.set("u1", {"limit": 10}, ["j1"], [0.9])
+    message = {'id': "m1", 'userIds': ["u1"]}
+
+    first = CacheInvalidator().apply({**message, 'jobIds': ["j1"]})
+    second = CacheInvalidator().apply({**message, 'jobIds': ["j1"]})  # another worker receiving the same message
+
+    assert first['generationsBumped'] == 2 and second['generationsBumped'] == 0
+    assert first['similarJobsUpdated'] == 2 and second['similarJobsUpdated'] == 0
+    assert cache.generations.current(["user:u1"]) == [0, 1]
@@ -0,0 +1,299 @@
+import threading
+import time
+
+import pytest
+
+from src.services import recommendation_cache as recommendation_cache_module
+from src.services.cache_namespace import CacheCounters, CacheGenerations
+from src.models.schemas import Interaction, RecommendationRequest, UserPreferences
+from src.services.recommendation_cache import RecommendationCache, cached_result
+
+
+class _FakeRedis:
+    """Just the commands the caches use; scan_iter is deliberately missing"""
+
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+        self.commands = []
+
+    def _log(self, name):
+        self.commands.append(name)
+
+    def get(self, key):
+        self._log('get')
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self._log('mget')
+        return [self.data.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self._log('setex')
+        self.data[key] = value
+        return True
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        self._log('set')
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def delete(self, *keys):
+        self._log('delete')
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def incr(self, key):
+        self._log('incr')
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    def expire(self, key, ttl):
+        self._log('expire')
+        return True
+
+    def hincrby(self, key, field, delta):
+        self._log('hincrby')
+        fields = self.hashes.setdefault(key, {})
+        fields[field.encode()] = fields.get(field.encode(), 0) + delta
+
+    def hgetall(self, key):
+        self._log('hgetall')
+        return dict(self.hashes.get(key, {}))
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.calls.append((name, args))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+class _SharedConnection:
+    def __init__(self, client):
+        self.redis_client = client
+
+
+@pytest.fixture
+def redis_client():
+    return _FakeRedis()
+
+
+@pytest.fixture
+def cache(redis_client, monkeypatch):
+    monkeypatch.setattr(recommendation_cache_module, "get_cache", lambda: _SharedConnection(redis_client))
+    return RecommendationCache(ttl_seconds=300)
+
+
+def test_generations_default_to_zero_and_bump(redis_client):
+    generations = CacheGenerations(redis_client, "rec:", scope_ttl_seconds=600)
+
+    assert generations.current(["user:1"]) == [0, 0]
+    assert generations.bump("user:1") == 1
+    assert generations.bump() == 1
+    assert generations.current(["user:1", "user:2"]) == [1, 1, 0]
+
+
+def test_counters_merge_on_read(redis_client):
+    first = CacheCounters(redis_client, "rec:stats", flush_interval=3600)
+    second = CacheCounters(redis_client, "rec:stats", flush_interval=3600)
+    first.record(hits=2, misses=1)
+    second.record(hits=1)
+
+    first.flush()  # not due yet
+    assert redis_client.hashes == {}
+
+    second.flush(force=True)
+    counters = first.read()
+    assert counters['total'] == {'hits': 3, 'misses': 1}
+    assert counters['process'] == {'hits': 2, 'misses': 1}
+
+
+def test_get_is_one_round_trip(cache, redis_client):
+    cache.set("u1", {"limit": 10}, ["j1", "j2"], [0.9, 0.8])
+    redis_client.commands.clear()
+
+    assert cache.get("u1", {"limit": 10}) == (["j1", "j2"], [0.9, 0.8])
+    assert redis_client.commands == ['mget']
+
+
+def test_user_delete_and_clear_all_are_single_increments(cache, redis_client):
+    cache.set("u1", {"limit": 10}, ["j1"], [0.9])
+    cache.set("u2", {"limit": 10}, ["j2"], [0.8])
+    cache.set_similar_jobs("j1", {"limit": 5}, ["j3"], [0.7])
+    redis_client.commands.clear()
+
+    assert cache.delete("u1")
+    assert redis_client.commands == ['incr', 'expire']
+    assert cache.get("u1", {"limit": 10}) is None
+    assert cache.get("u2", {"limit": 10}) == (["j2"], [0.8])
+
+    redis_client.commands.clear()
+    cache.clear_all()
+    assert redis_client.commands == ['incr']
+    assert cache.get("u2", {"limit": 10}) is None
+    assert cache.get_similar_jobs("j1", {"limit": 5}) is None
+
+    cache.set("u2", {"limit": 10}, ["j4"], [0.6])
+    assert cache.get("u2", {"limit": 10}) == (["j4"], [0.6])
+
+
+def test_stats_count_without_scanning(cache):
+    cache.set("u1", {"limit": 10}, ["j1"], [0.9])
+    cache.get("u1", {"limit": 10})
+    cache.get("u1", {"limit": 20})
+    cache.clear_all()
+    cache.get("u1", {"limit": 10})
+
+    stats = cache.stats()
+    assert stats['counters'] == {'sets': 1, 'hits': 1, 'misses': 2, 'invalidated': 1}
+    assert stats['hit_ratio'] == pytest.approx(1 / 3, abs=1e-3)
+    assert stats['generation'] == 1
+
+
+def test_concurrent_misses_compute_once(cache):
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return ["j1"], [0.9]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("rec:u1:k", "user:u1", compute)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [(["j1"], [0.9])] * 8
+    assert cache._get_entry("rec:u1:k", "user:u1")['jobIds'] == ["j1"]
+
+
+def test_compute_errors_propagate_and_are_not_cached(cache):
+    def failing():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("rec:j1:k", "job:j1", failing)
+    assert cache.get_or_compute("rec:j1:k", "job:j1", lambda: (["j2"], [0.5])) == (["j2"], [0.5])
+
+
+def test_stale_entry_is_served_while_refreshing(redis_client, monkeypatch):
+    monkeypatch.setattr(recommendation_cache_module, "get_cache", lambda: _SharedConnection(redis_client))
+    cache = RecommendationCache(ttl_seconds=1, stale_ttl_seconds=60, xfetch_beta=0)
+    assert cache.get_or_compute("rec:j1:k", "job:j1", lambda: (["old"], [0.1])) == (["old"], [0.1])
+
+    refreshed = threading.Event()
+
+    def recompute():
+        refreshed.set()
+        return ["new"], [0.2]
+
+    time.sleep(1.05)
+    assert cache.get_or_compute("rec:j1:k", "job:j1", recompute) == (["old"], [0.1])
+    assert refreshed.wait(5)
+    cache._refresh_executor.shutdown(wait=True)
+    assert cache.get_or_compute("rec:j1:k", "job:j1", recompute) == (["new"], [0.2])
+    assert cache.counters.read()['process']['stale_served'] == 1
+
+
+def test_invalidation_during_compute_is_not_overwritten(cache):
+    def compute():
+        cache.delete("u1")  # e.g. the user applied to a job meanwhile
+        return ["j1"], [0.9]
+
+    cache.get_or_compute("rec:u1:k", "user:u1", compute)
+    assert cache._get_entry("rec:u1:k", "user:u1") is None
+
+
+def test_on_hit_applies_only_to_cached_results(cache):
+    seen = []
+
+    def on_hit(result):
+        seen.append(result)
+        return result[0][:1], result[1][:1]
+
+    def compute():
+        return ["j1", "j2"], [0.9, 0.8]
+
+    assert cache.get_or_compute("rec:u1:k", "user:u1", compute, on_hit=on_hit) == (["j1", "j2"], [0.9, 0.8])
+    assert seen == []
+    assert cache.get_or_compute("rec:u1:k", "user:u1", compute, on_hit=on_hit) == (["j1"], [0.9])
+    assert len(seen) == 1
+
+
+class _Service:
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = []
+
+    @cached_result("search", scope=lambda args: f"user:{args['request']['userId']}", ignore=('recentInteractions',))
+    def search(self, request, limit=10):
+        self.calls.append(request.searchTerm)
+        return [f"{request.searchTerm}-{limit}"], [1.0]
+
+    @cached_result("candidates", scope=lambda args: f"job:{args['job_id']}", ttl=lambda: 60)
+    def candidates(self, job_id, min_score=None):
+        self.calls.append(job_id)
+        return [], []
+
+
+def test_cached_result_keys_cover_every_argument(cache):
+    service = _Service(cache)
+    request = RecommendationRequest(userId="u1", searchTerm="python")
+
+    assert service.search(request) == (["python-10"], [1.0])
+    assert service.search(request.model_copy(update={'recentInteractions': [Interaction(jobId="j9", type="view")]}))
+    assert service.search(request, limit=5) == (["python-5"], [1.0])
+    assert service.search(request.model_copy(update={'searchTerm': "java"})) == (["java-10"], [1.0])
+    assert service.search(request.model_copy(update={'preferences': UserPreferences(minSalary=1000)}))
+    assert service.calls == ["python", "python", "java", "python"]
+
+    cache.delete("u1")
+    service.search(request)
+    assert len(service.calls) == 5
+
+
+def test_cached_result_counts_per_endpoint_and_skips_empty_results(cache):
+    service = _Service(cache)
+    service.search(RecommendationRequest(userId="u1"))
+    service.search(RecommendationRequest(userId="u1"))
+    service.candidates("j1")
+    service.candidates("j1")
+    cache.counters.flush(force=True)
+
+    assert service.calls == [None, "j1", "j1"]  # empty candidate lists are recomputed
+    endpoints = cache.stats()['endpoints']
+    assert endpoints['search']['hits'] == 1 and endpoints['search']['misses'] == 1
+    assert endpoints['search']['hit_ratio'] == 0.5
+    assert endpoints['candidates']['computes'] == 2
+    assert "search.hits" not in cache.stats()['counters']
+
+
+def test_cached_result_calls_through_without_cache():
+    service = _Service(None)
+    service.search(RecommendationRequest(userId="u1"))
+    service.search(RecommendationRequest(userId="u1"))
+
+    assert len(service.calls) == 2
+    assert _Service.search.uncached(service, RecommendationRequest(userId="u1")) == (["None-10"], [1.0])
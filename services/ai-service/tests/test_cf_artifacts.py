@@ -0,0 +1,141 @@
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.config import settings
+from src.services import cf_service as cf_service_module
+from src.services.als import create_cf_model
+from src.services.cf_artifacts import CFArtifact, latest_version, list_versions, write_artifact
+from src.services.cf_service import CollaborativeFilteringService, cf_model_params
+from src.utils.vector_codec import encode_vector
+
+
+def _factors(prefix, n, dim=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"{prefix}{i}": rng.normal(size=dim).astype(np.float32) for i in range(n)}
+
+
+def test_artifact_round_trip_is_memory_mapped(tmp_path):
+    users, jobs = _factors("u", 3), _factors("j", 5, seed=1)
+    version = write_artifact(str(tmp_path), users, jobs, manifest={'iterations': 7, 'loss': 1.5})
+
+    assert latest_version(str(tmp_path)) == version
+    artifact = CFArtifact(str(tmp_path), version)
+    assert isinstance(artifact.U, np.memmap)
+    assert artifact.dim == 4
+    assert artifact.manifest['iterations'] == 7 and artifact.manifest['n_jobs'] == 5
+    assert np.array_equal(artifact.user_vector("u2"), users["u2"])
+    assert np.array_equal(artifact.job_vector("j4"), jobs["j4"])
+    assert artifact.user_vector("missing") is None
+
+
+def test_old_versions_are_pruned(tmp_path):
+    versions = [write_artifact(str(tmp_path), _factors("u", 2), _factors("j", 2), keep=2) for _ in range(4)]
+
+    assert list_versions(str(tmp_path)) == versions[-2:]
+    assert latest_version(str(tmp_path)) == versions[-1]
+    assert not any(entry.name.startswith(".") for entry in tmp_path.iterdir() if entry.is_dir())
+
+
+def _service(tmp_path, monkeypatch, recorded):
+    """Service whose cf_factor_versions lookup returns recorded['version'] (no database)"""
+    monkeypatch.setattr(settings, "cf_artifacts_enabled", True)
+    monkeypatch.setattr(settings, "cf_artifact_check_interval", 3600)
+    service = CollaborativeFilteringService(artifact_dir=str(tmp_path))
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    monkeypatch.setattr(
+        service, "_recorded_version",
+        lambda: (recorded['version'], created_at) if recorded.get('version') else None,
+    )
+    monkeypatch.setattr(service, "_folded_ids", lambda since: {'user': set(recorded.get('folded', ())), 'job': set()})
+    return service
+
+
+def test_service_hot_swaps_to_new_version(tmp_path, monkeypatch):
+    recorded = {}
+    service = _service(tmp_path, monkeypatch, recorded)
+    assert service.artifact() is None
+
+    first = _factors("u", 2)
+    recorded['version'] = write_artifact(str(tmp_path), first, _factors("j", 2))
+    service.invalidate()
+    assert np.array_equal(service.get_user_cf_factors("u0"), first["u0"])
+    held = service.artifact()
+
+    second = _factors("u", 2, seed=5)
+    version = write_artifact(str(tmp_path), second, _factors("j", 2))
+    recorded['version'] = version
+    # Not re-checked until the interval elapses or training invalidates
+    assert service.artifact() is held
+    service.invalidate()
+    assert service.artifact().version == version
+    assert np.array_equal(service.get_user_cf_factors("u0"), second["u0"])
+    # The previous mapping stays readable for requests still holding it
+    assert np.array_equal(held.user_vector("u0"), first["u0"])
+    assert json.loads((tmp_path / version / "manifest.json").read_text())['version'] == version
+
+
+def test_service_ignores_artifact_not_recorded_in_database(tmp_path, monkeypatch):
+    recorded = {}
+    service = _service(tmp_path, monkeypatch, recorded)
+    local = write_artifact(str(tmp_path), _factors("u", 2), _factors("j", 2))
+
+    # Trained elsewhere but not recorded yet
+    service.invalidate()
+    assert service.artifact() is None
+
+    # Recorded version this pod does not have on disk
+    recorded['version'] = "20990101T000000000000Z"
+    service.invalidate()
+    assert service.artifact() is None
+
+    recorded['version'] = local
+    service.invalidate()
+    assert service.artifact().version == local
+
+
+def test_folded_in_ids_are_read_from_database(tmp_path, monkeypatch):
+    users = _factors("u", 2)
+    recorded = {'version': write_artifact(str(tmp_path), users, _factors("j", 2)), 'folded': {"u1"}}
+    service = _service(tmp_path, monkeypatch, recorded)
+    folded = np.ones(4, dtype=np.float32)
+    monkeypatch.setattr(service, "_load_factors", lambda target, keys: {key: folded for key in keys})
+
+    found = service.get_user_cf_factors_batch(["u0", "u1"])
+
+    assert np.array_equal(found["u0"], users["u0"])
+    assert np.array_equal(found["u1"], folded)
+
+
+def test_fold_in_uses_raw_factors_and_gram_of_recorded_version(monkeypatch):
+    monkeypatch.setattr(settings, "cf_model", "implicit")
+    monkeypatch.setattr(settings, "cf_factors_dim", 2)
+    monkeypatch.setattr(settings, "cf_artifact_check_interval", 0)
+    service = CollaborativeFilteringService()
+    raw = {"j0": np.array([3.0, 0.0], dtype=np.float32), "j1": np.array([0.0, 4.0], dtype=np.float32)}
+    recorded = {'version': "v1"}
+    gram_reads = []
+
+    def execute_query(query, params=None):
+        if 'AND "entityId"' in query:
+            return [{'entityId': key, 'factorsBin': encode_vector(raw[key])} for key in params[1] if key in raw]
+        gram_reads.append(recorded['version'])
+        return [{'factorsBin': encode_vector(vector)} for vector in raw.values()]
+
+    monkeypatch.setattr(cf_service_module.db, "execute_query", execute_query)
+    monkeypatch.setattr(service, "_recorded_version", lambda: (recorded['version'], None))
+
+    vector, used = service._fold_in({"j0": 1.0, "missing": 2.0}, 'job')
+    gram = np.diag([9.0, 16.0])
+    model = create_cf_model("implicit", **cf_model_params("implicit"))
+    assert used == 1
+    assert np.allclose(vector, model.fold_in(raw["j0"][None, :], np.array([1.0]), gram), atol=1e-5)
+
+    service._gram_matrix('job')
+    assert gram_reads == ["v1"]
+    # A retrain recorded elsewhere invalidates the cached gram in this process
+    recorded['version'] = "v2"
+    raw["j1"] = np.array([0.0, 1.0], dtype=np.float32)
+    assert np.allclose(service._gram_matrix('job'), np.diag([9.0, 1.0]))
+    assert gram_reads == ["v1", "v2"]
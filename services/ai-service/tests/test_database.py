@@ -0,0 +1,147 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import psycopg2
+import pytest
+
+from src.database import ConnectionPool, Database, PoolTimeout, _copy_value, _PooledConnection
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.conn.pings += 1
+
+
+class _FakeInfo:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.autocommit = False
+        self.pings = 0
+        self.info = _FakeInfo()
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class _FakePool(ConnectionPool):
+    def __init__(self, **kwargs):
+        kwargs.setdefault("min_size", 0)
+        kwargs.setdefault("max_size", 2)
+        kwargs.setdefault("timeout", 0.2)
+        kwargs.setdefault("max_lifetime", 60)
+        kwargs.setdefault("health_check_interval", 60)
+        super().__init__("postgresql://fake", **kwargs)
+        self.created = []
+
+    def _connect(self):
+        conn = _FakeConnection()
+        self.created.append(conn)
+        now = time.monotonic()
+        return _PooledConnection(conn=conn, created_at=now, last_used=now)
+
+
+def test_connections_are_reused():
+    pool = _FakePool()
+
+    first = pool.getconn()
+    pool.putconn(first)
+    second = pool.getconn()
+
+    assert second is first
+    assert len(pool.created) == 1
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_exhausted_pool_times_out_then_unblocks_on_release():
+    pool = _FakePool(max_size=1)
+    held = pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()['timeouts'] == 1
+
+    threading.Timer(0.05, pool.putconn, args=(held,)).start()
+    assert pool.getconn() is held
+
+
+def test_expired_and_broken_connections_are_replaced():
+    pool = _FakePool(max_lifetime=0.01, health_check_interval=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    time.sleep(0.02)
+
+    replacement = pool.getconn()
+    assert replacement is not conn and conn.closed
+    assert pool.stats()['recycled'] == 1
+
+    pool.max_lifetime = 60
+    replacement.broken = True
+    pool.putconn(replacement)
+    fresh = pool.getconn()
+    assert fresh is not replacement
+    assert pool.stats()['broken'] == 1
+    assert pool.stats()['size'] == 1
+
+
+def test_discarded_connection_frees_its_slot():
+    pool = _FakePool(max_size=1)
+    conn = pool.getconn()
+
+    pool.putconn(conn, discard=True)
+
+    assert conn.closed
+    assert pool.getconn() is not conn
+
+
+def test_copy_values_are_escaped_for_text_format():
+    assert _copy_value(None) == "\\N"
+    assert _copy_value("a\tb\\c\n") == "a\\tb\\\\c\\n"
+    assert _copy_value(b"\x01\xff") == "\\\\x01ff"
+    assert _copy_value([1.5, 2]) == "[1.5, 2]"
+    assert _copy_value(True) == "t"
+    assert _copy_value(datetime(2024, 1, 2, 3, 4, 5)) == "2024-01-02T03:04:05"
+
+
+def test_local_settings_run_as_separate_statements(monkeypatch):
+    statements = []
+
+    class _RecordingCursor(_FakeCursor):
+        def execute(self, query, params=None):
+            statements.append((query, params))
+
+        def fetchall(self):
+            return [{'id': 1}]
+
+    conn = _FakeConnection()
+    conn.cursor = lambda cursor_factory=None: _RecordingCursor(conn)
+    database = Database()
+    monkeypatch.setattr(database, "get_connection", contextmanager(lambda: (yield conn)))
+
+    rows = database.execute_query("SELECT id FROM jobs LIMIT %s", (5,), local_settings={'hnsw.ef_search': 400})
+
+    assert rows == [{'id': 1}]
+    assert statements == [("SET LOCAL hnsw.ef_search = %s", (400,)), ("SELECT id FROM jobs LIMIT %s", (5,))]
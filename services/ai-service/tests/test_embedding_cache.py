@@ -0,0 +1,46 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from src.services.embedding_cache import CACHE_HEADER, model_tag, pack_embedding, unpack_embedding
+
+TAG = model_tag("sentence-transformers:all-MiniLM-L6-v2")
+
+
+def test_float32_entry_is_header_plus_raw_payload():
+    values = np.random.default_rng(0).normal(size=384).astype(np.float32)
+
+    data = pack_embedding(values, TAG)
+    decoded = unpack_embedding(data, TAG)
+
+    assert len(data) == CACHE_HEADER.size + 8 + 4 * 384
+    assert len(data) < len(pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL))
+    assert decoded.dtype == np.float32 and np.array_equal(decoded, values)
+
+
+def test_float16_entry_halves_the_payload():
+    values = np.linspace(-1, 1, 384, dtype=np.float32)
+
+    data = pack_embedding(values, TAG, dtype="float16")
+
+    assert len(data) == CACHE_HEADER.size + 8 + 2 * 384
+    assert np.allclose(unpack_embedding(data, TAG), values, atol=1e-3)
+
+
+def test_other_models_and_legacy_pickles_are_misses():
+    values = np.ones(8, dtype=np.float32)
+
+    assert unpack_embedding(pack_embedding(values, TAG), model_tag("openai:text-embedding-3-small")) is None
+    assert unpack_embedding(pickle.dumps(values), TAG) is None
+    assert unpack_embedding(b"", TAG) is None
+
+
+def test_zstd_round_trip():
+    pytest.importorskip("zstandard")
+    values = np.zeros(3072, dtype=np.float32)
+
+    data = pack_embedding(values, TAG, compression="zstd", compress_min_dim=1024)
+
+    assert len(data) < 4 * 3072
+    assert np.array_equal(unpack_embedding(data, TAG), values)
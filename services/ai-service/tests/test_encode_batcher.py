@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.services.encode_batcher import EncodeBatcher
+
+
+class _RecordingEncoder:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.release = threading.Event()
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+def test_concurrent_requests_are_coalesced_into_one_batch():
+    encoder = _RecordingEncoder()
+    batcher = EncodeBatcher(encoder, max_batch_size=16, max_wait_ms=200)
+    texts = ["a", "bb", "ccc", "bb", "dddd"]
+
+    futures = [batcher.submit(text) for text in texts]
+    encoder.release.set()
+    results = [future.result(timeout=5) for future in futures]
+
+    assert encoder.calls == [["a", "bb", "ccc", "dddd"]]  # duplicates encoded once
+    assert [int(r[0]) for r in results] == [1, 2, 3, 2, 4]
+    stats = batcher.stats()
+    assert stats['batches'] == 1 and stats['requests'] == 5 and stats['texts_encoded'] == 4
+    assert stats['batch_size_histogram'] == {"<=8": 1}
+
+
+def test_batches_are_capped_at_max_size():
+    encoder = _RecordingEncoder()
+    encoder.release.set()
+    batcher = EncodeBatcher(encoder, max_batch_size=4, max_wait_ms=50)
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(batcher.encode, [f"text-{i}" for i in range(10)]))
+
+    assert len(results) == 10
+    assert all(len(call) <= 4 for call in encoder.calls)
+    assert sum(len(call) for call in encoder.calls) == 10
+
+
+def test_encode_errors_reach_every_caller():
+    encoder = _RecordingEncoder(fail=True)
+    encoder.release.set()
+    batcher = EncodeBatcher(encoder, max_batch_size=8, max_wait_ms=20)
+
+    futures = [batcher.submit(text) for text in ("x", "y")]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+    assert batcher.stats()['errors'] >= 1
+
+    # The dispatcher survives and keeps serving
+    encoder.fail = False
+    assert batcher.encode("z")[0] == 1
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.config import settings
+from src.services import job_vector_index as module
+from src.services.job_vector_index import JobVectorIndex
+
+
+def _index_with(vectors):
+    index = JobVectorIndex(refresh_interval=3600)
+    for job_id, vector in vectors.items():
+        index.upsert(job_id, np.asarray(vector, dtype=np.float32))
+    return index
+
+
+def test_score_matches_cosine_similarity():
+    index = _index_with({"a": [1.0, 0.0], "b": [1.0, 1.0], "c": [0.0, 2.0]})
+
+    job_ids, scores = index.score(np.array([3.0, 0.0]))
+
+    expected = {"a": 1.0, "b": 1 / np.sqrt(2), "c": 0.0}
+    assert set(job_ids) == set(expected)
+    for job_id, score in zip(job_ids, scores):
+        assert np.isclose(score, expected[job_id])
+
+
+def test_score_restricted_to_subset_skips_unknown_ids():
+    index = _index_with({"a": [1.0, 0.0], "b": [0.0, 1.0]})
+
+    job_ids, scores = index.score(np.array([0.0, 1.0]), ["b", "missing"])
+
+    assert job_ids == ["b"]
+    assert np.allclose(scores, [1.0])
+
+
+def test_upsert_replaces_and_remove_drops_rows():
+    index = _index_with({"a": [1.0, 0.0], "b": [0.0, 1.0]})
+    before = index.get("a")
+
+    index.upsert("a", np.array([0.0, 5.0]))
+    index.remove("b")
+
+    assert index.size == 1
+    assert np.allclose(index.get("a"), [0.0, 1.0])
+    assert index.get("b") is None
+    # Snapshots are copy-on-write: the old row was not mutated in place
+    assert np.allclose(before, [1.0, 0.0])
+
+
+def test_search_excludes_ids_and_returns_best_first():
+    index = _index_with({"a": [1.0, 0.0], "b": [0.9, 0.1], "c": [0.0, 1.0]})
+
+    job_ids, scores = index.search(np.array([1.0, 0.0]), 2, exclude={"a"})
+
+    assert job_ids == ["b", "c"]
+    assert scores[0] > scores[1]
+
+
+def test_vectors_align_with_requested_ids():
+    index = _index_with({"a": [2.0, 0.0], "b": [0.0, 3.0]})
+
+    matrix, found = index.vectors(["b", "missing", "a"])
+
+    assert list(found) == [True, False, True]
+    assert np.allclose(matrix, [[0.0, 1.0], [0.0, 0.0], [1.0, 0.0]])
+
+
+def test_refresh_refetches_embeddings_updated_after_their_job(monkeypatch):
+    monkeypatch.setattr(settings, "job_embedding_updated_at_enabled", True)
+    index = _index_with({"a": [1.0, 0.0]})
+    index._loaded = True
+    index._watermark = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    embedding_updated = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    queries = []
+
+    def execute_query(query, params=None):
+        queries.append(query)
+        if params is None:
+            return [{'id': "a", 'updatedAt': embedding_updated}]
+        return [{'jobId': "a", 'embedding': [0.0, 1.0]}]
+
+    monkeypatch.setattr(module.db, "execute_query", execute_query)
+    index.refresh()
+
+    assert 'GREATEST(j."updatedAt", jce."updatedAt")' in queries[0]
+    assert np.allclose(index.get("a"), [0.0, 1.0])
+    assert index._watermark == embedding_updated
@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src import lifecycle
+from src.config import settings
+from src.database import db
+from src.services.embedding_service import EmbeddingService, embedding_service
+
+
+class _Provider:
+    dimension = 3
+
+
+def test_embedding_service_construction_is_lazy(monkeypatch):
+    created = []
+    monkeypatch.setattr(
+        "src.services.embedding_service.EmbeddingProviderFactory.create_provider",
+        lambda **kwargs: created.append(kwargs) or _Provider(),
+    )
+
+    service = EmbeddingService(use_cache=False)
+    assert not service.is_loaded and created == []
+
+    service.load()
+    service.load()
+    assert service.is_loaded and len(created) == 1
+    assert service.dim == 3
+
+
+def test_ready_flips_only_after_warmup(monkeypatch):
+    calls = []
+    monkeypatch.setattr(settings, "job_index_enabled", False)
+    monkeypatch.setattr(settings, "cache_invalidation_enabled", False)
+    monkeypatch.setattr(db.pool, "open", lambda: calls.append("db"))
+    monkeypatch.setattr(lifecycle, "WARMUP_RETRY_SECONDS", 0)
+
+    def warmup():
+        calls.append("warmup")
+        assert not lifecycle.readiness.ready
+        if calls.count("warmup") == 1:
+            raise RuntimeError("provider not reachable yet")
+
+    monkeypatch.setattr(embedding_service, "warmup", warmup)
+    lifecycle.post_fork()
+    assert lifecycle.readiness.status()['ready'] is False
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        asyncio.run(lifecycle.startup(executor))
+
+    status = lifecycle.readiness.status()
+    assert calls == ["db", "warmup", "warmup"]
+    assert status['ready'] is True
+    assert status['steps']['database'] == 'ok'
+    assert status['steps']['embedding_warmup'].endswith('s')
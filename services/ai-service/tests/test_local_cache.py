@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.services.embedding_cache import TieredEmbeddingCache
+from src.services.local_cache import ENTRY_OVERHEAD_BYTES, LocalCache
+
+
+def _vec(value, dim=4):
+    return np.full(dim, value, dtype=np.float32)
+
+
+ENTRY_BYTES = _vec(0).nbytes + ENTRY_OVERHEAD_BYTES
+
+
+class _FakeRedisTier:
+    ttl_seconds = 60
+    generation = 0
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.get_calls = []
+
+    def get_many(self, texts):
+        self.get_calls.append(list(texts))
+        return {text: self.data[text].copy() for text in texts if text in self.data}
+
+    def set_many(self, pairs, ttl=None):
+        self.data.update(pairs)
+        return len(pairs)
+
+    def current_generation(self, max_age):
+        return self.generation
+
+    def remaining_ttls(self, texts):
+        return {text: self.ttls.get(text, self.ttl_seconds) for text in texts if text in self.data}
+
+    def delete(self, text):
+        return self.data.pop(text, None) is not None
+
+    def stats(self):
+        return {'total_keys': len(self.data)}
+
+
+def test_lru_evicts_least_recently_used_within_byte_budget():
+    cache = LocalCache(max_bytes=3 * ENTRY_BYTES, ttl_seconds=60)
+    for key in "abc":
+        cache.set(key, _vec(1))
+    cache.get("a")  # "b" is now the oldest
+    cache.set("d", _vec(2))
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    stats = cache.stats()
+    assert stats['bytes'] <= 3 * ENTRY_BYTES and stats['evictions'] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = LocalCache(max_bytes=10 * ENTRY_BYTES, ttl_seconds=0.05)
+    cache.set("a", _vec(1))
+    assert cache.get("a") is not None
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()['expired'] == 1 and len(cache) == 0
+
+
+def test_values_are_read_only_copies():
+    cache = LocalCache(max_bytes=10 * ENTRY_BYTES, ttl_seconds=60)
+    original = _vec(1)
+    cache.set("a", original)
+    original[:] = 5
+
+    cached = cache.get("a")
+    assert cached[0] == 1
+    with pytest.raises(ValueError):
+        cached[0] = 2
+
+
+def test_tiered_cache_serves_repeat_lookups_from_l1():
+    remote = _FakeRedisTier()
+    remote.data["python"] = _vec(1)
+    cache = TieredEmbeddingCache(LocalCache(10 * ENTRY_BYTES, 60), remote_getter=lambda: remote)
+
+    first = cache.get_many(["python", "java"])
+    second = cache.get_many(["python"])
+
+    assert set(first) == {"python"} and second["python"][0] == 1
+    assert remote.get_calls == [["python", "java"]]  # second lookup never reached Redis
+    stats = cache.stats()
+    assert stats['l1']['hits'] == 1 and stats['l1']['misses'] == 2
+    assert stats['l2']['hits'] == 1 and stats['l2']['misses'] == 1
+    assert stats['hit_ratio'] == pytest.approx(2 / 3, abs=1e-3)
+
+
+def test_tiered_cache_writes_both_tiers_and_works_without_redis():
+    remote = _FakeRedisTier()
+    cache = TieredEmbeddingCache(LocalCache(10 * ENTRY_BYTES, 60), remote_getter=lambda: remote)
+    cache.set_many({"a": _vec(1), "b": _vec(2)})
+    assert set(remote.data) == {"a", "b"}
+    assert set(cache.get_many(["a", "b"])) == {"a", "b"} and remote.get_calls == []
+
+    offline = TieredEmbeddingCache(LocalCache(10 * ENTRY_BYTES, 60), remote_getter=lambda: None)
+    assert offline.set("a", _vec(1))
+    assert offline.get("a")[0] == 1
+    assert offline.stats()['l2']['enabled'] is False
+
+
+def test_promoted_entries_keep_their_remaining_redis_ttl():
+    remote = _FakeRedisTier()
+    remote.data["python"] = _vec(1)
+    remote.ttls["python"] = 0.05
+    cache = TieredEmbeddingCache(LocalCache(10 * ENTRY_BYTES, 60), remote_getter=lambda: remote)
+
+    assert "python" in cache.get_many(["python"])
+    time.sleep(0.1)
+    del remote.data["python"]  # expired from Redis too
+    assert cache.get_many(["python"]) == {}
+
+
+def test_generation_bump_empties_l1():
+    remote = _FakeRedisTier()
+    cache = TieredEmbeddingCache(LocalCache(10 * ENTRY_BYTES, 60), remote_getter=lambda: remote)
+    cache.set_many({"python": _vec(1)})
+    assert cache.get("python")[0] == 1
+
+    # EmbeddingCache.clear() in some process, e.g. after a model change
+    remote.generation = 1
+    remote.data.clear()
+    assert cache.get("python") is None
+    assert len(cache.local) == 0
@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from src.database import db
+from src.models.schemas import RecommendationRequest, UserPreferences
+from src.services import job_vector_index as job_vector_index_module
+from src.services.job_vector_index import JobVectorIndex
+from src.services.precomputed_recommendations import PrecomputedRecommendations, PrecomputedSimilarJobs
+
+
+@pytest.fixture
+def rows(monkeypatch):
+    rows = [
+        {'job_id': "j1", 'score': 0.9, 'organization_id': "org-1", 'location': "Saigon"},
+        {'job_id': "j2", 'score': 0.8, 'organization_id': "org-2", 'location': "Hanoi"},
+        {'job_id': "j3", 'score': 0.7, 'organization_id': "org-3", 'location': "Hanoi"},
+    ]
+    monkeypatch.setattr(db, "execute_query", lambda query, params=None: rows)
+    return rows
+
+
+def test_lookup_returns_the_stored_order(rows):
+    job_ids, scores = PrecomputedRecommendations().lookup("u1", None, 2)
+
+    assert job_ids == ["j1", "j2"]
+    assert scores == pytest.approx([0.9, 0.8])
+
+
+def test_lookup_applies_preference_boosts(rows):
+    job_ids, scores = PrecomputedRecommendations().lookup("u1", UserPreferences(preferredLocations=["Hanoi"]), 3)
+
+    assert dict(zip(job_ids, scores)) == pytest.approx({"j1": 0.9, "j2": 0.9, "j3": 0.8})
+    assert job_ids[-1] == "j3"
+
+
+def test_lookup_falls_back_when_too_few_jobs_survive(rows):
+    assert PrecomputedRecommendations().lookup("u1", None, 4) is None
+
+
+def test_serves_only_requests_it_can_apply():
+    store = PrecomputedRecommendations()
+    request = RecommendationRequest(userId="u1", preferences=UserPreferences(minSalary=1000, preferredLocations=["Hanoi"]))
+
+    assert store.serves(request)
+    assert store.serves(RecommendationRequest(userId="u1", preferences=UserPreferences(skillsLike=[])))
+    assert not store.serves(request.model_copy(update={'searchTerm': "python"}))
+    assert not store.serves(RecommendationRequest(userId="u1", preferences=UserPreferences(skillsLike=["python"])))
+    assert not store.serves(RecommendationRequest(userId="u1", preferences=UserPreferences(wantsClearanceRoles=True)))
+    assert not store.serves(RecommendationRequest(userId="u1", limit=10_000))
+
+
+def test_save_writes_array_literals(monkeypatch):
+    calls = []
+    monkeypatch.setattr(db, "bulk_upsert", lambda table, columns, rows, **kwargs: calls.append((table, list(rows), kwargs)) or 1)
+    computed_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    PrecomputedRecommendations().save([("u1", ["j1", "j2"], [0.91234567, 0.5])], computed_at)
+
+    table, rows, kwargs = calls[0]
+    assert table == "user_recommendations" and kwargs == {'conflict_columns': ["userId"]}
+    assert rows == [("u1", "{j1,j2}", "{0.912346,0.5}", computed_at)]
+
+
+def test_similar_jobs_lookup_prepends_the_job_when_not_excluded(monkeypatch):
+    calls = []
+    rows = [{'job_id': "j2", 'score': 0.8}, {'job_id': "j3", 'score': 0.7}]
+    monkeypatch.setattr(db, "execute_query", lambda query, params=None: calls.append(params) or rows)
+    graph = PrecomputedSimilarJobs(top_k=5)
+
+    assert graph.lookup("j1", 2) == (["j2", "j3"], [0.8, 0.7])
+    assert graph.lookup("j1", 3, exclude_job_id=False) == (["j1", "j2", "j3"], [1.0, 0.8, 0.7])
+    assert graph.lookup("j1", 3) is None  # a neighbour closed since the last run
+    assert [params[-1] for params in calls] == [2, 2, 3]
+
+
+def test_refresh_job_updates_its_row_and_neighbours(monkeypatch):
+    index = JobVectorIndex(refresh_interval=3600)
+    for job_id, vector in {"j1": [1, 0], "j2": [1, 0.1], "j3": [0, 1]}.items():
+        index.upsert(job_id, np.asarray(vector, dtype=np.float32))
+    index._loaded = True
+    monkeypatch.setattr(job_vector_index_module, "job_vector_index", index)
+    stored = {
+        "j2": (["j3", "j1"], [0.3, 0.2], "yesterday"),  # j1 moved closer to j2
+        "j3": (["j2"], [0.1], "yesterday"),
+    }
+    saved = []
+    graph = PrecomputedSimilarJobs(top_k=2)
+    monkeypatch.setattr(graph, "load", lambda job_ids: {job_id: stored[job_id] for job_id in job_ids if job_id in stored})
+    monkeypatch.setattr(graph, "save", lambda lists, computed_at: saved.append((list(lists), computed_at)))
+
+    changed = graph.refresh_job("j1")
+
+    assert changed == ["j1", "j2", "j3"]
+    (own, _), (neighbours, computed_at) = saved
+    assert own[0][0] == "j1" and own[0][1] == ["j2", "j3"]
+    assert computed_at == "yesterday"
+    assert [(job_id, ids) for job_id, ids, _ in neighbours] == [("j2", ["j1", "j3"]), ("j3", ["j2", "j1"])]
@@ -0,0 +1,88 @@
+import numpy as np
+
+from src.models.schemas import UserPreferences
+from src.services import scoring
+
+
+def _reference_score(user_emb, job_emb, user_cf, job_cf, alpha):
+    content = float(np.dot(user_emb, job_emb) / (np.linalg.norm(user_emb) * np.linalg.norm(job_emb)))
+    cf = float(np.dot(user_cf, job_cf)) if user_cf is not None and job_cf is not None else 0.0
+    return alpha * content + (1 - alpha) * cf
+
+
+def test_hybrid_scores_match_per_job_loop():
+    rng = np.random.default_rng(0)
+    user_emb, user_cf = rng.normal(size=16), rng.normal(size=4)
+    jobs, job_cf = rng.normal(size=(50, 16)), rng.normal(size=(50, 4))
+
+    scores = scoring.hybrid_scores(user_emb, jobs, user_cf, job_cf, alpha=0.6)
+
+    expected = [_reference_score(user_emb, jobs[i], user_cf, job_cf[i], 0.6) for i in range(50)]
+    assert np.allclose(scores, expected, atol=1e-5)
+
+
+def test_missing_cf_contributes_nothing():
+    rng = np.random.default_rng(1)
+    user_emb, jobs = rng.normal(size=8), rng.normal(size=(10, 8))
+
+    scores = scoring.hybrid_scores(user_emb, jobs, None, rng.normal(size=(10, 4)), alpha=0.6)
+
+    expected = [_reference_score(user_emb, job, None, None, 0.6) for job in jobs]
+    assert np.allclose(scores, expected, atol=1e-5)
+
+
+def test_preference_masks_boost_and_clamp():
+    preferences = UserPreferences(preferredLocations=["Hanoi"], hiddenCompanyIds=["org-2"])
+    scores = np.array([0.5, 0.5, 0.2], dtype=np.float32)
+
+    boosts = scoring.preference_boosts(preferences, ["Hanoi", "Saigon", "Hanoi"], ["org-1", None, "org-2"])
+    boosted = scoring.apply_boosts(scores, boosts, preferences)
+
+    assert np.allclose(boosted, [0.6, 0.5, 0.0])
+
+
+def test_top_k_is_sorted_and_respects_min_score():
+    scores = np.array([0.1, 0.9, 0.4, 0.7, 0.3], dtype=np.float32)
+
+    indices, top = scoring.top_k(scores, 3)
+    assert list(indices) == [1, 3, 2]
+    assert np.allclose(top, [0.9, 0.7, 0.4])
+
+    indices, _ = scoring.top_k(scores, 3, min_score=0.5)
+    assert list(indices) == [1, 3]
+
+
+def test_hybrid_queries_match_hybrid_scores():
+    rng = np.random.default_rng(3)
+    users, users_cf = rng.normal(size=(5, 8)), rng.normal(size=(5, 3))
+    users_cf[2] = 0  # no factors
+    jobs, jobs_cf = rng.normal(size=(20, 8)), rng.normal(size=(20, 3))
+
+    scores = scoring.hybrid_queries(users, users_cf, 0.6, 3) @ scoring.stack_features(jobs, jobs_cf).T
+
+    for i in range(5):
+        expected = scoring.hybrid_scores(users[i], jobs, users_cf[i] if i != 2 else None, jobs_cf, alpha=0.6)
+        assert np.allclose(scores[i], expected, atol=1e-5)
+
+
+def test_blocked_top_k_matches_full_sort():
+    rng = np.random.default_rng(4)
+    queries, items = rng.normal(size=(23, 6)).astype(np.float32), rng.normal(size=(41, 6)).astype(np.float32)
+
+    blocks = list(scoring.blocked_top_k(queries, items, 5, query_block=7, item_block=9))
+
+    assert [start for start, _, _ in blocks] == [0, 7, 14, 21]
+    top = np.vstack([indices for _, indices, _ in blocks])
+    top_scores = np.vstack([values for _, _, values in blocks])
+    full = queries @ items.T
+    assert np.array_equal(top, np.argsort(-full, axis=1)[:, :5])
+    assert np.allclose(top_scores, np.take_along_axis(full, top, axis=1))
+
+
+def test_blocked_top_k_excludes_self():
+    items = scoring.normalize_rows(np.random.default_rng(5).normal(size=(10, 4)))
+
+    top = np.vstack([indices for _, indices, _ in scoring.blocked_top_k(items, items, 20, query_block=3, item_block=4, exclude_self=True)])
+
+    assert top.shape == (10, 9)
+    assert not (top == np.arange(10)[:, None]).any()
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src.config import settings
+from src.services.job_vector_index import JobVectorIndex
+from src.services.shared_vector_store import SharedVectorStore
+
+
+def test_publish_and_attach_generations(tmp_path):
+    store = SharedVectorStore("jobs", str(tmp_path), keep=2)
+    assert store.generation() == 0 and store.attach() is None
+
+    for n in range(1, 4):
+        generation = store.publish([f"j{i}" for i in range(n)], np.ones((n, 3), dtype=np.float32) * n)
+        assert generation == n == store.generation()
+
+    generation, ids, matrix = store.attach()
+    assert generation == 3 and ids == ["j0", "j1", "j2"]
+    assert isinstance(matrix, np.memmap) and not matrix.flags.writeable
+    assert np.all(matrix == 3)
+    assert sorted(p.name for p in (tmp_path / "jobs").glob("gen-*")) == ["gen-2", "gen-3"]
+
+
+def test_single_leader_until_released(tmp_path):
+    first = SharedVectorStore("jobs", str(tmp_path))
+    second = SharedVectorStore("jobs", str(tmp_path))
+
+    assert first.is_leader()
+    assert first.is_leader()
+    assert not second.is_leader()
+    first.release()
+    assert second.is_leader()
+    second.release()
+
+
+def test_follower_index_serves_leader_generation(tmp_path):
+    leader = JobVectorIndex(refresh_interval=3600, shared_store=SharedVectorStore("jobs", str(tmp_path)))
+    follower = JobVectorIndex(refresh_interval=3600, shared_store=SharedVectorStore("jobs", str(tmp_path)))
+    assert leader._store.is_leader()
+
+    leader.upsert("a", np.array([1.0, 0.0], dtype=np.float32))
+    leader.upsert("b", np.array([0.0, 2.0], dtype=np.float32))
+    leader._publish()
+    assert leader.generation == 1
+    assert isinstance(leader._snapshot.matrix, np.memmap)
+
+    follower.refresh()
+    assert follower.is_loaded and follower.generation == 1
+    assert np.allclose(follower.get("b"), [0.0, 1.0])
+
+    # Follower-local upserts copy the mapping and are replaced by the next generation
+    follower.upsert("c", np.array([1.0, 1.0], dtype=np.float32))
+    assert follower.get("c") is not None and leader.get("c") is None
+    leader.remove("a")
+    leader._publish()
+    follower.refresh()
+    assert follower.generation == 2
+    assert follower.get("a") is None and follower.get("c") is None
+
+    job_ids, scores = follower.score(np.array([0.0, 1.0]))
+    assert job_ids == ["b"] and np.allclose(scores, [1.0])
+    leader._store.release()
+
+
+def test_follower_keeps_ann_and_marks_only_changed_jobs_pending(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ann_index_path", str(tmp_path / "ann"))
+    monkeypatch.setattr(settings, "ann_min_jobs", 1)
+    leader = JobVectorIndex(refresh_interval=3600, shared_store=SharedVectorStore("jobs", str(tmp_path)))
+    follower = JobVectorIndex(refresh_interval=3600, shared_store=SharedVectorStore("jobs", str(tmp_path)))
+    assert leader._store.is_leader()
+
+    for i in range(20):
+        leader.upsert(f"j{i}", np.array([1.0, i], dtype=np.float32))
+    leader._publish()
+    leader.rebuild_ann()
+    follower.refresh()
+    follower._maybe_rebuild_ann()
+    assert follower._ann is not None and not follower._ann_pending
+
+    leader.upsert("j3", np.array([0.0, 1.0], dtype=np.float32))
+    leader.upsert("new", np.array([1.0, 1.0], dtype=np.float32))
+    leader._publish()
+    follower.refresh()
+    assert follower._ann_pending == {"j3", "new"}
+    assert follower._ann_source is follower._snapshot
+
+    # Followers never rebuild or write the shared file
+    monkeypatch.setattr(follower, "rebuild_ann", lambda: pytest.fail("follower rebuilt the ANN index"))
+    follower._maybe_rebuild_ann()
+    assert "new" in follower.search(np.array([1.0, 1.0]), 3)[0]
+    leader._store.release()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.utils.vector_codec import decode_vector, encode_vector, parse_vector, row_vector, vector_select
+
+
+def test_float32_round_trip_is_zero_copy():
+    values = np.random.default_rng(0).normal(size=384).astype(np.float32)
+    buffer = encode_vector(values)
+
+    decoded = decode_vector(memoryview(buffer))
+
+    assert len(buffer) == 8 + 4 * 384
+    assert np.array_equal(decoded, values)
+    assert decoded.dtype == np.float32
+    assert not decoded.flags.owndata
+
+
+def test_float16_round_trip_upcasts():
+    values = np.linspace(-1, 1, 64, dtype=np.float32)
+
+    decoded = decode_vector(encode_vector(values, "float16"))
+
+    assert decoded.dtype == np.float32
+    assert np.allclose(decoded, values, atol=1e-3)
+
+
+def test_rejects_foreign_buffers():
+    with pytest.raises(ValueError):
+        decode_vector(b"\x00" * 16)
+
+
+def test_parse_vector_accepts_every_stored_form():
+    expected = np.array([0.5, 1.0], dtype=np.float32)
+
+    for value in (encode_vector(expected), "[0.5, 1.0]", [0.5, 1.0]):
+        assert np.array_equal(parse_vector(value), expected)
+    assert parse_vector(None) is None
+    assert parse_vector([]) is None
+
+
+def test_row_vector_prefers_binary_column():
+    row = {"embeddingBin": encode_vector([1.0, 2.0]), "embedding": None}
+    legacy_row = {"embeddingBin": None, "embedding": [3.0, 4.0]}
+
+    assert list(row_vector(row, "embedding", "embeddingBin")) == [1.0, 2.0]
+    assert list(row_vector(legacy_row, "embedding", "embeddingBin")) == [3.0, 4.0]
+    assert vector_select("embedding", "embeddingBin", "jce", binary=False) == "jce.embedding"